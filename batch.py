@@ -0,0 +1,13 @@
+import warnings
+warnings.filterwarnings('ignore')
+import sys
+from mean_reversion.batch import main
+
+"""
+Non-interactive entry point. See mean_reversion/batch.py for the job spec.
+
+python batch.py spec.json --jobs 4 --output results.jsonl
+"""
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,200 @@
+import argparse
+import contextlib
+import io
+import json
+import logging
+import os
+import platform
+import sys
+import tempfile
+import time
+import tracemalloc
+import warnings
+import numpy as np
+import pandas as pd
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+if ROOT not in sys.path:
+    sys.path.insert(0, ROOT)
+
+import mean_reversion
+
+"""
+Benchmark suite for loading, model building, metrics, the ADF test and
+headless plot export.
+
+Usage:
+    python -m benchmarks.run --output benchmarks/results.json
+    python -m benchmarks.run --baseline benchmarks/baseline.json --tolerance 0.2
+
+Each benchmark records its best wall time over --repeat runs and its peak
+traced memory from a separate run. With --baseline, results are compared and
+the process exits with status 1 if any benchmark regressed beyond tolerance.
+"""
+
+DEFAULT_SIZES = [1_000_000, 10_000_000]
+ADF_MAX_BARS = 1_000_000
+PLOT_MAX_BARS = 1_000_000
+
+
+def synthetic(bars:int, seed:int=0) -> pd.DataFrame:
+    rng = np.random.default_rng(seed)
+    close = 1000 * np.exp(np.cumsum(rng.normal(0, 1e-3, bars)))
+    index = pd.date_range('2000-01-01', periods=bars, freq='h', name='date')
+    spread = np.abs(rng.normal(0, 1e-3, bars)) * close
+    return pd.DataFrame({
+        'open': close,
+        'high': close + spread,
+        'low': close - spread,
+        'close': close,
+    }, index=index)
+
+
+def measure(name:str, fn, bars:int, repeat:int) -> dict:
+    # warm up imports and caches before timing
+    fn()
+
+    times = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        fn()
+        times.append(time.perf_counter() - start)
+
+    tracemalloc.start()
+    fn()
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+
+    return {
+        'name': name,
+        'bars': bars,
+        'wall_time': min(times),
+        'mean_time': float(np.mean(times)),
+        'peak_memory': peak,
+    }
+
+
+def quiet(fn):
+    def run():
+        with contextlib.redirect_stdout(io.StringIO()), warnings.catch_warnings():
+            warnings.simplefilter('ignore')
+            return fn()
+    return run
+
+
+def cases(sizes:list, directory:str):
+    # plots are rendered off-screen into directory
+    mean_reversion.headless()
+    logging.getLogger('matplotlib.font_manager').setLevel(logging.ERROR)
+    dl = mean_reversion.DataLoader()
+    accounts = mean_reversion.Accounts(cash=None)
+    calc = mean_reversion.RollingCalculationType()
+    side = mean_reversion.Side().side_neutral
+
+    uncached = mean_reversion.DataLoader(use_cache=False)
+    datasets = []
+    for file in sorted(dl.files()):
+        data = dl.load_data(file)
+        yield f"load_data[{file}]", len(data), quiet(lambda f=file: uncached.load_data(f))
+        yield f"load_data_cached[{file}]", len(data), quiet(lambda f=file: dl.load_data(f))
+        datasets.append((file, data))
+
+    for bars in sizes:
+        datasets.append((f"synthetic_{bars}", synthetic(bars)))
+
+    for name, data in datasets:
+        for calc_type in calc.valid_values:
+            hparam = mean_reversion.Hyperparameters(None, None, None, None, side, calc_type)
+
+            def build(data=data, hparam=hparam):
+                return mean_reversion.MeanReversion(data, hparam, accounts, verbose=False, cache=None)
+
+            yield f"build_model[{name},{calc_type}]", len(data), quiet(build)
+
+        sim = quiet(build)()
+        yield f"metrics[{name}]", len(data), quiet(lambda sim=sim: mean_reversion.Metrics(sim.built_model, sim.cash))
+        spread = sim.built_model['spread'].to_numpy()
+        if len(data) <= ADF_MAX_BARS:
+            yield f"stationarity_test[{name}]", len(data), quiet(lambda sim=sim: sim.stationarity_test())
+            yield f"batch_adf[{name}]", len(data), quiet(lambda spread=spread: mean_reversion.BatchADF(spread))
+            yield f"rolling_adf[{name}]", len(data), quiet(lambda spread=spread: mean_reversion.rolling_adf(spread, 250))
+        if len(data) <= PLOT_MAX_BARS:
+            plots = mean_reversion.Plots(sim.built_model)
+            yield f"plots_export[{name}]", len(data), quiet(lambda plots=plots, name=name: plots.export(directory, name))
+            del plots
+        del sim
+
+
+def run(sizes:list, repeat:int) -> dict:
+    results = []
+    with tempfile.TemporaryDirectory() as directory:
+        for name, bars, fn in cases(sizes, directory):
+            result = measure(name, fn, bars, repeat)
+            print(f"{name:<55} {result['wall_time']*1000:>10.1f} ms {result['peak_memory']/2**20:>10.1f} MiB")
+            results.append(result)
+
+    return {
+        'meta': {
+            'timestamp': time.strftime('%Y-%m-%dT%H:%M:%S'),
+            'python': platform.python_version(),
+            'numpy': np.__version__,
+            'pandas': pd.__version__,
+            'machine': platform.machine(),
+        },
+        'results': results,
+    }
+
+
+def compare(current:dict, baseline:dict, tolerance:float=0.2) -> list:
+    """
+    Returns one entry per benchmark whose wall time or peak memory exceeds the
+    baseline by more than tolerance (a fraction, 0.2 = 20%).
+    """
+    previous = {r['name']: r for r in baseline['results']}
+    regressions = []
+    for result in current['results']:
+        base = previous.get(result['name'])
+        if base is None:
+            continue
+        for metric in ['wall_time', 'peak_memory']:
+            if base[metric] > 0 and result[metric] > base[metric] * (1 + tolerance):
+                regressions.append({
+                    'name': result['name'],
+                    'metric': metric,
+                    'baseline': base[metric],
+                    'current': result[metric],
+                    'ratio': result[metric] / base[metric],
+                })
+    return regressions
+
+
+def main(argv=None) -> int:
+    parser = argparse.ArgumentParser(description='Mean Reversion benchmark suite')
+    parser.add_argument('--output', default=os.path.join(ROOT, 'benchmarks', 'results.json'))
+    parser.add_argument('--baseline', default=None, help='results file to compare against')
+    parser.add_argument('--tolerance', type=float, default=0.2)
+    parser.add_argument('--sizes', type=int, nargs='*', default=DEFAULT_SIZES, help='synthetic series lengths')
+    parser.add_argument('--repeat', type=int, default=3)
+    args = parser.parse_args(argv)
+
+    os.chdir(ROOT)
+    current = run(args.sizes, args.repeat)
+    with open(args.output, 'w') as f:
+        json.dump(current, f, indent=2)
+    print(f"Results written to {args.output}")
+
+    if args.baseline is None:
+        return 0
+
+    with open(args.baseline) as f:
+        baseline = json.load(f)
+    regressions = compare(current, baseline, args.tolerance)
+    for r in regressions:
+        print(f"REGRESSION {r['name']} {r['metric']}: {r['baseline']:.4g} -> {r['current']:.4g} ({r['ratio']:.2f}x)")
+    if len(regressions) == 0:
+        print("No regressions.")
+    return 1 if len(regressions) > 0 else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -1,4 +1,21 @@
 from .data_loader import DataLoader
 from .mean_reversion import *
-from .metrics import Metrics 
-from .plots import Plots
\ No newline at end of file
+from .metrics import Metrics, BatchMetrics, MetricsAccumulator
+from .plots import Plots, headless, export_reports
+from .sweep import Sweep, ParameterGrid, timeframe_sweep
+from .parallel import ParallelSweep, SharedFrame
+from .streaming import StreamingMeanReversion
+from .cache import DataCache
+from .memo import StageCache, stage_cache
+from .blocks import BlockModel
+from .lean import LeanBacktest
+from .walk_forward import WalkForward
+from .halving import SuccessiveHalving
+from .portfolio import Portfolio
+from .pairs import PairsMeanReversion
+from .adf import BatchADF, rolling_adf, stationary_regime
+from .trades import TradeLedger, extract_trades
+from .bootstrap import Bootstrap
+from .store import ResultStore, data_key, code_version
+from . import profiling
+from .profiling import Profiler, MemorySink, LogSink, JSONSink
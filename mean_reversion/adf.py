@@ -0,0 +1,159 @@
+import math
+import numpy as np
+from . import arrays
+
+"""
+Vectorized Augmented Dickey-Fuller test.
+
+The ADF regression with a constant and a fixed number of lagged differences,
+
+dy[t] = a + gamma * y[t-1] + phi_1 * dy[t-1] + ... + phi_k * dy[t-k] + e[t]
+
+is solved from its normal equations, so only the sums of products of the
+regressors are needed. Summing over all rows tests many series (columns) at
+once; running sums over a trailing window give a rolling ADF statistic in
+O(n), updating the regression incrementally instead of refitting each window.
+Missing values drop the affected rows of their own column only.
+
+The statistic matches statsmodels adfuller(x, maxlag=lags, autolag=None,
+regression='c'); p-values and critical values use the MacKinnon (1994, 2010)
+approximations for a constant-only regression.
+"""
+
+
+# MacKinnon (1994) response surface, regression 'c', one variable
+TAU_MAX = 2.74
+TAU_MIN = -18.83
+TAU_STAR = -1.61
+TAU_SMALL_P = [2.1659, 1.4412, 0.038269]
+TAU_LARGE_P = [1.7339, 0.93202, -0.12745, -0.010368]
+
+# MacKinnon (2010) finite sample critical values, regression 'c', one variable
+CRITICAL = {
+    '1%': [-3.43035, -6.5393, -16.786, -79.433],
+    '5%': [-2.86154, -2.8903, -4.234, -40.04],
+    '10%': [-2.56677, -1.5384, -2.809, 0.0],
+}
+
+_erfc = np.frompyfunc(math.erfc, 1, 1)
+
+
+def p_values(statistic):
+    statistic = np.asarray(statistic, dtype=float)
+    small = np.polyval(TAU_SMALL_P[::-1], statistic)
+    large = np.polyval(TAU_LARGE_P[::-1], statistic)
+    z = np.where(statistic <= TAU_STAR, small, large)
+    p = (0.5 * _erfc(-z / math.sqrt(2))).astype(float)
+    p = np.where(statistic > TAU_MAX, 1.0, p)
+    p = np.where(statistic < TAU_MIN, 0.0, p)
+    return np.where(np.isnan(statistic), np.nan, p)
+
+
+def critical_values(nobs):
+    nobs = np.asarray(nobs, dtype=float)
+    with np.errstate(divide='ignore'):
+        return {k: np.polyval(v[::-1], 1 / nobs) for k, v in CRITICAL.items()}
+
+
+def regressors(values, lags:int):
+    """
+    Returns the target dy and the regressors [1, y[t-1], dy[t-1], ..., dy[t-lags]]
+    as rows x series arrays, with rows containing any NaN zeroed out, and the
+    row mask. Row i is the regression for bar i + lags + 1.
+    """
+    y = arrays.as_2d(np.asarray(values, dtype=float))
+    # the constant absorbs any shift, centering keeps the running sums small
+    y = y - np.nanmean(y, axis=0)
+    dy = np.diff(y, axis=0)
+    rows = len(dy) - lags
+
+    target = dy[lags:]
+    x = [np.ones_like(target), y[lags:-1]] + [dy[lags - i:lags - i + rows] for i in range(1, lags + 1)]
+
+    valid = np.isfinite(target)
+    for column in x:
+        valid &= np.isfinite(column)
+    target = np.where(valid, target, 0)
+    x = [np.where(valid, column, 0) for column in x]
+    return target, x, valid
+
+
+def solve(xtx, xty, yty, nobs):
+    # gamma t-statistic from the normal equations; arrays are (..., p, p), (..., p) and (...)
+    k = xtx.shape[-1]
+    bad = nobs <= k
+    xtx = np.where(bad[..., None, None], np.eye(k), xtx)
+    try:
+        inv = np.linalg.inv(xtx)
+    except np.linalg.LinAlgError:
+        inv = np.linalg.pinv(xtx)
+
+    beta = np.einsum('...ij,...j->...i', inv, xty)
+    ssr = yty - np.einsum('...i,...i->...', beta, xty)
+    with np.errstate(divide='ignore', invalid='ignore'):
+        sigma2 = ssr / (nobs - k)
+        statistic = beta[..., 1] / np.sqrt(sigma2 * inv[..., 1, 1])
+    return np.where(bad, np.nan, statistic)
+
+
+class BatchADF:
+    """
+    ADF test of every column of a bars x series array. Attributes are arrays
+    with one value per series.
+    """
+
+    def __init__(self, values, lags:int=1, significance:str='5%'):
+        self.lags = lags
+        target, x, valid = regressors(values, lags)
+
+        xtx = np.stack([np.stack([(a * b).sum(axis=0) for b in x], axis=-1) for a in x], axis=-2)
+        xty = np.stack([(a * target).sum(axis=0) for a in x], axis=-1)
+        yty = (target * target).sum(axis=0)
+        self.nobs = valid.sum(axis=0)
+
+        self.statistic = solve(xtx, xty, yty, self.nobs)
+        self.p_value = p_values(self.statistic)
+        self.critical_values = critical_values(self.nobs)
+        self.stationary = self.statistic < self.critical_values[significance]
+
+    def to_dict(self) -> dict:
+        values = {
+            'adf_statistic': self.statistic,
+            'adf_p_value': self.p_value,
+            'adf_nobs': self.nobs,
+        }
+        values.update({f"adf_critical_{k}": v for k, v in self.critical_values.items()})
+        values['adf_stationary'] = self.stationary
+        return values
+
+
+def rolling_adf(values, window:int, lags:int=1):
+    """
+    ADF statistic of each series over trailing windows of `window` regression
+    rows, aligned to the bars of values. Windows containing missing values are NaN.
+    """
+    values = np.asarray(values, dtype=float)
+    target, x, valid = regressors(values, lags)
+
+    def windowed(a):
+        return arrays.rolling_sum(a, window)
+
+    xtx = np.stack([np.stack([windowed(a * b) for b in x], axis=-1) for a in x], axis=-2)
+    xty = np.stack([windowed(a * target) for a in x], axis=-1)
+    yty = windowed(target * target)
+    nobs = windowed(valid.astype(float))
+
+    statistic = solve(xtx, xty, yty, nobs)
+    statistic[:window - 1] = np.nan
+    statistic[nobs < window] = np.nan
+
+    out = np.full((len(values),) + statistic.shape[1:], np.nan)
+    out[lags + 1:] = statistic
+    return out if np.ndim(values) == 2 else out[:, 0]
+
+
+def stationary_regime(values, window:int, lags:int=1, significance:str='5%'):
+    # True on bars whose trailing window rejects a unit root; multiply a signal by it to gate trading
+    statistic = rolling_adf(values, window, lags)
+    with np.errstate(invalid='ignore'):
+        return statistic < critical_values(window)[significance]
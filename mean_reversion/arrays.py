@@ -0,0 +1,171 @@
+import numpy as np
+import pandas as pd
+
+"""
+NumPy helpers shared by the batch engines.
+
+Every function accepts 1-D (bars) or 2-D (bars x configs) arrays and
+reproduces the pandas calculations used in MeanReversion.build_model.
+"""
+
+
+def as_2d(values):
+    values = np.asarray(values, dtype=float)
+    return values.reshape(-1, 1) if values.ndim == 1 else values
+
+
+def log_returns(close):
+    close = np.asarray(close, dtype=float)
+    out = np.empty_like(close)
+    out[0] = np.nan
+    np.log(close[1:] / close[:-1], out=out[1:])
+    return out
+
+
+def frame(values):
+    values = np.asarray(values, dtype=float)
+    if values.ndim == 1:
+        return pd.Series(values, copy=False)
+    return pd.DataFrame(values, copy=False)
+
+
+def rolling_mean(values, period:int, exponential:bool):
+    if exponential:
+        return frame(values).ewm(span=period).mean().to_numpy()
+    return frame(values).rolling(period).mean().to_numpy()
+
+
+def rolling_std(values, period:int, exponential:bool):
+    if exponential:
+        return frame(values).ewm(span=period).std().to_numpy()
+    return frame(values).rolling(period).std().to_numpy()
+
+
+def ffill_positions(entry, exit, signal:int, dtype=float, initial:float=0.0):
+    # Equivalent of attach_signal: mark entries with signal, exits with 0,
+    # forward fill and default to initial (0 unless continuing a previous block).
+    # Exits take priority over entries.
+    entry = np.asarray(entry)
+    exit = np.asarray(exit)
+    n = entry.shape[0]
+    rows = np.arange(n, dtype=np.int32 if n < 2**31 else np.int64).reshape((-1,) + (1,) * (entry.ndim - 1))
+
+    last = np.where(entry | exit, rows, -1)
+    np.maximum.accumulate(last, axis=0, out=last)
+
+    active = entry & ~exit
+    held = np.take_along_axis(active, np.maximum(last, 0), axis=0)
+    positions = np.multiply(held, signal, dtype=dtype)
+    positions[last < 0] = initial
+    return positions
+
+
+def shift_signal(positions):
+    # shift to mitigate look ahead bias; first bar carries no position
+    shifted = np.empty_like(positions, dtype=float)
+    shifted[0] = 0
+    shifted[1:] = positions[:-1]
+    return shifted
+
+
+def strategy_returns(signal, log_returns):
+    returns = signal * as_2d(log_returns) if np.ndim(signal) == 2 else signal * log_returns
+    return np.nan_to_num(returns, nan=0.0, copy=False)
+
+
+def rolling_sum(values, window:int):
+    # trailing window sums from one running sum
+    running = np.cumsum(values, axis=0)
+    out = running.copy()
+    out[window:] -= running[:-window]
+    return out
+
+
+def rolling_beta(y, x, window:int):
+    """
+    Slope of the OLS fit of y on x (with intercept) over trailing windows,
+    from running sums of x, y, x*x and x*y in O(n). Both series are centered
+    first, which leaves the slope unchanged but keeps the sums small.
+    """
+    y = np.asarray(y, dtype=float)
+    x = np.asarray(x, dtype=float)
+    y = y - y.mean()
+    x = x - x.mean()
+
+    sum_x = rolling_sum(x, window)
+    sum_y = rolling_sum(y, window)
+    cov = rolling_sum(x * y, window) - sum_x * sum_y / window
+    var = rolling_sum(x * x, window) - sum_x * sum_x / window
+
+    with np.errstate(divide='ignore', invalid='ignore'):
+        beta = np.where(var > 0, cov / var, np.nan)
+    beta[:window - 1] = np.nan
+    return beta
+
+
+def risk_exits(signal, log_returns, close, high, low, open=None, stop_loss:float=None, take_profit:float=None, max_holding:int=None):
+    """
+    Cuts each run of a shifted signal at its first stop-loss, take-profit or
+    max-holding exit and returns (signal, strategy_returns).
+
+    A run entered at close[e] exits on the first later bar whose low/high
+    crosses entry * (1 -/+ stop_loss) or entry * (1 +/- take_profit) (stop
+    first when both are crossed), filled at that level or at the open when
+    the bar gaps through it, or at the close of the bar that completes
+    max_holding bars. The run stays flat afterwards until the signal changes.
+    stop_loss and take_profit are fractions of the entry price. Also returns
+    the fill price of every stop-loss or take-profit exit, NaN elsewhere.
+    """
+    signal = np.nan_to_num(np.asarray(signal, dtype=float), nan=0.0)
+    shape = signal.shape
+    signal = as_2d(signal)
+    close = np.asarray(close, dtype=float)
+    n = signal.shape[0]
+    rows = np.arange(n).reshape(-1, 1)
+
+    live = signal != 0
+    start = live.copy()
+    start[1:] &= signal[1:] != signal[:-1]
+    first = np.where(start, rows, 0)
+    np.maximum.accumulate(first, axis=0, out=first)
+    # entered at the close before the first bar of the run
+    entry = close[np.maximum(first - 1, 0)]
+    long = signal > 0
+
+    hit = np.zeros(signal.shape, dtype=bool)
+    fill = np.full(signal.shape, np.nan)
+    open = as_2d(close if open is None else open)
+    with np.errstate(invalid='ignore'):
+        if max_holding is not None:
+            hit |= live & (rows - first + 1 >= max_holding)
+        # later checks overwrite the fill, so the stop is applied last
+        if take_profit is not None:
+            upper = entry * (1 + take_profit)
+            lower = entry * (1 - take_profit)
+            crossed = live & np.where(long, as_2d(high) >= upper, as_2d(low) <= lower)
+            fill = np.where(crossed, np.where(long, np.maximum(open, upper), np.minimum(open, lower)), fill)
+            hit |= crossed
+        if stop_loss is not None:
+            upper = entry * (1 + stop_loss)
+            lower = entry * (1 - stop_loss)
+            crossed = live & np.where(long, as_2d(low) <= lower, as_2d(high) >= upper)
+            fill = np.where(crossed, np.where(long, np.minimum(open, lower), np.maximum(open, upper)), fill)
+            hit |= crossed
+
+    # exits strictly before each bar within its run
+    before = np.zeros(signal.shape, dtype=np.int32)
+    np.cumsum(hit[:-1], axis=0, out=before[1:])
+    before -= np.take_along_axis(before, first, axis=0)
+    keep = live & (before == 0)
+
+    signal = np.where(keep, signal, 0.0)
+    returns = strategy_returns(signal, log_returns)
+    previous = np.empty_like(close)
+    previous[0] = np.nan
+    previous[1:] = close[:-1]
+    exits = keep & hit & ~np.isnan(fill)
+    with np.errstate(divide='ignore', invalid='ignore'):
+        priced = signal * np.log(fill / as_2d(previous))
+    returns = np.where(exits, np.nan_to_num(priced, nan=0.0), returns)
+    fills = np.where(exits, fill, np.nan)
+    return signal.reshape(shape), returns.reshape(shape), fills.reshape(shape)
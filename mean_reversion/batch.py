@@ -0,0 +1,296 @@
+import argparse
+import contextlib
+import csv
+import json
+import math
+import os
+import sys
+from concurrent.futures import ProcessPoolExecutor, as_completed
+from .data_loader import DataLoader
+from .mean_reversion import Accounts, Hyperparameters
+from .sweep import Sweep, ParameterGrid
+
+"""
+Headless batch runner.
+
+Usage:
+    python batch.py spec.json --jobs 4 --output results.jsonl
+    python batch.py spec.json --jobs 4 --output results.csv --format csv --resume
+
+The spec is a JSON file:
+
+    {
+        "cash": 1000000,
+        "datasets": ["XAUUSD_h4.csv", {"symbol": "XAUUSD", "timeframe": "d1"}],
+        "grid": {"mean_period": [10, 20], "threshold": [1, 2], "side": ["long", "short"]},
+        "exits": {"stop_loss": 0.005, "take_profit": 0.01, "max_holding": 48}
+    }
+
+"grid" holds ParameterGrid arguments (missing keys use the defaults) and may
+be a list of grids. The optional "exits" apply the same risk exits to every
+config; they are written with each row and are part of its job id. Every dataset is run with every config. Configs are
+grouped per (dataset, calc_type, mean_period) so each worker task is one
+vectorized Sweep, and results are written one row per config as each task
+finishes. Each row carries a job id; --resume skips the ids already in the
+output file and appends the rest.
+
+Exit status: 0 when every job succeeded, 1 when any job failed, 2 for an
+invalid spec or arguments.
+"""
+
+EXIT_OK = 0
+EXIT_FAILED = 1
+EXIT_INVALID = 2
+
+
+def dataset_spec(dataset) -> dict:
+    if isinstance(dataset, str):
+        return {'file': dataset, 'timeframe': None}
+    return {'file': dataset.get('file'), 'symbol': dataset.get('symbol'), 'timeframe': dataset.get('timeframe')}
+
+
+def dataset_name(dataset:dict) -> str:
+    return dataset.get('file') or dataset.get('symbol')
+
+
+def canonical(value):
+    # 1, 1.0 and numpy scalars print the same, so grid and result ids match
+    value = value.item() if hasattr(value, 'item') else value
+    if isinstance(value, float) and value.is_integer():
+        return int(value)
+    return value
+
+
+def job_id(dataset:dict, config:tuple, exits:dict=None) -> str:
+    exits = tuple(f"{k}={canonical(v)}" for k, v in sorted((exits or {}).items()))
+    config = tuple(canonical(v) for v in config)
+    return "|".join(str(v) for v in (dataset_name(dataset), dataset.get('timeframe') or '') + config + exits)
+
+
+def load_spec(path:str) -> dict:
+    """
+    Returns the parsed spec, or None after printing the problem.
+    """
+    try:
+        with open(path) as f:
+            spec = json.load(f)
+    except (OSError, ValueError) as e:
+        print(f"Unable to read job spec {path}. {e}", file=sys.stderr)
+        return None
+
+    datasets = spec.get('datasets')
+    if not isinstance(datasets, list) or len(datasets) == 0:
+        print("Invalid job spec. 'datasets' must be a non-empty list.", file=sys.stderr)
+        return None
+    for dataset in datasets:
+        if not isinstance(dataset, (str, dict)) or (isinstance(dataset, dict) and dataset.get('file') is None and dataset.get('symbol') is None):
+            print(f"Invalid dataset in job spec. Value: {dataset}", file=sys.stderr)
+            return None
+
+    grids = spec.get('grid', {})
+    grids = grids if isinstance(grids, list) else [grids]
+    try:
+        grids = [ParameterGrid(**g) for g in grids]
+    except TypeError as e:
+        print(f"Invalid grid in job spec. {e}", file=sys.stderr)
+        return None
+
+    exits = spec.get('exits', {})
+    invalid = [k for k in exits if k not in ['stop_loss', 'take_profit', 'max_holding']] if isinstance(exits, dict) else [exits]
+    if len(invalid) > 0:
+        print(f"Invalid exits in job spec. Values: {invalid}, Valid: ['stop_loss', 'take_profit', 'max_holding']", file=sys.stderr)
+        return None
+    exits = {k: v for k, v in exits.items() if v is not None}
+
+    with contextlib.redirect_stdout(sys.stderr):
+        if not all(g.validate() for g in grids) or not Hyperparameters.valid_exits(**exits):
+            return None
+
+    return {'cash': spec.get('cash'), 'datasets': [dataset_spec(d) for d in datasets], 'grids': grids, 'exits': exits}
+
+
+def tasks(spec:dict) -> list:
+    # one task per (dataset, grid, calc_type, mean_period); each is a single Sweep
+    out = []
+    for dataset in spec['datasets']:
+        for grid in spec['grids']:
+            for calc in grid.calc_type:
+                for mp in grid.mean_period:
+                    partition = ParameterGrid(mean_period=[mp],
+                                              spread_mean_period=grid.spread_mean_period,
+                                              spread_sdev_period=grid.spread_sdev_period,
+                                              threshold=grid.threshold,
+                                              side=grid.side,
+                                              calc_type=[calc])
+                    out.append((dataset, partition))
+    return out
+
+
+class ResultWriter:
+    """
+    Appends result rows to a JSON lines or CSV file (or stdout), flushing
+    each row so a killed run can be resumed from what was written.
+    """
+
+    def __init__(self, path:str, format:str, resume:bool):
+        self.path = path
+        self.format = format
+        self.fields = None
+        self.done = set()
+
+        if path is None or path == '-':
+            self.file = sys.stdout
+            return
+
+        if resume and os.path.exists(path):
+            self.read_existing()
+        self.file = open(path, 'a' if resume else 'w', newline='')
+
+    def read_existing(self):
+        with open(self.path, 'rb+') as f:
+            # drop a partially written last row
+            content = f.read()
+            end = content.rfind(b'\n') + 1
+            if end < len(content):
+                f.truncate(end)
+
+        with open(self.path, newline='') as f:
+            if self.format == 'csv':
+                reader = csv.DictReader(f)
+                self.fields = reader.fieldnames
+                self.done = {row['job'] for row in reader}
+            else:
+                for line in f:
+                    try:
+                        self.done.add(json.loads(line)['job'])
+                    except (ValueError, KeyError):
+                        continue
+
+    def write(self, row:dict):
+        if self.format == 'csv':
+            if self.fields is None:
+                self.fields = list(row.keys())
+                csv.writer(self.file).writerow(self.fields)
+            csv.DictWriter(self.file, self.fields, extrasaction='ignore').writerow(row)
+        else:
+            self.file.write(json.dumps(row) + '\n')
+        self.file.flush()
+
+    def close(self):
+        if self.file is not sys.stdout:
+            self.file.close()
+
+
+_worker = {}
+
+
+def _load(dataset:dict):
+    # datasets are loaded once per worker process
+    key = (dataset.get('file'), dataset.get('symbol'), dataset.get('timeframe'))
+    if key not in _worker:
+        dl = DataLoader()
+        if dataset.get('file') is not None:
+            _worker[key] = dl.load_data(dataset['file'], timeframe=dataset.get('timeframe'))
+        elif dataset.get('timeframe') is not None:
+            _worker[key] = dl.load_timeframe(dataset['symbol'], dataset['timeframe'])
+        else:
+            file = dl.base_file(dataset['symbol'])
+            _worker[key] = dl.load_data(file) if file is not None else None
+    return _worker[key]
+
+
+def _run_task(dataset:dict, grid:ParameterGrid, cash, done:set, exits:dict=None) -> list:
+    # DataLoader and Sweep report problems on stdout, which may be the output stream
+    with contextlib.redirect_stdout(sys.stderr):
+        data = _load(dataset)
+        if data is None:
+            raise ValueError(f"Unable to load dataset {dataset_name(dataset)}")
+        results = Sweep(data.copy(deep=False), grid, Accounts(cash), **(exits or {})).run()
+    if results is None:
+        raise ValueError(f"Sweep failed for dataset {dataset_name(dataset)}")
+
+    rows = []
+    for record in results.to_dict('records'):
+        config = tuple(record[k] for k in ParameterGrid.keys)
+        job = job_id(dataset, config, exits)
+        if job in done:
+            continue
+        row = {'job': job, 'dataset': dataset_name(dataset), 'timeframe': dataset.get('timeframe'), **(exits or {})}
+        for k, v in record.items():
+            v = v.item() if hasattr(v, 'item') else v
+            row[k] = None if isinstance(v, float) and math.isnan(v) else v
+        rows.append(row)
+    return rows
+
+
+def run(spec:dict, writer:ResultWriter, jobs:int=1) -> int:
+    cash = Accounts(spec['cash']).cash
+    exits = spec.get('exits', {})
+    pending = []
+    for dataset, grid in tasks(spec):
+        ids = {job_id(dataset, c, exits) for c in grid.combinations()}
+        if not ids <= writer.done:
+            pending.append((dataset, grid, cash, ids & writer.done, exits))
+
+    written = 0
+    failed = 0
+
+    def collect(task, result=None, error=None):
+        nonlocal written, failed
+        if error is not None:
+            failed += len(task[1])
+            print(f"Job failed. Dataset: {dataset_name(task[0])}, Configs: {len(task[1])}. {error}", file=sys.stderr)
+            return
+        for row in result:
+            writer.write(row)
+        written += len(result)
+
+    if jobs <= 1:
+        for task in pending:
+            try:
+                collect(task, _run_task(*task))
+            except Exception as e:
+                collect(task, error=e)
+    else:
+        with ProcessPoolExecutor(max_workers=jobs) as executor:
+            futures = {executor.submit(_run_task, *task): task for task in pending}
+            for future in as_completed(futures):
+                try:
+                    collect(futures[future], future.result())
+                except Exception as e:
+                    collect(futures[future], error=e)
+
+    print(f"Jobs written: {written}, skipped: {len(writer.done)}, failed: {failed}", file=sys.stderr)
+    return EXIT_FAILED if failed > 0 else EXIT_OK
+
+
+def main(argv=None) -> int:
+    parser = argparse.ArgumentParser(description='Mean Reversion batch backtests')
+    parser.add_argument('spec', help='job spec JSON file')
+    parser.add_argument('--jobs', type=int, default=os.cpu_count(), help='worker processes')
+    parser.add_argument('--output', default='-', help='results file, - for stdout')
+    parser.add_argument('--format', choices=['jsonl', 'csv'], default=None, help='defaults to the output file extension')
+    parser.add_argument('--resume', action='store_true', help='skip jobs already in the output file')
+    args = parser.parse_args(argv)
+
+    format = args.format or ('csv' if args.output.endswith('.csv') else 'jsonl')
+    if args.resume and args.output == '-':
+        print("--resume requires an --output file.", file=sys.stderr)
+        return EXIT_INVALID
+    if args.jobs < 1:
+        print(f"Invalid --jobs. Value must be greater than 0. Value: {args.jobs}", file=sys.stderr)
+        return EXIT_INVALID
+
+    spec = load_spec(args.spec)
+    if spec is None:
+        return EXIT_INVALID
+
+    writer = ResultWriter(args.output, format, args.resume)
+    try:
+        return run(spec, writer, args.jobs)
+    finally:
+        writer.close()
+
+
+if __name__ == "__main__":
+    sys.exit(main())
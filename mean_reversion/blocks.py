@@ -0,0 +1,210 @@
+import numpy as np
+from . import arrays
+from .streaming import EWMMean, EWMStd
+from .mean_reversion import Hyperparameters, Side, RollingCalculationType
+
+"""
+Block-wise counterpart of MeanReversion.build_model.
+
+The estimators consume a block of bars at a time with vectorized pandas/NumPy
+operations and carry their state to the next block, so a series can be
+processed in bounded memory while matching the full in-memory calculation.
+"""
+
+
+def block_weights(factor:float, n:int, cache:dict):
+    # decay factor^(j+1) of the carried state and the closed form block weight sums;
+    # blocks usually share one length so the arrays are computed once per estimator
+    if n not in cache:
+        decay = factor ** np.arange(1, n + 1)
+        if factor > 0:
+            local_wt = (1 - decay) / (1 - factor)
+            local_wt2 = (1 - decay ** 2) / (1 - factor ** 2)
+        else:
+            local_wt = local_wt2 = np.ones(n)
+        cache.clear()
+        cache[n] = (decay, local_wt, local_wt2)
+    return cache[n]
+
+
+class BlockEWMMean(EWMMean):
+    # carries the streaming EWMMean state (weighted mean, sum of weights) across blocks
+
+    def __init__(self, span:int):
+        super().__init__(span)
+        self.weights = {}
+
+    def update_block(self, values):
+        values = np.asarray(values, dtype=float)
+        out = np.empty(len(values))
+        start = 0
+        if self.weighted != self.weighted:
+            valid = np.flatnonzero(values == values)
+            start = valid[0] if len(valid) > 0 else len(values)
+            out[:start] = np.nan
+            if start == len(values):
+                return out
+
+        block = values[start:]
+        if np.isnan(block).any():
+            # interior gaps change the weights; fall back to the per-bar update
+            for i, v in enumerate(block):
+                out[start + i] = self.update(v)
+            return out
+
+        # pandas gives the block-local mean; the carried weights decay by factor^(j+1)
+        decay, local_wt, _ = block_weights(self.factor, len(block), self.weights)
+        local_mean = arrays.frame(block).ewm(span=self.span).mean().to_numpy()
+
+        started = self.weighted == self.weighted
+        carried_wt = decay * self.old_wt if started else 0
+        carried_sum = decay * (self.weighted * self.old_wt) if started else 0
+        total_wt = carried_wt + local_wt
+        out[start:] = (carried_sum + local_mean * local_wt) / total_wt
+
+        self.weighted = out[-1]
+        self.old_wt = total_wt[-1]
+        return out
+
+
+class BlockEWMStd(EWMStd):
+    # carries the streaming EWMStd state (mean, biased variance, weight sums) across blocks
+
+    def __init__(self, span:int):
+        super().__init__(span)
+        self.weights = {}
+
+    def update_block(self, values):
+        values = np.asarray(values, dtype=float)
+        out = np.empty(len(values))
+        start = 0
+        if self.mean != self.mean:
+            valid = np.flatnonzero(values == values)
+            start = valid[0] if len(valid) > 0 else len(values)
+            out[:start] = np.nan
+            if start == len(values):
+                return out
+
+        block = values[start:]
+        if np.isnan(block).any():
+            for i, v in enumerate(block):
+                out[start + i] = self.update(v)
+            return out
+
+        decay, local_wt, local_wt2 = block_weights(self.factor, len(block), self.weights)
+
+        ewm = arrays.frame(block).ewm(span=self.span)
+        local_mean = ewm.mean().to_numpy()
+        local_var = np.nan_to_num(ewm.var(bias=True).to_numpy(), nan=0.0)
+
+        sum_x = local_mean * local_wt
+        sum_xx = (local_var + local_mean ** 2) * local_wt
+        sum_wt = local_wt
+        sum_wt2 = local_wt2
+        if self.mean == self.mean:
+            sum_x = sum_x + decay * (self.mean * self.old_wt)
+            sum_xx = sum_xx + decay * ((self.cov + self.mean ** 2) * self.old_wt)
+            sum_wt = sum_wt + decay * self.sum_wt
+            sum_wt2 = sum_wt2 + decay * decay * self.sum_wt2
+
+        mean = sum_x / sum_wt
+        cov = np.maximum(sum_xx / sum_wt - mean ** 2, 0)
+        numerator = sum_wt * sum_wt
+        denominator = numerator - sum_wt2
+        with np.errstate(divide='ignore', invalid='ignore'):
+            out[start:] = np.where(denominator > 0, np.sqrt(numerator / denominator * cov), np.nan)
+
+        self.mean = mean[-1]
+        self.cov = cov[-1]
+        self.sum_wt = sum_wt[-1]
+        self.sum_wt2 = sum_wt2[-1]
+        self.old_wt = sum_wt[-1]
+        return out
+
+
+class BlockRolling:
+    # keeps the last period - 1 values so each block sees its full trailing windows
+
+    def __init__(self, period:int, std:bool=False):
+        self.period = period
+        self.std = std
+        self.tail = np.empty(0)
+
+    def update_block(self, values):
+        values = np.concatenate([self.tail, np.asarray(values, dtype=float)])
+        rolling = arrays.frame(values).rolling(self.period)
+        out = (rolling.std() if self.std else rolling.mean()).to_numpy()[len(self.tail):]
+        self.tail = values[len(values) - min(self.period - 1, len(values)):]
+        return out
+
+
+class BlockModel:
+    """
+    Consumes close prices block by block and returns the strategy returns for
+    each block, carrying the indicator, position and previous close state.
+    """
+
+    def __init__(self, hyperparameters:Hyperparameters, dtype=np.float64):
+        if hyperparameters.exits():
+            # exits need high/low bars and an entry price this model does not track
+            raise ValueError(f"Invalid risk exits. BlockModel does not support stop_loss, take_profit or max_holding. Values: {hyperparameters.exits()}")
+        self.hyperparameters = hyperparameters
+        self.dtype = np.dtype(dtype)
+
+        self.tpl_side = Side()
+        self.tpl_calc = RollingCalculationType()
+
+        hp = self.hyperparameters
+        if hp.calc_type == self.tpl_calc.calculation_exponential:
+            self.mean = BlockEWMMean(hp.mean_period)
+            self.spread_mu = BlockEWMMean(hp.spread_mean_period)
+            self.spread_sigma = BlockEWMStd(hp.spread_sdev_period)
+        else:
+            self.mean = BlockRolling(hp.mean_period)
+            self.spread_mu = BlockRolling(hp.spread_mean_period)
+            self.spread_sigma = BlockRolling(hp.spread_sdev_period, std=True)
+
+        self.last_close = np.nan
+        self.long_pos = 0.0
+        self.short_pos = 0.0
+        self.signal = 0.0
+
+    def update(self, close):
+        close = np.asarray(close, dtype=self.dtype)
+        hp = self.hyperparameters
+
+        spread = np.subtract(close, self.mean.update_block(close), dtype=self.dtype)
+        z_score = np.subtract(spread, self.spread_mu.update_block(spread), dtype=self.dtype)
+        np.divide(z_score, self.spread_sigma.update_block(spread), out=z_score, casting='same_kind')
+        del spread
+
+        position = np.zeros(len(close), dtype=self.dtype)
+        with np.errstate(invalid='ignore'):
+            if hp.side != self.tpl_side.side_short:
+                long_pos = arrays.ffill_positions(z_score < -hp.threshold, z_score >= 0, 1, self.dtype, initial=self.long_pos)
+                self.long_pos = float(long_pos[-1])
+                position += long_pos
+                del long_pos
+            if hp.side != self.tpl_side.side_long:
+                short_pos = arrays.ffill_positions(z_score > hp.threshold, z_score <= 0, -1, self.dtype, initial=self.short_pos)
+                self.short_pos = float(short_pos[-1])
+                position += short_pos
+                del short_pos
+        del z_score
+
+        # signal[t] = position[t-1]; the first bar takes the position carried from the previous block
+        signal = np.empty_like(position)
+        signal[0] = self.signal
+        signal[1:] = position[:-1]
+        self.signal = float(position[-1])
+        del position
+
+        returns = np.empty_like(close)
+        returns[0] = np.log(close[0] / self.last_close) if self.last_close == self.last_close else np.nan
+        np.divide(close[1:], close[:-1], out=returns[1:])
+        np.log(returns[1:], out=returns[1:])
+        returns *= signal
+        np.nan_to_num(returns, nan=0.0, copy=False)
+
+        self.last_close = close[-1]
+        return returns
@@ -0,0 +1,109 @@
+import os
+import numpy as np
+from concurrent.futures import ProcessPoolExecutor
+from .metrics import MetricsAccumulator
+
+"""
+Monte Carlo robustness of a return series.
+
+The strategy returns are resampled with a moving block bootstrap (fixed
+length blocks) or a stationary bootstrap (geometric block lengths, Politis
+and Romano), which keeps the short-range dependence of the returns. Samples
+are drawn and scored in chunks of samples x bars arrays so memory stays
+bounded, each chunk with its own generator spawned from one SeedSequence;
+for a given seed and memory budget the results do not depend on the number
+of worker processes.
+"""
+
+
+class Bootstrap:
+
+    statistics = ['net_returns_percent', 'final_equity', 'max_drawdown', 'sharpe_annual']
+
+    def __init__(self,
+                 strategy_returns,
+                 cash,
+                 samples:int=10000,
+                 block_size:int=None,
+                 method:str='stationary',
+                 seed:int=None,
+                 max_bytes:int=64 * 2**20,
+                 max_workers:int=1):
+        self.returns = np.nan_to_num(np.asarray(strategy_returns, dtype=float), nan=0.0)
+        self.cash = cash
+        self.samples = samples
+        # cube root of the series length unless given
+        self.block_size = block_size if block_size is not None else max(1, int(round(len(self.returns) ** (1 / 3))))
+        self.method = method
+        self.seed = seed
+        # a chunk holds about five samples x bars arrays (draws, indices, returns, equity)
+        self.chunk_size = max(1, max_bytes // (40 * max(len(self.returns), 1)))
+        self.max_workers = max_workers if max_workers is not None else os.cpu_count()
+
+        self.results = None
+
+    def run(self) -> dict:
+        """
+        Returns {statistic: array of one value per sample}.
+        """
+        if self.method not in ['stationary', 'block']:
+            print(f"Invalid Bootstrap Method. Value: {self.method}, Valid: ['stationary', 'block']")
+            return None
+
+        sizes = [min(self.chunk_size, self.samples - start) for start in range(0, self.samples, self.chunk_size)]
+        seeds = np.random.SeedSequence(self.seed).spawn(len(sizes))
+        tasks = [(self.returns, self.cash, size, self.block_size, self.method, seed) for size, seed in zip(sizes, seeds)]
+
+        if self.max_workers <= 1 or len(tasks) == 1:
+            chunks = [_run_chunk(*task) for task in tasks]
+        else:
+            with ProcessPoolExecutor(max_workers=min(self.max_workers, len(tasks))) as executor:
+                chunks = list(executor.map(_run_chunk, *zip(*tasks)))
+
+        self.results = {k: np.concatenate([c[k] for c in chunks]) for k in self.statistics}
+        return self.results
+
+    def intervals(self, confidence:float=0.95) -> dict:
+        # percentile confidence interval of each statistic, {statistic: (lower, upper)}
+        if self.results is None:
+            self.run()
+        tail = (1 - confidence) / 2 * 100
+        return {k: tuple(np.nanpercentile(v, [tail, 100 - tail])) for k, v in self.results.items()}
+
+
+def resample_indices(rng, samples:int, bars:int, block_size:int, method:str):
+    # samples x bars indices into the original series
+    if method == 'block':
+        blocks = -(-bars // block_size)
+        starts = rng.integers(0, max(bars - block_size, 0) + 1, size=(samples, blocks))
+        indices = (starts[:, :, None] + np.arange(block_size)).reshape(samples, -1)[:, :bars]
+        return np.minimum(indices, bars - 1)
+
+    # stationary: a new block starts with probability 1 / block_size and wraps around the series
+    new_block = rng.random((samples, bars), dtype=np.float32) < 1 / block_size
+    new_block[:, 0] = True
+    position = np.arange(bars)
+    begin = np.where(new_block, position, 0)
+    np.maximum.accumulate(begin, axis=1, out=begin)
+
+    # each bar continues from the random start of its block
+    starts = np.zeros((samples, bars), dtype=np.int64)
+    starts[new_block] = rng.integers(0, bars, size=int(new_block.sum()))
+    del new_block
+    indices = np.take_along_axis(starts, begin, axis=1)
+    indices += position
+    indices -= begin
+    indices %= bars
+    return indices
+
+
+def _run_chunk(returns, cash, samples:int, block_size:int, method:str, seed) -> dict:
+    rng = np.random.default_rng(seed)
+    indices = resample_indices(rng, samples, len(returns), block_size, method)
+    resampled = returns[indices.T]
+    del indices
+
+    accumulator = MetricsAccumulator(cash)
+    accumulator.update(resampled, keep_equity=False)
+    values = accumulator.to_dict()
+    return {k: values[k] for k in Bootstrap.statistics}
@@ -0,0 +1,161 @@
+import json
+import os
+import shutil
+import numpy as np
+import pandas as pd
+
+"""
+Binary on-disk cache for parsed CSV frames.
+
+Each source file gets a directory holding one .npy per column plus the
+index, and a meta.json keyed by the source path, size and mtime. Cached
+columns are memory-mapped on load, and any change to the source file
+invalidates its entry. Frames derived from a file (e.g. resampled
+timeframes) are stored as named views next to it under the same key.
+
+The index is stored as int64 timestamps, so a date window is located by
+binary search over its memory map and only the rows of the window are
+read from the column files.
+"""
+
+
+class DataCache:
+
+    meta_file = 'meta.json'
+    # bumped when parsing changes, so entries written by older code are re-parsed
+    version = 5
+
+    def __init__(self, directory:str):
+        self.directory = directory
+
+    def entry(self, path:str, view:str=None) -> str:
+        name = os.path.basename(path) if view is None else f"{os.path.basename(path)}@{view}"
+        return os.path.join(self.directory, name)
+
+    @staticmethod
+    def key(path:str) -> dict:
+        stat = os.stat(path)
+        return {'path': os.path.abspath(path), 'size': stat.st_size, 'mtime_ns': stat.st_mtime_ns}
+
+    def load(self, path:str, view:str=None, start=None, end=None):
+        # start and end select an inclusive date window
+        entry = self.entry(path, view)
+        try:
+            with open(os.path.join(entry, self.meta_file)) as f:
+                meta = json.load(f)
+        except (OSError, ValueError):
+            return None
+
+        if meta.get('key') != self.key(path) or meta.get('version') != self.version:
+            return None
+
+        try:
+            # copy-on-write maps keep the frame writable without touching the cache
+            index = np.load(os.path.join(entry, 'index.npy'), mmap_mode='c').view(meta['index_dtype'])
+            rows = slice(None) if start is None and end is None else self.window(index, meta['sorted'], start, end, meta['index_tz'])
+            index = index[rows]
+            columns = {c: np.load(os.path.join(entry, f"{i}.npy"), mmap_mode='c')[rows] for i, c in enumerate(meta['columns'])}
+            for i in meta['missing']:
+                # text columns are stored as strings with a mask of their missing values
+                c = meta['columns'][i]
+                columns[c] = columns[c].astype(object)
+                columns[c][np.load(os.path.join(entry, f"{i}.missing.npy"))[rows]] = np.nan
+        except (OSError, ValueError):
+            return None
+
+        index = pd.Index(index, name=meta['index_name'], copy=False)
+        if meta['index_tz'] is not None:
+            index = index.tz_localize('UTC').tz_convert(meta['index_tz'])
+        return pd.DataFrame(columns, index=index, copy=False)
+
+    @staticmethod
+    def window(index:np.ndarray, is_sorted:bool, start=None, end=None, tz:str=None):
+        """
+        Rows of index between start and end (inclusive, either may be None):
+        a slice found by binary search when the index is sorted, otherwise
+        a boolean mask. tz is the time zone of an index held as naive UTC
+        times; naive bounds are taken in that zone.
+        """
+        if np.issubdtype(index.dtype, np.datetime64):
+            unit = np.datetime_data(index.dtype)[0]
+
+            def bound(value):
+                value = pd.Timestamp(value)
+                if tz is not None:
+                    value = value.tz_localize(tz) if value.tz is None else value
+                    value = value.tz_convert('UTC').tz_localize(None)
+                return value.as_unit(unit).to_datetime64()
+
+            start = bound(start) if start is not None else None
+            end = bound(end) if end is not None else None
+
+        if is_sorted:
+            lo = int(np.searchsorted(index, start, side='left')) if start is not None else 0
+            hi = int(np.searchsorted(index, end, side='right')) if end is not None else len(index)
+            return slice(lo, max(lo, hi))
+
+        mask = np.ones(len(index), dtype=bool)
+        if start is not None:
+            mask &= index >= start
+        if end is not None:
+            mask &= index <= end
+        return mask
+
+    def store(self, path:str, df:pd.DataFrame, view:str=None) -> bool:
+        # frames the cache cannot hold are still returned by the loader, just not cached
+        try:
+            self.write(path, df, view)
+        except (OSError, TypeError, ValueError) as e:
+            shutil.rmtree(f"{self.entry(path, view)}.tmp", ignore_errors=True)
+            print(f"Unable to write cache for {path}. {e}")
+            return False
+        return True
+
+    def write(self, path:str, df:pd.DataFrame, view:str=None):
+        entry = self.entry(path, view)
+        tmp = f"{entry}.tmp"
+        shutil.rmtree(tmp, ignore_errors=True)
+        os.makedirs(tmp)
+
+        tz = None
+        if isinstance(df.index, pd.DatetimeIndex) and df.index.tz is not None:
+            # tz-aware times are stored as naive UTC
+            tz = str(df.index.tz)
+            index = df.index.tz_convert('UTC').tz_localize(None).to_numpy()
+        else:
+            index = df.index.to_numpy()
+        if index.dtype.kind not in 'Miuf' or index.dtype.itemsize != 8:
+            raise TypeError(f"Unsupported index dtype: {df.index.dtype}")
+        np.save(os.path.join(tmp, 'index.npy'), index.view('i8'))
+
+        missing = []
+        for i, c in enumerate(df.columns):
+            values = df[c].to_numpy()
+            if values.dtype == object:
+                isna = pd.isna(values)
+                if isna.any():
+                    np.save(os.path.join(tmp, f"{i}.missing.npy"), isna)
+                    missing.append(i)
+                values = np.where(isna, '', values).astype(str)
+            elif values.dtype.hasobject or values.dtype.kind not in 'biufcmMU':
+                raise TypeError(f"Unsupported dtype for column {c}: {df[c].dtype}")
+            np.save(os.path.join(tmp, f"{i}.npy"), values)
+
+        meta = {
+            'key': self.key(path),
+            'version': self.version,
+            'columns': list(df.columns),
+            'index_name': df.index.name,
+            'index_dtype': index.dtype.str,
+            'index_tz': tz,
+            'missing': missing,
+            'sorted': bool(np.all(index[1:] >= index[:-1])),
+        }
+        with open(os.path.join(tmp, self.meta_file), 'w') as f:
+            json.dump(meta, f)
+
+        shutil.rmtree(entry, ignore_errors=True)
+        os.replace(tmp, entry)
+
+    def clear(self):
+        shutil.rmtree(self.directory, ignore_errors=True)
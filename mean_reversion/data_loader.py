@@ -1,16 +1,210 @@
+import numpy as np
 import pandas as pd
 import os
+import re
+from .cache import DataCache
+from .profiling import stage, timed
+
+"""
+Timeframes are written as a unit and a count, e.g. m15, h1, h4, d1, w1, and
+appear as the suffix of file names (XAUUSD_h1.csv). Higher timeframes are
+derived from the finest file of a symbol by OHLC aggregation.
+
+Text columns holding suffixed numbers (118.16K, 3.99M) or percentages
+(1.99%, stored as the fraction 0.0199) are parsed to floats on load.
+"""
+
+TIMEFRAME_UNITS = {'m': 'min', 'h': 'h', 'd': 'D', 'w': 'W'}
+
+AGGREGATION = {'open': 'first', 'high': 'max', 'low': 'min', 'close': 'last', 'volume': 'sum', 'vol.': 'sum', 'spread': 'max'}
+
+NUMBER_SUFFIXES = {'K': 3, 'M': 6, 'B': 9, 'T': 12, '%': -2}
+
+
+def timeframe_offset(timeframe:str):
+    match = re.fullmatch(r'([mhdw])(\d+)', str(timeframe).lower())
+    if match is None:
+        return None
+    unit, count = match.groups()
+    if unit == 'w':
+        return pd.Timedelta(weeks=int(count))
+    return pd.Timedelta(f"{count}{TIMEFRAME_UNITS[unit]}")
+
+
+def resample(df:pd.DataFrame, timeframe:str) -> pd.DataFrame:
+    """
+    Aggregates bars into the given timeframe. Columns without a rule (e.g.
+    daily change) are dropped, as are bins without any bar.
+    """
+    if timeframe_offset(timeframe) is None:
+        print(f"Invalid Timeframe. Value: {timeframe}, Valid: e.g. m15, h1, h4, d1, w1")
+        return None
+
+    unit, count = timeframe[0].lower(), timeframe[1:]
+    rule = f"{count}{TIMEFRAME_UNITS[unit]}" if unit != 'w' else f"{count}W-SUN"
+    columns = [c for c in df.columns if c.lower() in AGGREGATION and pd.api.types.is_numeric_dtype(df[c])]
+    resampled = df[columns].resample(rule).agg({c: AGGREGATION[c.lower()] for c in columns})
+    close = [c for c in columns if c.lower() == 'close']
+    return resampled.dropna(subset=close if len(close) > 0 else None, how='all')
+
+
+def parse_numeric(values:pd.Series, strict:bool=True) -> pd.Series:
+    """
+    Converts a text column of numbers with an optional K/M/B/T or % suffix
+    and thousands separators (groups of three integer digits) to floats. '-' and blanks become NaN. Returns
+    None when any other value is not a plain decimal number, or with
+    strict=False turns those values into NaN.
+
+    The strings are read as a bars x characters array of code points and
+    the digits are accumulated one character column at a time, so the cost
+    is a few array operations per character rather than per value. The
+    mantissa is scaled by one power of ten, which rounds like float().
+    """
+    text = np.char.strip(values.to_numpy(dtype=object).astype(str))
+    n = len(text)
+    blank = (text == '') | (text == '-') | (text == 'nan')
+    if text.dtype.itemsize == 0 or blank.all():
+        return pd.Series(np.nan, index=values.index)
+
+    # characters x values, so each character column is contiguous
+    codes = np.ascontiguousarray(text.view(np.uint32).reshape(n, -1).T, dtype=np.int32)
+    length = np.char.str_len(text)
+
+    # suffix -> power of ten
+    last = codes[np.maximum(length - 1, 0), np.arange(n)]
+    exponent = np.zeros(n, dtype=np.int64)
+    for suffix, power in NUMBER_SUFFIXES.items():
+        exponent[(last == ord(suffix)) | (last == ord(suffix.lower()))] = power
+    suffixed = np.flatnonzero(exponent != 0)
+    codes[length[suffixed] - 1, suffixed] = 0
+
+    negative = codes[0] == ord('-')
+    codes[0, negative | (codes[0] == ord('+'))] = 0
+
+    mantissa = np.zeros(n, dtype=np.int64)
+    digits = np.zeros(n, dtype=np.int64)
+    decimals = np.zeros(n, dtype=np.int64)
+    dots = np.zeros(n, dtype=np.int64)
+    commas = np.zeros(n, dtype=np.int64)
+    # integer digits since the last separator
+    group = np.zeros(n, dtype=np.int64)
+    valid = np.ones(n, dtype=bool)
+    separated = bool((codes == 44).any())
+    for c in codes:
+        digit = (c >= 48) & (c <= 57)
+        comma = c == 44
+        dot = c == 46
+        mantissa = np.where(digit, mantissa * 10 + (c - 48), mantissa)
+        digits += digit
+        decimals += digit & (dots > 0)
+        if separated:
+            # a separator follows 1-3 leading digits or a full group of 3, and the
+            # integer part may not end in a partial group
+            valid &= ~comma | ((dots == 0) & ((group == 3) | ((commas == 0) & (group >= 1) & (group <= 3))))
+            valid &= ~dot | (commas == 0) | (group == 3)
+            group = np.where(comma, 0, group + (digit & (dots == 0)))
+            commas += comma
+        dots += dot
+        valid &= digit | dot | comma | (c == 0)
+
+    valid &= (commas == 0) | (dots > 0) | (group == 3)
+    valid &= (dots <= 1) & (digits > 0) & (digits <= 15)
+    if strict and not (valid | blank).all():
+        return None
+
+    power = exponent - decimals
+    with np.errstate(over='ignore'):
+        numbers = np.where(power >= 0, mantissa * 10.0 ** np.maximum(power, 0), mantissa / 10.0 ** np.maximum(-power, 0))
+    numbers[negative] *= -1
+    numbers[blank | ~valid] = np.nan
+    return pd.Series(numbers, index=values.index)
+
+
+def window(df:pd.DataFrame, start=None, end=None) -> pd.DataFrame:
+    # rows of df between start and end (inclusive), without copying when the index is sorted
+    if df is None or (start is None and end is None):
+        return df
+    index, tz = df.index, None
+    if isinstance(index, pd.DatetimeIndex) and index.tz is not None:
+        index, tz = index.tz_convert('UTC').tz_localize(None), str(index.tz)
+    rows = DataCache.window(index.to_numpy(), df.index.is_monotonic_increasing, start, end, tz)
+    return df.iloc[rows] if isinstance(rows, slice) else df[rows]
+
 
 class DataLoader:
+
+    # resampled views shared by every loader, keyed by source file and view, one entry
+    # per key holding the file stamp it was built from
+    views = {}
     
-    def __init__(self):
+    def __init__(self, use_cache:bool=True, columns:list=None, date_format:str=None, float32:bool=False):
+        """
+        columns limits loading to the given columns (besides the date), e.g.
+        ['close']. date_format is a strptime format for the dates (e.g.
+        '%Y-%m-%d %H:%M:%S'), inferred when None. float32 downcasts the float
+        columns, halving their memory. Frames loaded with these options are
+        cached separately from the full frames.
+        """
         self.directory = 'data/' if not os.path.isdir('../data/') else '../data/'
+        self.use_cache = use_cache
+        self.cache = DataCache(os.path.join(self.directory, '.cache'))
+        self.columns = [c.lower() for c in columns] if columns is not None else None
+        self.date_format = date_format
+        self.float32 = float32
+
+    def view(self, timeframe:str=None) -> str:
+        # cache view name of the loader options (and timeframe), None for full frames
+        parts = [timeframe] if timeframe is not None else []
+        if self.columns is not None:
+            parts.append('-'.join(sorted(self.columns)))
+        if self.float32:
+            parts.append('f32')
+        return '+'.join(parts) if len(parts) > 0 else None
 
     def files(self):
         path = os.path.join(self.directory)
-        return os.listdir(path)
+        return [f for f in os.listdir(path) if os.path.isfile(os.path.join(path, f))]
+
+    def symbols(self) -> dict:
+        # {symbol: {timeframe: file}} for files named <symbol>_<timeframe>.csv
+        symbols = {}
+        for file in sorted(self.files()):
+            match = re.fullmatch(r'(.+)_([mhdwMHDW]\d+)\.csv', file)
+            if match is not None and timeframe_offset(match.group(2)) is not None:
+                symbols.setdefault(match.group(1), {})[match.group(2).lower()] = file
+        return symbols
+
+    def base_file(self, symbol:str) -> str:
+        # finest timeframe available for the symbol
+        timeframes = self.symbols().get(symbol)
+        if timeframes is None:
+            print(f"Symbol: {symbol} not found in directory.")
+            return None
+        return timeframes[min(timeframes, key=timeframe_offset)]
 
-    def load_data(self, file:str):
+    def load_timeframe(self, symbol:str, timeframe:str):
+        """
+        Loads a symbol in any timeframe at or above its finest file, resampled
+        from that file.
+        """
+        file = self.base_file(symbol)
+        if file is None:
+            return None
+        base = file[len(symbol) + 1:-len('.csv')]
+        offset = timeframe_offset(timeframe)
+        if offset is not None and offset < timeframe_offset(base):
+            print(f"Timeframe: {timeframe} is finer than the finest file for {symbol} ({file}).")
+            return None
+        return self.load_data(file, timeframe=None if offset == timeframe_offset(base) else timeframe)
+
+    @timed('load_data')
+    def load_data(self, file:str, timeframe:str=None, start=None, end=None):
+        """
+        start and end (anything pd.Timestamp accepts, inclusive, either may
+        be None) load only a date window. A cached file is binary searched on
+        its memory-mapped index and only the window's rows are read, so the
+        cost follows the size of the window rather than the file.
+        """
         if file not in os.listdir(self.directory):
             print(f"File: {file} not found in directory.")
             return None 
@@ -19,17 +213,164 @@ class DataLoader:
             file = f"{file}.csv"
         path = os.path.join(self.directory, file)
 
+        if timeframe is not None:
+            return window(self.load_view(path, timeframe.lower()), start, end)
+
+        if self.use_cache:
+            with stage('load_data.cache'):
+                df = self.cache.load(path, view=self.view(), start=start, end=end)
+            if df is not None:
+                return df
+
+        df = self.parse(path)
+        if df is not None and self.use_cache:
+            with stage('load_data.cache_store'):
+                self.cache.store(path, df, view=self.view())
+        return window(df, start, end)
+
+    def load_view(self, path:str, timeframe:str):
+        # resampled views are cached in memory and on disk next to their source file
+        view = self.view(timeframe)
+        key = (os.path.abspath(path), view)
+        stamp = tuple(DataCache.key(path).values())
+        if key in self.views and self.views[key][0] == stamp:
+            return self.views[key][1].copy(deep=False)
+
+        df = self.cache.load(path, view=view) if self.use_cache else None
+        if df is None:
+            base = self.load_data(os.path.basename(path))
+            df = resample(base, timeframe) if base is not None else None
+            if df is None:
+                return None
+            if self.use_cache:
+                self.cache.store(path, df, view=view)
+
+        # replaces the view of an older version of the file
+        self.views[key] = (stamp, df)
+        return df.copy(deep=False)
+
+    def parse(self, path:str):
         try:
-            df = pd.read_csv(path)
+            usecols = self.usecols(path)
+            if usecols is False:
+                return None
+            with stage('load_data.read_csv'):
+                df = pd.read_csv(path, usecols=usecols)
         except:
             print("Error reading file. Ensure that correct filename is selected.")
             return None 
-        
+        return self.prepare(df)
+
+    def usecols(self, path:str):
+        # source columns to read, None for all, False when a requested column is missing
+        if self.columns is None:
+            return None
+        wanted = set(self.columns) | {'date'}
+        header = pd.read_csv(path, nrows=0).columns
+        usecols = [c for c in header if c.lower() in wanted]
+        missing = wanted - {c.lower() for c in usecols}
+        if len(missing) > 0:
+            print(f"Error. Columns not found in file. Values: {sorted(missing)}")
+            return False
+        return usecols
+
+    def prepare(self, df:pd.DataFrame, dtypes:dict=None):
+        # dtypes fixes the column types (those of a previous chunk); text is then parsed leniently to float columns
         df.columns = [c.lower() for c in df.columns]
         if 'date' not in df.columns:
             print("Error. Date column not found.")
             return None 
         
         df = df.set_index('date',drop=True)
-        df.index = pd.to_datetime(df.index)
-        return df
\ No newline at end of file
+        try:
+            with stage('load_data.datetime'):
+                df.index = pd.to_datetime(df.index, format=self.date_format)
+        except ValueError as e:
+            print(f"Error parsing dates. Format: {self.date_format}. {e}")
+            return None
+
+        with stage('load_data.numeric'):
+            for c in df.columns:
+                target = dtypes.get(c) if dtypes is not None else None
+                text = df[c].dtype == object or pd.api.types.is_string_dtype(df[c])
+                if target is not None:
+                    if pd.api.types.is_float_dtype(target) and text:
+                        df[c] = parse_numeric(df[c], strict=False)
+                    if df[c].dtype != target:
+                        df[c] = df[c].astype(target)
+                    continue
+                if text:
+                    numbers = parse_numeric(df[c])
+                    if numbers is not None:
+                        df[c] = numbers
+                if self.float32 and pd.api.types.is_float_dtype(df[c]):
+                    df[c] = df[c].astype(np.float32)
+        return df
+
+    def iter_chunks(self, file:str, chunk_size:int=1_000_000):
+        """
+        Yields the file as consecutive frames of at most chunk_size rows. A
+        cached entry is sliced from its memory maps; otherwise the CSV is read
+        incrementally. Only one chunk is held in memory either way.
+        """
+        if not file.endswith('csv'):
+            file = f"{file}.csv"
+        if file not in os.listdir(self.directory):
+            print(f"File: {file} not found in directory.")
+            return
+
+        path = os.path.join(self.directory, file)
+        df = self.cache.load(path, view=self.view()) if self.use_cache else None
+        if df is None and self.use_cache and self.view() is not None:
+            # the full entry holds every column
+            df = self.cache.load(path)
+            if df is not None and self.columns is not None:
+                missing = [c for c in self.columns if c not in df.columns]
+                if len(missing) > 0:
+                    print(f"Error. Columns not found in file. Values: {missing}")
+                    return
+                df = df[self.columns]
+
+        if df is not None:
+            for start in range(0, len(df), chunk_size):
+                chunk = df.iloc[start:start + chunk_size]
+                if self.float32:
+                    chunk = chunk.astype({c: np.float32 for c in chunk.columns if pd.api.types.is_float_dtype(chunk[c])})
+                yield chunk
+            return
+
+        try:
+            usecols = self.usecols(path)
+            if usecols is False:
+                return
+            reader = pd.read_csv(path, usecols=usecols, chunksize=chunk_size)
+        except:
+            print("Error reading file. Ensure that correct filename is selected.")
+            return
+        # every chunk takes the column types of the first, with integers widened to
+        # float so that later chunks with missing values keep the same types
+        dtypes = None
+        with reader:
+            for chunk in reader:
+                chunk = self.prepare(chunk, dtypes)
+                if chunk is None:
+                    return
+                if dtypes is None:
+                    dtypes = {c: np.dtype(np.float32 if self.float32 else float) if pd.api.types.is_integer_dtype(t) else t
+                              for c, t in chunk.dtypes.items()}
+                    chunk = chunk.astype(dtypes)
+                yield chunk
+
+    def prewarm_cache(self):
+        # parses every file in the data directory and stores it in the cache
+        for file in self.files():
+            path = os.path.join(self.directory, file)
+            if self.cache.load(path, view=self.view()) is not None:
+                continue
+            df = self.parse(path)
+            if df is not None:
+                self.cache.store(path, df, view=self.view())
+
+    def clear_cache(self):
+        self.cache.clear()
+        self.views.clear()
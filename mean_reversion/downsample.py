@@ -0,0 +1,68 @@
+import numpy as np
+import pandas as pd
+
+"""
+Shape-preserving downsampling for plotting.
+
+lttb keeps the points that span the largest triangles with their neighbours
+(Largest Triangle Three Buckets, Steinarsson 2013), which preserves the
+visual shape of a line. minmax keeps the first, last, lowest and highest
+point of each bucket, which preserves every spike and trough. Both return
+sorted positions into the input, so any aligned column can be sliced with them.
+"""
+
+
+def lttb(y, points:int):
+    y = np.asarray(y, dtype=float)
+    n = len(y)
+    if points >= n or points < 3:
+        return np.arange(n)
+
+    # bucket i spans [edges[i], edges[i+1]); the first and last points are always kept
+    edges = (np.arange(points - 1) * ((n - 2) / (points - 2))).astype(np.int64) + 1
+    edges[-1] = n - 1
+    running = np.r_[0, np.cumsum(y)]
+    x = np.arange(n, dtype=float)
+
+    out = np.empty(points, dtype=np.int64)
+    out[0] = 0
+    out[-1] = n - 1
+    a = 0
+    for i in range(points - 2):
+        start, stop = edges[i], edges[i + 1]
+        # average of the next bucket, or the last point for the final bucket
+        next_start, next_stop = stop, edges[i + 2] if i + 2 < len(edges) else n
+        cx = (next_start + next_stop - 1) / 2
+        cy = (running[next_stop] - running[next_start]) / (next_stop - next_start)
+
+        area = np.abs((x[a] - cx) * (y[start:stop] - y[a]) - (x[a] - x[start:stop]) * (cy - y[a]))
+        a = start + int(np.argmax(area))
+        out[i + 1] = a
+    return out
+
+
+def minmax(y, points:int):
+    y = np.asarray(y, dtype=float)
+    n = len(y)
+    buckets = max(points // 2, 1)
+    if points >= n:
+        return np.arange(n)
+
+    size = -(-n // buckets)
+    padded = np.full(buckets * size, np.nan)
+    padded[:n] = y
+    padded = padded.reshape(buckets, size)
+    offsets = np.arange(buckets) * size
+    valid = offsets < n
+    low = offsets[valid] + np.nanargmin(padded[valid], axis=1)
+    high = offsets[valid] + np.nanargmax(padded[valid], axis=1)
+    return np.unique(np.r_[0, low, high, n - 1])
+
+
+def downsample(series:pd.Series, points:int, method:str='lttb') -> pd.Series:
+    # NaN (e.g. indicator warm-up) is not drawn, so it is dropped first
+    series = series.dropna()
+    if points is None or len(series) <= points:
+        return series
+    positions = lttb(series.to_numpy(), points) if method == 'lttb' else minmax(series.to_numpy(), points)
+    return series.iloc[positions]
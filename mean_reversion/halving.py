@@ -0,0 +1,155 @@
+import math
+import os
+import numpy as np
+import pandas as pd
+from concurrent.futures import ProcessPoolExecutor
+from .mean_reversion import Accounts, Hyperparameters
+from .metrics import MetricsAccumulator
+from .parallel import SharedFrame
+from .sweep import Sweep, ParameterGrid
+
+"""
+Successive halving search.
+
+Every config of the grid is scored on the most recent min_bars bars; the
+best 1/eta are kept and scored again on eta times more history, and so on
+until the survivors are scored on the full series. Each rung groups its
+survivors by (calc_type, mean_period) and evaluates every group as one
+vectorized Sweep in a worker process over a shared-memory copy of the
+prices, so a rung costs about as much as a grid sweep over its survivors
+on a slice of the data.
+"""
+
+
+class SuccessiveHalving:
+
+    def __init__(self,
+                 data,
+                 grid:ParameterGrid,
+                 accounts:Accounts,
+                 objective:str='sharpe_annual',
+                 maximize:bool=True,
+                 eta:int=3,
+                 min_bars:int=None,
+                 max_workers:int=None,
+                 chunk_size:int=128,
+                 stop_loss:float=None,
+                 take_profit:float=None,
+                 max_holding:int=None):
+        """
+        min_bars is the history of the first rung; by default it is chosen so
+        that the configs are cut down to about eta by the full-history rung,
+        with at least 500 bars per slice. stop_loss, take_profit and
+        max_holding add the same risk exits to every config (see
+        Hyperparameters).
+        """
+        data.columns = [c.lower() for c in data.columns]
+        self.data = data
+        self.grid = grid
+        self.cash = accounts.cash
+        self.objective = objective
+        self.maximize = maximize
+        self.eta = eta
+        self.min_bars = min_bars
+        self.max_workers = max_workers if max_workers is not None else os.cpu_count()
+        self.chunk_size = chunk_size
+        exits = {'stop_loss': stop_loss, 'take_profit': take_profit, 'max_holding': max_holding}
+        self.exits = {k: v for k, v in exits.items() if v is not None}
+
+        self.history = None
+        self.results = None
+        self.cost = None
+
+    def budgets(self, configs:int) -> list:
+        # bars per rung, ending with the full series
+        bars = len(self.data)
+        rungs = max(1, math.ceil(math.log(max(configs, 1), self.eta)))
+        min_bars = self.min_bars if self.min_bars is not None else max(500, bars // self.eta ** (rungs - 1))
+        rungs = min(rungs, int(math.log(max(bars / min_bars, 1), self.eta)) + 1)
+        return [max(min_bars, bars // self.eta ** (rungs - 1 - i)) for i in range(rungs - 1)] + [bars]
+
+    def run(self) -> pd.DataFrame:
+        """
+        Returns the configs of the last rung scored on the full series, best
+        first. self.history holds every evaluation with its rung and bars, and
+        self.cost the bars evaluated as a fraction of the full grid sweep.
+        """
+        if not self.grid.validate() or not Hyperparameters.valid_exits(**self.exits):
+            return None
+        valid = list(MetricsAccumulator(self.cash).to_dict().keys())
+        if self.objective not in valid:
+            print(f"Invalid Objective. Value: {self.objective}, Valid: {valid}")
+            return None
+        if self.eta < 2:
+            print(f"Invalid eta. Value must be greater than 1. Value: {self.eta}")
+            return None
+
+        candidates = self.grid.combinations()
+        budgets = self.budgets(len(candidates))
+        frames = []
+
+        # the risk exits also need the intrabar prices
+        with SharedFrame(self.data, None if self.exits else ['close']) as shared:
+            executor = None
+            if self.max_workers > 1:
+                executor = ProcessPoolExecutor(max_workers=self.max_workers, initializer=_init_worker, initargs=(shared.spec(),))
+            else:
+                _worker['data'] = self.data
+            try:
+                for rung, bars in enumerate(budgets):
+                    frame = self.evaluate(candidates, len(self.data) - bars, executor)
+                    frame.insert(0, 'rung', rung)
+                    frame.insert(1, 'bars', bars)
+                    frames.append(frame)
+
+                    if rung < len(budgets) - 1:
+                        keep = max(1, math.ceil(len(candidates) / self.eta))
+                        candidates = [tuple(c) for c in frame[ParameterGrid.keys].head(keep).itertuples(index=False)]
+            finally:
+                if executor is not None:
+                    executor.shutdown()
+                _worker.clear()
+
+        self.history = pd.concat(frames, ignore_index=True)
+        self.cost = float((self.history['bars'].sum()) / (len(self.grid) * len(self.data)))
+        self.results = frames[-1].drop(columns=['rung', 'bars']).reset_index(drop=True)
+        return self.results
+
+    def evaluate(self, candidates:list, start:int, executor) -> pd.DataFrame:
+        # scores the candidates on the bars from start, best first
+        groups = {}
+        for config in candidates:
+            groups.setdefault((config[0], config[1]), []).append(config)
+
+        tasks = [(configs, start, self.cash, self.chunk_size, self.exits) for configs in groups.values()]
+        if executor is None:
+            results = [_evaluate_group(*task) for task in tasks]
+        else:
+            results = list(executor.map(_evaluate_group, *zip(*tasks)))
+
+        frame = pd.concat(results, ignore_index=True)
+        order = frame[self.objective].rank(method='first', ascending=not self.maximize, na_option='bottom')
+        return frame.iloc[np.argsort(order.to_numpy(), kind='stable')].reset_index(drop=True)
+
+
+_worker = {}
+
+
+def _init_worker(spec:dict):
+    data, handles = SharedFrame.attach(spec)
+    _worker['data'] = data
+    _worker['handles'] = handles
+
+
+def _evaluate_group(configs:list, start:int, cash, chunk_size:int, exits:dict=None) -> pd.DataFrame:
+    """
+    Sweeps the smallest grid covering configs (which share calc_type and
+    mean_period) on the bars from start and keeps the rows of configs.
+    """
+    grid = ParameterGrid(**{k: sorted({c[i] for c in configs}, key=str) for i, k in enumerate(ParameterGrid.keys)})
+    data = _worker['data'].iloc[start:]
+    results = Sweep(data, grid, Accounts(cash), chunk_size=chunk_size, **(exits or {})).run()
+
+    wanted = set(configs)
+    keep = [tuple(c) in wanted for c in results[ParameterGrid.keys].itertuples(index=False)]
+    return results[keep]
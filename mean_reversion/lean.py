@@ -0,0 +1,100 @@
+import numpy as np
+import pandas as pd
+from .blocks import BlockModel
+from .mean_reversion import Hyperparameters, Accounts
+from .metrics import MetricsAccumulator
+from .data_loader import DataLoader
+
+"""
+Lean backtest kernel.
+
+Runs the build_model pipeline directly on the close array in fixed-size
+blocks and folds each block into running metrics, so no DataFrame is built
+and peak memory is bounded by the block size rather than the series length.
+The constant z_upper/z_lower columns are never created and prices can be
+processed as float32.
+
+run_file streams a data file in chunks (from its binary cache or the CSV),
+so files larger than memory can be backtested; the model and metric state
+carried between blocks makes the result equal to a run on the whole series.
+"""
+
+
+class LeanBacktest:
+
+    def __init__(self,
+                 hyperparameters:Hyperparameters,
+                 accounts:Accounts,
+                 dtype=np.float64,
+                 keep_equity:bool=False,
+                 block_size:int=65536):
+        if hyperparameters.exits():
+            # exits need high/low bars and an entry price this model does not track
+            raise ValueError(f"Invalid risk exits. LeanBacktest does not support stop_loss, take_profit or max_holding. Values: {hyperparameters.exits()}")
+        self.hyperparameters = hyperparameters
+        self.cash = accounts.cash
+        self.dtype = np.dtype(dtype)
+        self.keep_equity = keep_equity
+        self.block_size = block_size
+
+    def run(self, data, index=None) -> dict:
+        """
+        data is a DataFrame with a close column, or a close array together with
+        its DatetimeIndex. Returns the Metrics.to_dict() statistics, plus the
+        equity vector when keep_equity is set.
+        """
+        if isinstance(data, pd.DataFrame):
+            index = data.index
+            close = data['close'] if 'close' in data.columns else data['Close']
+        else:
+            close = data
+        close = np.asarray(close)
+
+        model = BlockModel(self.hyperparameters, self.dtype)
+        metrics = MetricsAccumulator(self.cash)
+        equity = np.empty(len(close), dtype=self.dtype) if self.keep_equity else None
+
+        for start in range(0, len(close), self.block_size):
+            stop = min(start + self.block_size, len(close))
+            returns = model.update(close[start:stop])
+            block_equity = metrics.update(returns, index[start:stop] if index is not None else None)
+            if equity is not None:
+                equity[start:stop] = block_equity
+
+        result = metrics.to_dict()
+        if equity is not None:
+            result['equity'] = equity
+        return result
+
+    def run_chunks(self, chunks) -> dict:
+        """
+        Runs on consecutive frames with a close column and DatetimeIndex, e.g.
+        DataLoader.iter_chunks. The equity vector, when kept, is the only
+        output that grows with the series.
+        """
+        model = BlockModel(self.hyperparameters, self.dtype)
+        metrics = MetricsAccumulator(self.cash)
+        equity = []
+
+        for chunk in chunks:
+            close = np.asarray(chunk['close'])
+            for start in range(0, len(close), self.block_size):
+                stop = min(start + self.block_size, len(close))
+                returns = model.update(close[start:stop])
+                block_equity = metrics.update(returns, chunk.index[start:stop], keep_equity=self.keep_equity)
+                if self.keep_equity:
+                    equity.append(block_equity.astype(self.dtype))
+
+        if metrics.bars == 0:
+            print("No bars to backtest.")
+            return None
+
+        result = metrics.to_dict()
+        if self.keep_equity:
+            result['equity'] = np.concatenate(equity)
+        return result
+
+    def run_file(self, file:str, loader:DataLoader=None, chunk_size:int=1_000_000) -> dict:
+        # only the close column is read unless a loader is given
+        loader = loader if loader is not None else DataLoader(columns=['close'])
+        return self.run_chunks(loader.iter_chunks(file, chunk_size))
@@ -1,6 +1,10 @@
 import numpy as np 
+from . import arrays
 from .metrics import Metrics
-from statsmodels.tsa.stattools import adfuller
+from .memo import StageCache, stage_cache, fingerprint
+from .data_loader import resample
+from .store import ResultStore, data_key
+from .profiling import stage, timed
 import pandas as pd 
 """
 Calculation type for mean and std (simple or exponential)
@@ -46,7 +50,10 @@ class Hyperparameters:
                  spread_sdev_period:int, 
                  threshold:int,
                  side:str,
-                 calc_type:str):
+                 calc_type:str,
+                 stop_loss:float=None,
+                 take_profit:float=None,
+                 max_holding:int=None):
         
         defaults = Defaults()
 
@@ -57,7 +64,20 @@ class Hyperparameters:
         self.side = side if side is not None else defaults.side
         self.calc_type = calc_type if calc_type is not None else defaults.calc_type
 
-    def validate(self, mean_period, spread_mean_period, spread_sdev_period, side, calc_type): 
+        # optional risk exits: stop loss / take profit as fractions of the entry price, max holding in bars
+        self.stop_loss = stop_loss
+        self.take_profit = take_profit
+        self.max_holding = max_holding
+
+    def exits(self) -> dict:
+        # risk exits that are set
+        exits = {'stop_loss': self.stop_loss, 'take_profit': self.take_profit, 'max_holding': self.max_holding}
+        return {k: v for k, v in exits.items() if v is not None}
+
+    def validate(self, mean_period, spread_mean_period, spread_sdev_period, side, calc_type, stop_loss=None, take_profit=None, max_holding=None): 
+        if not self.valid_exits(stop_loss, take_profit, max_holding):
+            return None 
+
         if not self.valid_period(mean_period):
             self.period_error('Mean Period', mean_period)
             return None 
@@ -81,6 +101,19 @@ class Hyperparameters:
             return None 
 
 
+    @staticmethod
+    def valid_exits(stop_loss=None, take_profit=None, max_holding=None) -> bool:
+        for name, value in [('Stop Loss', stop_loss), ('Take Profit', take_profit)]:
+            if value is None:
+                continue
+            if isinstance(value, bool) or not isinstance(value, (int, float, np.integer, np.floating)) or not value > 0:
+                print(f"Invalid {name}. Value must be a fraction of the entry price greater than 0. Value: {value}")
+                return False
+        if max_holding is not None and (isinstance(max_holding, bool) or not isinstance(max_holding, (int, np.integer)) or max_holding <= 0):
+            print(f"Invalid Max Holding. Value must be an integer greater than 0. Value: {max_holding}")
+            return False
+        return True
+
     def valid_period(self, prd):
         return prd > 0
     
@@ -94,6 +127,8 @@ class Hyperparameters:
         print(f"Threshold: {self.threshold}")
         print(f"Side: {self.side}")
         print(f"Calculation Type: {self.calc_type}")
+        for name, value in self.exits().items():
+            print(f"{name.replace('_', ' ').title()}: {value}")
         
 class Accounts:
     def __init__(self, cash):
@@ -101,47 +136,92 @@ class Accounts:
 
 class MeanReversion:
     
-    def __init__ (self, data, hyperparemeters:Hyperparameters, accounts:Accounts):
+    def __init__ (self, data, hyperparemeters:Hyperparameters, accounts:Accounts, verbose:bool=True, cache:StageCache=stage_cache, timeframe:str=None, store:ResultStore=None):
+        if not hyperparemeters.valid_exits(**hyperparemeters.exits()):
+            raise ValueError(f"Invalid risk exits. Values: {hyperparemeters.exits()}")
         self.hyperparameters = hyperparemeters
         self.cash = accounts.cash
+        # memoizes mean, spread statistics, z-score and positions across runs on the same prices. None disables.
+        self.cache = cache 
+        self.timeframe = timeframe
 
+        if timeframe is not None:
+            # bars are aggregated from the finer data passed in (e.g. h1 -> h4)
+            data = resample(data, timeframe)
+            if data is None:
+                raise ValueError(f"Invalid Timeframe. Value: {timeframe}")
 
-        print(f"Simulation Created. Columns: {len(data.columns)}, Rows: {len(data)}, Cash: ${self.cash}")
-        self.hyperparameters.print_values()
+        if verbose:
+            print(f"Simulation Created. Columns: {len(data.columns)}, Rows: {len(data)}, Cash: ${self.cash}")
+            self.hyperparameters.print_values()
 
         self.tpl_side = Side()
         self.tpl_calc = RollingCalculationType()
 
         data.columns = [c.lower() for c in data.columns]
         self.data = data 
-        self.built_model = self.build_model(self.data.copy())
-        self.metrics = Metrics(self.built_model, self.cash)
 
+        # a stored result for the same data, parameters, cash and code skips the build;
+        # the model and metrics are then built on first access
+        self.store = store
+        self.store_key = None
+        self.stored = None
+        self._built_model = None
+        self._metrics = None
+        if store is not None:
+            self.data_key = data_key(self.data)
+            self.store_key = store.key(self.data_key, type(self).__name__, store.config(self.hyperparameters), self.cash, self.store_params())
+            self.stored = store.get(self.store_key)
+            if verbose and self.stored is not None:
+                print("Stored Result Found.")
+
+        if self.stored is None:
+            self.metrics
+            if store is not None:
+                self.stored = self.metrics.to_dict()
+                store.put(self.store_key, self.data_key, type(self).__name__, store.config(self.hyperparameters), self.cash,
+                          self.stored, self.store_params(), equity=self.built_model['equity'])
+
+    @property
+    def built_model(self):
+        if self._built_model is None:
+            self._built_model = self.build_model(self.data.copy())
+        return self._built_model
+
+    @property
+    def metrics(self):
+        if self._metrics is None:
+            self._metrics = Metrics(self.built_model, self.cash)
+        return self._metrics
+
+    def results(self) -> dict:
+        # metrics summary, from the store when available
+        return dict(self.stored) if self.stored is not None else self.metrics.to_dict()
+
+    def show_results(self):
+        if self._metrics is None and self.stored is not None:
+            Metrics.show_summary(self.stored, self.cash)
+            return
+        self.metrics.show_data()
+
+    def store_params(self) -> dict:
+        # settings besides the hyperparameters that change the result
+        return self.hyperparameters.exits()
+
+    @timed('build_model')
     def build_model(self, data): 
         
-        data['log_returns'] = np.log(data['close']/data['close'].shift(1))
-        if self.hyperparameters.calc_type == self.tpl_calc.calculation_exponential:
-            data['mean'] = data['close'].ewm(span=self.hyperparameters.mean_period).mean()
-            data['spread'] = data['close'] - data['mean']
-
-            
-            spread_mu = data['spread'].ewm(span=self.hyperparameters.spread_mean_period).mean()
-            spread_sigma = data['spread'].ewm(span=self.hyperparameters.spread_sdev_period).std()
-        
-        else: 
-            data['mean'] = data['close'].rolling(self.hyperparameters.mean_period).mean()
-            data['spread'] = data['close'] - data['mean']
+        data['log_returns'] = self.log_returns(data)
 
+        key = self.cache_key(data) if self.cache is not None else None
+        data['mean'] = self.fair_value(data, key)
+        data['spread'] = data['close'] - data['mean']
 
-            spread_mu = data['spread'].rolling(self.hyperparameters.spread_mean_period).mean()
-            spread_sigma = data['spread'].rolling(self.hyperparameters.spread_sdev_period).std()
-
+        # z-score = (x - mu) / sigma 
+        data['z_score'] = self.stage_z_score(data['spread'], key)
 
-        
         lower_threshold = -self.hyperparameters.threshold 
         upper_threshold = self.hyperparameters.threshold
-        # z-score = (x - mu) / sigma 
-        data['z_score'] = (data['spread'] - spread_mu) / spread_sigma
         data['z_upper'] = upper_threshold 
         data['z_lower'] = lower_threshold
         
@@ -159,26 +239,109 @@ class MeanReversion:
             d.loc[exit, side] = 0 
             return d[side].ffill().fillna(0)
         
-        data['long_pos'] = attach_signal(data, 'long_pos', long_entry, long_exit, 1) 
-        data['short_pos'] = attach_signal(data, 'short_pos', short_entry, short_exit, -1)
-        data['signal'] = data['long_pos'] + data['short_pos']
-        data['signal'] = data['signal'].shift(1) # shift to mitigate look ahead bias 
+        # positions depend on the threshold but not on the side
+        hp = self.hyperparameters
+        positions = (hp.calc_type, hp.mean_period, hp.spread_mean_period, hp.spread_sdev_period, hp.threshold)
+        with stage('build_model.signal'):
+            data['long_pos'] = self.cached(key, ('long_pos',) + positions, lambda: attach_signal(data, 'long_pos', long_entry, long_exit, 1).to_numpy())
+            data['short_pos'] = self.cached(key, ('short_pos',) + positions, lambda: attach_signal(data, 'short_pos', short_entry, short_exit, -1).to_numpy())
+            data['signal'] = data['long_pos'] + data['short_pos']
+            data['signal'] = data['signal'].shift(1) # shift to mitigate look ahead bias 
+
+        with stage('build_model.returns'):
+            data['strategy_returns'] = data['signal'] * data['log_returns']
+            self.risk_exits(data)
+
+            if self.hyperparameters.side == self.tpl_side.side_long:
+                data.loc[data['signal'] == -1, 'strategy_returns'] = 0 
+            elif self.hyperparameters.side == self.tpl_side.side_short: 
+                data.loc[data['signal'] == 1, 'strategy_returns'] = 0 
+            else:
+                pass 
+
+            data['returns'] = data['strategy_returns'].cumsum()
+            data['equity'] = (data['returns'] * self.cash) + self.cash 
+            data['peak'] = data['equity'].cummax()
+            data['drawdown'] = (data['equity'] - data['peak']) / data['peak'] * 100 
+        
+        return data
 
-        data['strategy_returns'] = data['signal'] * data['log_returns']
+    def risk_exits(self, data):
+        # cuts positions at intrabar stop loss / take profit (close when high, low or open are missing) and max holding
+        exits = self.hyperparameters.exits()
+        if len(exits) == 0:
+            return
+        with stage('build_model.exits'):
+            close = data['close'].to_numpy(dtype=float)
+            prices = {c: data[c].to_numpy(dtype=float) if c in data.columns else close for c in ['high', 'low', 'open']}
+            signal, returns, fills = arrays.risk_exits(data['signal'], data['log_returns'], close, prices['high'], prices['low'], prices['open'], **exits)
+            data['signal'] = signal
+            data['strategy_returns'] = returns
+            data['exit_price'] = fills
 
-        if self.hyperparameters.side == self.tpl_side.side_long:
-            data.loc[data['signal'] == -1, 'strategy_returns'] = 0 
-        elif self.hyperparameters.side == self.tpl_side.side_short: 
-            data.loc[data['signal'] == 1, 'strategy_returns'] = 0 
-        else:
-            pass 
+    # ------------------------------ spread model ------------------------------ #
 
-        data['returns'] = data['strategy_returns'].cumsum()
-        data['equity'] = (data['returns'] * self.cash) + self.cash 
-        data['peak'] = data['equity'].cummax()
-        data['drawdown'] = (data['equity'] - data['peak']) / data['peak'] * 100 
-        
-        return data
+    def log_returns(self, data):
+        return np.log(data['close']/data['close'].shift(1))
+
+    def cache_key(self, data):
+        return (fingerprint(data['close'].to_numpy(dtype=float)),)
+
+    def fair_value(self, data, key):
+        # the spread is close - fair value; a single instrument reverts to its own mean
+        return self.stage_mean(data['close'], key)
+
+    # ----------------------------- cached stages ----------------------------- #
+
+    def cached(self, key, stage, compute):
+        if key is None:
+            return compute()
+        return self.cache.get(key + stage, compute).copy()
+
+    @timed('build_model.mean')
+    def stage_mean(self, close, key):
+        hp = self.hyperparameters
+
+        def compute():
+            if hp.calc_type == self.tpl_calc.calculation_exponential:
+                return close.ewm(span=hp.mean_period).mean().to_numpy()
+            return close.rolling(hp.mean_period).mean().to_numpy()
+
+        return self.cached(key, ('mean', hp.calc_type, hp.mean_period), compute)
+
+    @timed('build_model.spread_mean')
+    def stage_spread_mu(self, spread, key):
+        hp = self.hyperparameters
+
+        def compute():
+            if hp.calc_type == self.tpl_calc.calculation_exponential:
+                return spread.ewm(span=hp.spread_mean_period).mean().to_numpy()
+            return spread.rolling(hp.spread_mean_period).mean().to_numpy()
+
+        return self.cached(key, ('spread_mu', hp.calc_type, hp.mean_period, hp.spread_mean_period), compute)
+
+    @timed('build_model.spread_sdev')
+    def stage_spread_sigma(self, spread, key):
+        hp = self.hyperparameters
+
+        def compute():
+            if hp.calc_type == self.tpl_calc.calculation_exponential:
+                return spread.ewm(span=hp.spread_sdev_period).std().to_numpy()
+            return spread.rolling(hp.spread_sdev_period).std().to_numpy()
+
+        return self.cached(key, ('spread_sigma', hp.calc_type, hp.mean_period, hp.spread_sdev_period), compute)
+
+    @timed('build_model.z_score')
+    def stage_z_score(self, spread, key):
+        # independent of threshold and side, so those can vary without recomputing
+        hp = self.hyperparameters
+
+        def compute():
+            spread_mu = self.stage_spread_mu(spread, key)
+            spread_sigma = self.stage_spread_sigma(spread, key)
+            return (spread.to_numpy() - spread_mu) / spread_sigma
+
+        return self.cached(key, ('z_score', hp.calc_type, hp.mean_period, hp.spread_mean_period, hp.spread_sdev_period), compute)
 
     def stationarity_test(self, data=None, target=None):
         data = self.built_model if data is None else data 
@@ -186,7 +349,11 @@ class MeanReversion:
         if data is None: 
             data = self.built_model 
 
-        adf = adfuller(data[target], maxlag=1)
+        # statsmodels is slow to import, load it on first use
+        from statsmodels.tsa.stattools import adfuller
+
+        with stage('adf'):
+            adf = adfuller(data[target].dropna(), maxlag=1)
         test_statistic, p_value, _, _, critical_value, _ = adf 
         print()
         print("===== AUGMENTED DICKEY-FULLER TEST (STATIONARITY) =====")
@@ -202,6 +369,13 @@ class MeanReversion:
         else:
             print(f"Series is NOT stationary. (p-value {p_value*100:.4f}%)")
 
+        return {
+            'test_statistic': test_statistic,
+            'p_value': p_value,
+            'critical_values': critical_value,
+            'stationary': stationary
+        }
+
 
     
    
@@ -0,0 +1,73 @@
+import hashlib
+from collections import OrderedDict
+import numpy as np
+
+"""
+Bounded LRU cache for intermediate build_model stages.
+
+Entries are NumPy arrays keyed by a tuple that starts with a fingerprint of
+the close prices followed by the parameters the stage depends on. The cache
+evicts least recently used entries once the stored arrays exceed max_bytes.
+"""
+
+
+def fingerprint(values) -> str:
+    values = np.ascontiguousarray(values)
+    return hashlib.blake2b(values.tobytes(), digest_size=16).hexdigest()
+
+
+class StageCache:
+
+    def __init__(self, max_bytes:int=128 * 1024 * 1024):
+        self.max_bytes = max_bytes
+        self.entries = OrderedDict()
+        self.nbytes = 0
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+    def get(self, key:tuple, compute):
+        if key in self.entries:
+            self.entries.move_to_end(key)
+            self.hits += 1
+            return self.entries[key]
+
+        self.misses += 1
+        value = compute()
+        self.put(key, value)
+        return value
+
+    def put(self, key:tuple, value:np.ndarray):
+        if value.nbytes > self.max_bytes:
+            return
+        # cached arrays are shared between runs and must not be modified in place
+        value.flags.writeable = False
+
+        if key in self.entries:
+            self.nbytes -= self.entries.pop(key).nbytes
+        self.entries[key] = value
+        self.nbytes += value.nbytes
+
+        while self.nbytes > self.max_bytes:
+            _, evicted = self.entries.popitem(last=False)
+            self.nbytes -= evicted.nbytes
+            self.evictions += 1
+
+    def clear(self):
+        self.entries.clear()
+        self.nbytes = 0
+
+    def stats(self) -> dict:
+        lookups = self.hits + self.misses
+        return {
+            'hits': self.hits,
+            'misses': self.misses,
+            'hit_rate': self.hits / lookups if lookups > 0 else 0.0,
+            'evictions': self.evictions,
+            'entries': len(self.entries),
+            'bytes': self.nbytes,
+            'max_bytes': self.max_bytes,
+        }
+
+
+stage_cache = StageCache()
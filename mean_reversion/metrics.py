@@ -1,7 +1,10 @@
 import numpy as np
+from . import arrays
+from .profiling import timed
 
 class Metrics: 
 
+    @timed('metrics')
     def __init__(self, data, cash):
         self.data = data 
         self.cash = cash 
@@ -13,9 +16,9 @@ class Metrics:
         self.peak = self.equity.cummax()
         self.drawdown = (self.equity-self.peak) / self.peak * 100 
 
-        traded =self.data.query('strategy_returns != 0')
-        strategy_mean = traded['strategy_returns'].mean()
-        strategy_std = traded['strategy_returns'].std()
+        traded = self.data['strategy_returns'][self.data['strategy_returns'] != 0]
+        strategy_mean = traded.mean()
+        strategy_std = traded.std()
 
         risk_free_rate = 0.05 
         self.sharpe_daily = (strategy_mean - (risk_free_rate/252)) / strategy_std 
@@ -25,19 +28,242 @@ class Metrics:
         grouped = target_data.groupby(target_data.index.year).sum() * 100 
 
         self.annual_mean = grouped.mean()
+        self.intervals = None
 
+    def robustness(self, samples:int=10000, block_size:int=None, method:str='stationary', confidence:float=0.95, seed:int=None, max_workers:int=1):
+        """
+        Bootstraps the strategy returns and attaches confidence intervals of the
+        final equity, max drawdown and Sharpe to the metrics.
+        """
+        from .bootstrap import Bootstrap
+
+        bootstrap = Bootstrap(self.data['strategy_returns'].to_numpy(), self.cash, samples, block_size, method, seed, max_workers=max_workers)
+        if bootstrap.run() is None:
+            return None
+        self.confidence = confidence
+        self.intervals = bootstrap.intervals(confidence)
+        return self.intervals
+
+    def to_dict(self):
+        values = {
+            'net_returns_percent': self.net_returns_percent,
+            'final_equity': self.final_equity,
+            'peak': self.equity.max(),
+            'max_drawdown': abs(self.drawdown.min()),
+            'annual_mean': self.annual_mean,
+            'sharpe_daily': self.sharpe_daily,
+            'sharpe_annual': self.sharpe_annual,
+        }
+        if self.intervals is not None:
+            for name, (lower, upper) in self.intervals.items():
+                values[f"{name}_lower"] = lower
+                values[f"{name}_upper"] = upper
+        return values
         
     def show_data(self):
-        print()
-        print("===== SIMULATION RESULTS =====")
-        print(f"Returns: {self.net_returns_percent:.2f}%")
-        print(f"Deposit: ${self.cash}")
-        print(f"Final Equity: ${self.final_equity:.2f}")
-        print(f"Peak: ${self.equity.max():.2f}")
-        print(f"Max Drawdown: {abs(self.drawdown.min()):.2f}%")
-        print(f"Average Annual Returns: {self.annual_mean:.2f}%")
-        print(f"Daily Sharpe: {self.sharpe_daily:.2f}")
-        print(f"Annualized Sharpe: {self.sharpe_annual:.2f}")
+        self.show_summary(self.to_dict(), self.cash, footer=False)
+        if self.intervals is not None:
+            print(f"--- Bootstrap {self.confidence*100:.0f}% Confidence Intervals ---")
+            print(f"Returns: {self.intervals['net_returns_percent'][0]:.2f}% to {self.intervals['net_returns_percent'][1]:.2f}%")
+            print(f"Final Equity: ${self.intervals['final_equity'][0]:.2f} to ${self.intervals['final_equity'][1]:.2f}")
+            print(f"Max Drawdown: {self.intervals['max_drawdown'][0]:.2f}% to {self.intervals['max_drawdown'][1]:.2f}%")
+            print(f"Annualized Sharpe: {self.intervals['sharpe_annual'][0]:.2f} to {self.intervals['sharpe_annual'][1]:.2f}")
         print("==========")
         print()
 
+    @staticmethod
+    def show_summary(values:dict, cash, footer:bool=True):
+        # prints a to_dict summary, e.g. one read back from a ResultStore
+        print()
+        print("===== SIMULATION RESULTS =====")
+        print(f"Returns: {values['net_returns_percent']:.2f}%")
+        print(f"Deposit: ${cash}")
+        print(f"Final Equity: ${values['final_equity']:.2f}")
+        print(f"Peak: ${values['peak']:.2f}")
+        print(f"Max Drawdown: {values['max_drawdown']:.2f}%")
+        print(f"Average Annual Returns: {values['annual_mean']:.2f}%")
+        print(f"Daily Sharpe: {values['sharpe_daily']:.2f}")
+        print(f"Annualized Sharpe: {values['sharpe_annual']:.2f}")
+        if footer:
+            print("==========")
+            print()
+
+
+
+class BatchMetrics:
+    """
+    Metrics for a bars x configs matrix of strategy returns.
+    Each attribute is an array with one value per config, matching Metrics.
+    """
+
+    def __init__(self, strategy_returns, cash, index):
+        self.cash = cash
+        accumulator = MetricsAccumulator(cash)
+        accumulator.update(arrays.as_2d(np.asarray(strategy_returns, dtype=float)), index, keep_equity=False)
+
+        self.values = accumulator.to_dict()
+        for name, values in self.values.items():
+            setattr(self, name, values)
+        self.annual_returns = accumulator.annual_returns()
+
+    def to_dict(self):
+        return dict(self.values)
+
+
+class MetricsAccumulator:
+    """
+    Builds the Metrics statistics, plus Sortino, Calmar, win rate and exposure,
+    from strategy returns fed in consecutive blocks in a single pass, keeping
+    only running totals and one sum per year between blocks.
+
+    A block is a vector of bars, or a bars x configs matrix to score every
+    config of a sweep at once; the statistics are then arrays with one value
+    per config. update_bar adds one bar of a single config for bar-by-bar engines.
+    """
+
+    risk_free_rate = 0.05
+
+    def __init__(self, cash):
+        self.cash = cash
+
+        self.configs = None
+        self.squeeze = True
+        self.bars = 0
+        self.annual = {}
+
+    def reset(self, configs:int, squeeze:bool):
+        self.configs = configs
+        self.squeeze = squeeze
+        self.total = np.zeros(configs)
+        self.traded = np.zeros(configs)
+        self.traded_mean = np.zeros(configs)
+        self.traded_m2 = np.zeros(configs)
+        self.downside = np.zeros(configs)
+        self.wins = np.zeros(configs)
+        self.peak = np.full(configs, -np.inf)
+        self.min_drawdown = np.zeros(configs)
+
+    def update(self, strategy_returns, index=None, keep_equity:bool=True):
+        """
+        Adds a block of returns (and its DatetimeIndex for annual returns).
+        Returns the equity curve for the block, or None when keep_equity is off.
+        """
+        returns = np.nan_to_num(np.asarray(strategy_returns, dtype=float), nan=0.0)
+        if self.configs is None:
+            self.reset(1 if returns.ndim == 1 else returns.shape[1], returns.ndim == 1)
+        squeeze = returns.ndim == 1
+        returns = arrays.as_2d(returns)
+        if len(returns) == 0:
+            return returns[:, 0] if squeeze else returns
+        self.bars += len(returns)
+
+        # merge traded mean and sum of squared deviations (Chan et al.)
+        traded = returns != 0
+        block_count = traded.sum(axis=0)
+        block_total = returns.sum(axis=0)
+        count = self.traded + block_count
+        with np.errstate(invalid='ignore', divide='ignore'):
+            block_mean = np.where(block_count > 0, block_total / block_count, 0)
+            block_m2 = (np.where(traded, returns - block_mean, 0) ** 2).sum(axis=0)
+            delta = block_mean - self.traded_mean
+            self.traded_m2 += np.where(count > 0, block_m2 + delta ** 2 * self.traded * block_count / count, 0)
+            self.traded_mean += np.where(count > 0, delta * block_count / count, 0)
+        self.traded = count
+        self.wins += (returns > 0).sum(axis=0)
+        self.downside += (np.minimum(returns, 0) ** 2).sum(axis=0)
+
+        equity = np.cumsum(returns, axis=0)
+        equity += self.total
+        self.total = equity[-1].copy()
+        equity *= self.cash
+        equity += self.cash
+
+        peaks = np.maximum.accumulate(equity, axis=0)
+        np.maximum(peaks, self.peak, out=peaks)
+        self.min_drawdown = np.minimum(self.min_drawdown, ((equity - peaks) / peaks).min(axis=0) * 100)
+        self.peak = peaks[-1].copy()
+        del peaks
+
+        if index is not None:
+            years = np.asarray(index.year)
+            starts = np.flatnonzero(np.r_[True, years[1:] != years[:-1]])
+            for year, value in zip(years[starts], np.add.reduceat(returns, starts, axis=0)):
+                self.annual[year] = self.annual.get(year, 0.0) + value
+
+        if not keep_equity:
+            return None
+        return equity[:, 0] if squeeze else equity
+
+    def update_bar(self, strategy_returns:float, timestamp=None) -> float:
+        """
+        Adds one bar of a single config without array overhead.
+        Returns the equity after the bar.
+        """
+        if self.configs is None:
+            self.reset(1, True)
+        value = float(strategy_returns) if strategy_returns == strategy_returns else 0.0
+        self.bars += 1
+
+        if value != 0:
+            count = self.traded[0] + 1
+            delta = value - self.traded_mean[0]
+            self.traded_mean[0] += delta / count
+            self.traded_m2[0] += delta * (value - self.traded_mean[0])
+            self.traded[0] = count
+            if value > 0:
+                self.wins[0] += 1
+            else:
+                self.downside[0] += value * value
+
+        total = self.total[0] + value
+        self.total[0] = total
+        equity = (total * self.cash) + self.cash
+        if equity > self.peak[0]:
+            self.peak[0] = equity
+        drawdown = (equity - self.peak[0]) / self.peak[0] * 100
+        if drawdown < self.min_drawdown[0]:
+            self.min_drawdown[0] = drawdown
+
+        if timestamp is not None:
+            year = timestamp.year
+            self.annual[year] = self.annual.get(year, 0.0) + np.array([value])
+        return equity
+
+    def annual_returns(self) -> dict:
+        # {year: returns in percent}
+        return {year: (value[0] if self.squeeze else value) * 100 for year, value in self.annual.items()}
+
+    def to_dict(self):
+        if self.configs is None:
+            self.reset(1, True)
+
+        with np.errstate(invalid='ignore', divide='ignore'):
+            strategy_std = np.where(self.traded > 1, np.sqrt(self.traded_m2 / (self.traded - 1)), np.nan)
+            strategy_mean = np.where(self.traded > 0, self.traded_mean, np.nan)
+            excess = strategy_mean - (self.risk_free_rate/252)
+            sharpe_daily = excess / strategy_std
+            sortino_daily = excess / np.sqrt(self.downside / self.traded)
+
+            annual_mean = np.mean(list(self.annual.values()), axis=0) * 100 if len(self.annual) > 0 else np.full(self.configs, np.nan)
+            max_drawdown = np.abs(self.min_drawdown)
+            calmar = annual_mean / max_drawdown
+            win_rate = self.wins / self.traded * 100
+        exposure = self.traded / self.bars * 100 if self.bars > 0 else np.full(self.configs, np.nan)
+
+        values = {
+            'net_returns_percent': self.total * 100,
+            'final_equity': (self.total * self.cash) + self.cash,
+            'peak': self.peak,
+            'max_drawdown': max_drawdown,
+            'annual_mean': annual_mean,
+            'sharpe_daily': sharpe_daily,
+            'sharpe_annual': sharpe_daily * np.sqrt(252),
+            'sortino_daily': sortino_daily,
+            'sortino_annual': sortino_daily * np.sqrt(252),
+            'calmar': calmar,
+            'win_rate': win_rate,
+            'exposure': exposure,
+        }
+        if self.squeeze:
+            return {k: float(np.asarray(v).reshape(-1)[0]) for k, v in values.items()}
+        return values
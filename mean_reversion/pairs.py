@@ -0,0 +1,88 @@
+import numpy as np
+from . import arrays
+from .mean_reversion import MeanReversion, Hyperparameters, Accounts
+from .memo import StageCache, stage_cache, fingerprint
+from .store import ResultStore
+
+"""
+Pairs-trading spread.
+
+The spread is y - beta * x between two instruments, with beta the rolling
+OLS slope of y on x over hedge_period bars, computed from running sums. The
+fair value beta * x takes the place of the single-instrument mean, so the
+z-score, position and signal logic of MeanReversion is reused unchanged.
+
+A long spread position holds one unit of y against beta units of x. In
+return terms the x leg is weighted by beta * x / y as of the previous bar,
+so the strategy return is signal * (r_y - weight * r_x).
+"""
+
+
+class PairsMeanReversion(MeanReversion):
+
+    def __init__(self,
+                 data,
+                 data_x,
+                 hyperparemeters:Hyperparameters,
+                 accounts:Accounts,
+                 hedge_period:int=None,
+                 verbose:bool=True,
+                 cache:StageCache=stage_cache,
+                 store:ResultStore=None):
+        """
+        data is the y leg and data_x the x leg; they are aligned on their common
+        timestamps. hedge_period defaults to the mean period, which the pairs
+        spread does not otherwise use.
+        """
+        if hyperparemeters.stop_loss is not None or hyperparemeters.take_profit is not None:
+            # price levels of the y leg say nothing about the spread
+            raise ValueError("Invalid risk exits. Pairs only support max_holding, not stop_loss or take_profit.")
+        self.hedge_period = hedge_period if hedge_period is not None else hyperparemeters.mean_period
+
+        data.columns = [c.lower() for c in data.columns]
+        data_x.columns = [c.lower() for c in data_x.columns]
+        data = data.join(data_x['close'].rename('close_x'), how='inner')
+
+        if verbose:
+            print(f"Pairs Spread. Hedge Period: {self.hedge_period}")
+        super().__init__(data, hyperparemeters, accounts, verbose=verbose, cache=cache, store=store)
+
+    def build_model(self, data):
+        data['hedge_ratio'] = arrays.rolling_beta(data['close'], data['close_x'], self.hedge_period)
+        data['hedge_weight'] = data['hedge_ratio'] * data['close_x'] / data['close']
+        data = super().build_model(data)
+
+        # contribution of each leg to the strategy returns
+        signal = data['signal'].fillna(0)
+        if self.hyperparameters.side == self.tpl_side.side_long:
+            signal = signal.clip(lower=0)
+        elif self.hyperparameters.side == self.tpl_side.side_short:
+            signal = signal.clip(upper=0)
+        data['y_returns'] = (signal * data['log_returns_y']).fillna(0)
+        data['x_returns'] = (-signal * data['hedge_weight'].shift(1) * data['log_returns_x']).fillna(0)
+        return data
+
+    def log_returns(self, data):
+        data['log_returns_y'] = np.log(data['close']/data['close'].shift(1))
+        data['log_returns_x'] = np.log(data['close_x']/data['close_x'].shift(1))
+        return data['log_returns_y'] - data['hedge_weight'].shift(1) * data['log_returns_x']
+
+    def cache_key(self, data):
+        return (fingerprint(data['close'].to_numpy(dtype=float)),
+                fingerprint(data['close_x'].to_numpy(dtype=float)),
+                'pairs', self.hedge_period)
+
+    def store_params(self) -> dict:
+        return {'hedge_period': self.hedge_period, **super().store_params()}
+
+    def risk_exits(self, data):
+        # only the holding limit applies to the spread
+        if self.hyperparameters.max_holding is None:
+            return
+        close = data['close'].to_numpy(dtype=float)
+        signal, returns, _ = arrays.risk_exits(data['signal'], data['log_returns'], close, close, close, max_holding=self.hyperparameters.max_holding)
+        data['signal'] = signal
+        data['strategy_returns'] = returns
+
+    def fair_value(self, data, key):
+        return data['hedge_ratio'] * data['close_x']
@@ -0,0 +1,156 @@
+import os
+import numpy as np
+import pandas as pd
+from concurrent.futures import ProcessPoolExecutor, as_completed
+from multiprocessing import shared_memory
+from .mean_reversion import MeanReversion, Hyperparameters, Accounts
+from .sweep import ParameterGrid
+
+"""
+Process pool sweep runner.
+
+Price columns are copied once into shared memory; workers attach to the
+block in their initializer and build a DataFrame view over it, so the
+prices are never pickled per task.
+"""
+
+
+class SharedFrame:
+
+    def __init__(self, data, columns:list=None):
+        # lower case lookup without renaming the caller's columns
+        names = {str(c).lower(): c for c in data.columns}
+        if columns is None:
+            columns = [c for c in ['open', 'high', 'low', 'close'] if c in names]
+        self.columns = columns
+
+        values = data[[names[c] for c in columns]].to_numpy(dtype=float)
+        self.index_tz = None
+        if isinstance(data.index, pd.DatetimeIndex) and data.index.tz is not None:
+            # stored as naive UTC, like DataCache, and localized again on attach
+            self.index_tz = str(data.index.tz)
+            index = data.index.tz_convert('UTC').tz_localize(None).to_numpy()
+        else:
+            index = data.index.to_numpy()
+        self.index_dtype = index.dtype.str
+
+        self.values_shm = self.create(values)
+        self.index_shm = self.create(index.view('i8'))
+        self.shape = values.shape
+
+    @staticmethod
+    def create(array):
+        shm = shared_memory.SharedMemory(create=True, size=max(array.nbytes, 1))
+        np.ndarray(array.shape, dtype=array.dtype, buffer=shm.buf)[:] = array
+        return shm
+
+    def spec(self) -> dict:
+        return {
+            'values': self.values_shm.name,
+            'index': self.index_shm.name,
+            'shape': self.shape,
+            'columns': self.columns,
+            'index_dtype': self.index_dtype,
+            'index_tz': self.index_tz,
+        }
+
+    @staticmethod
+    def attach(spec:dict):
+        """
+        Returns (data, handles). The handles must stay referenced for as long as data is used.
+        """
+        handles = []
+        for key in ['values', 'index']:
+            handles.append(shared_memory.SharedMemory(name=spec[key]))
+
+        rows, cols = spec['shape']
+        values = np.ndarray((rows, cols), dtype=float, buffer=handles[0].buf)
+        index = np.ndarray((rows,), dtype='i8', buffer=handles[1].buf).view(spec['index_dtype'])
+        index = pd.Index(index, name='date', copy=False)
+        if spec.get('index_tz') is not None:
+            index = index.tz_localize('UTC').tz_convert(spec['index_tz'])
+        data = pd.DataFrame(values, index=index, columns=spec['columns'], copy=False)
+        return data, handles
+
+    def close(self):
+        for shm in [self.values_shm, self.index_shm]:
+            shm.close()
+            shm.unlink()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *args):
+        self.close()
+
+
+_worker = {}
+
+
+def _init_worker(spec:dict, cash, exits:dict=None):
+    data, handles = SharedFrame.attach(spec)
+    _worker['data'] = data
+    _worker['handles'] = handles
+    _worker['accounts'] = Accounts(cash)
+    _worker['exits'] = exits or {}
+
+
+def _run_chunk(params:list) -> list:
+    rows = []
+    for p in params:
+        hparam = Hyperparameters(*p, **_worker['exits'])
+        sim = MeanReversion(_worker['data'], hparam, _worker['accounts'], verbose=False)
+        rows.append(sim.metrics.to_dict())
+    return rows
+
+
+class ParallelSweep:
+
+    def __init__(self,
+                 data,
+                 grid:ParameterGrid,
+                 accounts:Accounts,
+                 max_workers:int=None,
+                 chunk_size:int=16,
+                 progress=None,
+                 stop_loss:float=None,
+                 take_profit:float=None,
+                 max_holding:int=None):
+        """
+        stop_loss, take_profit and max_holding add the same risk exits to
+        every config (see Hyperparameters).
+        """
+        self.data = data
+        self.grid = grid
+        self.cash = accounts.cash
+        self.max_workers = max_workers if max_workers is not None else os.cpu_count()
+        self.chunk_size = chunk_size
+        # progress(completed, total) is called in the parent as chunks finish
+        self.progress = progress
+        exits = {'stop_loss': stop_loss, 'take_profit': take_profit, 'max_holding': max_holding}
+        self.exits = {k: v for k, v in exits.items() if v is not None}
+
+    def run(self) -> pd.DataFrame:
+        if not self.grid.validate() or not Hyperparameters.valid_exits(**self.exits):
+            return None
+
+        combinations = self.grid.combinations()
+        params = [(mp, smp, ssp, t, side, calc) for calc, mp, smp, ssp, t, side in combinations]
+        chunks = [params[i:i + self.chunk_size] for i in range(0, len(params), self.chunk_size)]
+        results = [None] * len(chunks)
+
+        with SharedFrame(self.data) as shared:
+            with ProcessPoolExecutor(max_workers=self.max_workers,
+                                     initializer=_init_worker,
+                                     initargs=(shared.spec(), self.cash, self.exits)) as executor:
+                futures = {executor.submit(_run_chunk, chunk): i for i, chunk in enumerate(chunks)}
+                completed = 0
+                for future in as_completed(futures):
+                    results[futures[future]] = future.result()
+                    completed += len(chunks[futures[future]])
+                    if self.progress is not None:
+                        self.progress(completed, len(params))
+
+        frame = pd.DataFrame(combinations, columns=ParameterGrid.keys)
+        metrics = pd.DataFrame([row for chunk in results for row in chunk])
+        return pd.concat([frame, metrics], axis=1)
@@ -1,81 +1,191 @@
-import matplotlib.pyplot as plt 
-import seaborn as sns
-plt.style.use('seaborn-v0_8-darkgrid')
+import os
+import pandas as pd
+from concurrent.futures import ProcessPoolExecutor
+from .downsample import downsample
+
+"""
+matplotlib and seaborn are imported on first use of Plots so that importing
+the package stays cheap for batch and headless runs.
+"""
+plt = None
+sns = None
+headless_mode = False
+
 bg_color_light = '#3A3B3C'
 bg_color = '#242526'
 fg_color = '#B0B3B8'
 
-plt.rcParams['font.size'] = 11 
-plt.rcParams['font.family'] = 'Calibri'
-plt.rcParams['axes.labelcolor'] = fg_color
-plt.rcParams['axes.titlecolor'] = fg_color
-plt.rcParams['axes.facecolor'] = bg_color
-plt.rcParams['xtick.color'] = fg_color
-plt.rcParams['xtick.labelcolor'] = fg_color
-plt.rcParams['ytick.color'] = fg_color
-plt.rcParams['ytick.labelcolor'] = fg_color
-plt.rcParams['grid.color'] = bg_color_light
-plt.rcParams['figure.facecolor'] = bg_color
-plt.rcParams['legend.labelcolor'] = fg_color
+
+def headless(enabled:bool=True):
+    # render with the non-interactive Agg backend; plt.show() becomes a no-op
+    global headless_mode
+    headless_mode = enabled
+    if enabled and plt is not None:
+        plt.switch_backend('Agg')
+
+
+def load():
+    global plt, sns
+    if plt is not None:
+        return
+
+    import matplotlib
+    if headless_mode:
+        matplotlib.use('Agg')
+    import matplotlib.pyplot as pyplot
+    import seaborn
+
+    plt = pyplot
+    sns = seaborn
+
+    plt.style.use('seaborn-v0_8-darkgrid')
+    plt.rcParams['font.size'] = 11 
+    plt.rcParams['font.family'] = 'Calibri'
+    plt.rcParams['axes.labelcolor'] = fg_color
+    plt.rcParams['axes.titlecolor'] = fg_color
+    plt.rcParams['axes.facecolor'] = bg_color
+    plt.rcParams['xtick.color'] = fg_color
+    plt.rcParams['xtick.labelcolor'] = fg_color
+    plt.rcParams['ytick.color'] = fg_color
+    plt.rcParams['ytick.labelcolor'] = fg_color
+    plt.rcParams['grid.color'] = bg_color_light
+    plt.rcParams['figure.facecolor'] = bg_color
+    plt.rcParams['legend.labelcolor'] = fg_color
 
 class Plots:
 
-    def __init__(self, data):
+    kinds = ['spread_signal', 'equity_curve', 'heatmap', 'annual_returns']
+
+    def __init__(self, data, points:int=2000, method:str='lttb'):
+        """
+        Long series are downsampled to about `points` points per line with
+        'lttb' or 'minmax' before drawing; points=None draws every bar.
+        """
+        load()
         self.data = data 
-        
+        self.points = points
+        self.method = method
 
-    def plot_spread_signal(self):
+    def series(self, column:str, method:str=None) -> pd.Series:
+        return downsample(self.data[column], self.points, method or self.method)
+
+    def line(self, ax, column:str, **kwargs):
+        # plain matplotlib lines skip the pandas plotting overhead
+        series = self.series(column)
+        ax.plot(series.index, series.to_numpy(), **kwargs)
+
+    # ----------------------------- figures ----------------------------- #
+
+    def figure_spread_signal(self):
         fig, ax = plt.subplots(figsize=(12, 4))
-        self.data['z_score'].plot(ax=ax, color='dodgerblue',alpha=0.8)
-        self.data['z_upper'].plot(ax=ax, color ='red', alpha=0.8, ls='--')
-        self.data['z_lower'].plot(ax=ax, color='red',alpha=0.8, ls='--')
-        plt.ylabel('Z-Score')
+        self.line(ax, 'z_score', color='dodgerblue',alpha=0.8)
+        self.line(ax, 'z_upper', color ='red', alpha=0.8, ls='--')
+        self.line(ax, 'z_lower', color='red',alpha=0.8, ls='--')
+        ax.set_ylabel('Z-Score')
 
         ax1=ax.twinx()
-        self.data['spread'].plot(ax=ax1, color='darkgrey',alpha=0.8)
-        plt.ylabel('Spread')
+        self.line(ax1, 'spread', color='darkgrey',alpha=0.8)
+        ax1.set_ylabel('Spread')
 
-        plt.grid()
-        plt.title('Spread vs Z-Score')
-        plt.show()
-        
-    def plot_equity_curve(self):
+        ax.grid()
+        ax.set_title('Spread vs Z-Score')
+        return fig
+
+    def figure_equity_curve(self):
         fig, (ax, ax2) = plt.subplots(2, 1, figsize=(12, 8), sharex=True,gridspec_kw={'height_ratios':[3, 1]})
-        self.data['equity'].plot(color='dodgerblue', ax = ax)
+        self.line(ax, 'equity', color='dodgerblue')
         ax.set_ylabel('Equity (PHP)')
         ax.legend(labels=['Equity'])
 
         #plt.title(f'{ticker} Equity Curve - Mean Reversion')
 
-        self.data['drawdown'].plot(ax=ax2, kind='area', color = 'red', alpha = 0.3)
+        # min/max buckets keep the deepest drawdowns
+        drawdown = self.series('drawdown', 'minmax')
+        ax2.fill_between(drawdown.index, drawdown.to_numpy(), 0, color = 'red', alpha = 0.3)
         ax2.set_ylabel('Drawdown (%)')
-        plt.show()
+        return fig
 
-    def plot_heatmap(self):
+    def figure_heatmap(self):
         returns = self.data[['strategy_returns']]
         grouped = returns.groupby([returns.index.year, returns.index.month])[['strategy_returns']].sum()
         grouped.index = grouped.index.rename(names=['year','month'])
         grouped = grouped.reset_index()
 
         matrix = grouped.pivot_table(values='strategy_returns', index=grouped['year'], columns=grouped['month'])
-        matrix.columns=['Jan','Feb','Mar','Apr','May','Jun','Jul','Aug','Sep','Oct','Nov','Dec']
+        months = ['Jan','Feb','Mar','Apr','May','Jun','Jul','Aug','Sep','Oct','Nov','Dec']
+        matrix.columns=[months[m - 1] for m in matrix.columns]
         
-        plt.figure(figsize=(10,7))
+        fig = plt.figure(figsize=(10,7))
 
         sns.heatmap(matrix, annot=True, fmt='.2%', cbar=False)
 
         plt.xlabel('Month')
         plt.ylabel('Year')
-        plt.show()
+        return fig
 
-    def plot_annual_returns(self): 
+    def figure_annual_returns(self): 
 
         target_data = self.data['strategy_returns']
         grouped = target_data.groupby(target_data.index.year).sum() * 100 
-        grouped.plot(kind='bar', figsize=(10, 6), color ='dodgerblue')
-        plt.xlabel('Year')
-        plt.ylabel('Returns (%)')
-        plt.title('Annual Returns - Mean Reversion')
-        plt.grid()
+        fig, ax = plt.subplots(figsize=(10, 6))
+        grouped.plot(kind='bar', ax=ax, color ='dodgerblue')
+        ax.set_xlabel('Year')
+        ax.set_ylabel('Returns (%)')
+        ax.set_title('Annual Returns - Mean Reversion')
+        ax.grid()
+        return fig
+
+    # ----------------------------- interactive ----------------------------- #
+
+    def plot_spread_signal(self):
+        self.figure_spread_signal()
+        plt.show()
+        
+    def plot_equity_curve(self):
+        self.figure_equity_curve()
         plt.show()
-        
\ No newline at end of file
+
+    def plot_heatmap(self):
+        self.figure_heatmap()
+        plt.show()
+
+    def plot_annual_returns(self): 
+        self.figure_annual_returns()
+        plt.show()
+
+    # ----------------------------- export ----------------------------- #
+
+    def save(self, kind:str, path:str, dpi:int=100) -> str:
+        # renders one plot type to a file; the format follows the extension (png, svg)
+        fig = getattr(self, f"figure_{kind}")()
+        fig.savefig(path, dpi=dpi, facecolor=fig.get_facecolor())
+        plt.close(fig)
+        return path
+
+    def export(self, directory:str, name:str='run', formats:list=None, dpi:int=100) -> list:
+        os.makedirs(directory, exist_ok=True)
+        formats = formats if formats is not None else ['png']
+        return [self.save(kind, os.path.join(directory, f"{name}_{kind}.{fmt}"), dpi) for kind in self.kinds for fmt in formats]
+
+
+def _export_run(name:str, data, directory:str, formats:list, points:int, dpi:int) -> list:
+    headless()
+    return Plots(data, points).export(directory, name, formats, dpi)
+
+
+def export_reports(runs:dict, directory:str, formats:list=None, points:int=2000, dpi:int=100, max_workers:int=None) -> dict:
+    """
+    Renders the four plot types of every run ({name: built model}) to files
+    off-screen, one run per worker process. Returns {name: [paths]}.
+    """
+    # only the plotted columns are sent to the workers
+    columns = ['z_score', 'z_upper', 'z_lower', 'spread', 'equity', 'drawdown', 'strategy_returns']
+    runs = {name: data[columns] for name, data in runs.items()}
+    max_workers = max_workers if max_workers is not None else min(len(runs), os.cpu_count())
+
+    if max_workers <= 1 or len(runs) <= 1:
+        return {name: _export_run(name, data, directory, formats, points, dpi) for name, data in runs.items()}
+
+    with ProcessPoolExecutor(max_workers=max_workers) as executor:
+        futures = {name: executor.submit(_export_run, name, data, directory, formats, points, dpi) for name, data in runs.items()}
+        return {name: future.result() for name, future in futures.items()}
@@ -0,0 +1,120 @@
+import os
+import numpy as np
+import pandas as pd
+from concurrent.futures import ProcessPoolExecutor
+from .data_loader import DataLoader
+from .mean_reversion import MeanReversion, Hyperparameters, Accounts
+from .metrics import BatchMetrics
+
+"""
+Multi-asset portfolio backtest.
+
+Each leg is loaded and modelled in its own worker process, so only its
+strategy returns travel back to the parent. The legs are aligned in one outer
+join on the union of their timestamps; a leg contributes zero return on
+timestamps where it has no bar, which lets h1, h4 and d1 files be combined.
+"""
+
+
+def _run_leg(file:str, hyperparameters:Hyperparameters, cash) -> pd.Series:
+    data = DataLoader().load_data(file)
+    if data is None:
+        return None
+    try:
+        sim = MeanReversion(data, hyperparameters, Accounts(cash), verbose=False)
+        return sim.built_model['strategy_returns'].rename(file)
+    except (KeyError, ValueError) as e:
+        print(f"Unable to run leg {file}. {e}")
+        return None
+
+
+class Portfolio:
+
+    def __init__(self,
+                 hyperparameters,
+                 accounts:Accounts,
+                 files:list=None,
+                 weights:dict=None,
+                 max_workers:int=None):
+        """
+        hyperparameters is one Hyperparameters for every leg or a dict of
+        {file: Hyperparameters}. weights defaults to equal weights over the
+        legs that load; legs that fail to load are reported and kept in
+        self.dropped.
+        """
+        self.files = files if files is not None else sorted(DataLoader().files())
+        self.hyperparameters = hyperparameters if isinstance(hyperparameters, dict) else {f: hyperparameters for f in self.files}
+        self.cash = accounts.cash
+        self.weights = weights
+        self.max_workers = max_workers if max_workers is not None else min(len(self.files), os.cpu_count())
+
+        self.returns = None
+        self.leg_returns = None
+        self.equity = None
+        self.drawdown = None
+        self.metrics = None
+        self.contribution = None
+        self.dropped = None
+
+    def run(self) -> pd.DataFrame:
+        with ProcessPoolExecutor(max_workers=self.max_workers) as executor:
+            legs = list(executor.map(_run_leg,
+                                     self.files,
+                                     [self.hyperparameters[f] for f in self.files],
+                                     [self.cash] * len(self.files)))
+
+        self.dropped = [f for f, leg in zip(self.files, legs) if leg is None]
+        legs = [leg for leg in legs if leg is not None]
+        if len(self.dropped) > 0:
+            print(f"Legs not loaded: {self.dropped}")
+        if len(legs) == 0:
+            print("No legs could be loaded.")
+            return None
+
+        loaded = [leg.name for leg in legs]
+        leg_weights = self.weights if self.weights is not None else {f: 1 / len(loaded) for f in loaded}
+        unweighted = [f for f in loaded if f not in leg_weights]
+        if len(unweighted) > 0:
+            print(f"Legs without a weight (weighted 0): {unweighted}")
+
+        # single outer join on the union of timestamps
+        aligned = pd.concat(legs, axis=1, join='outer', sort=True).fillna(0)
+        weights = np.array([leg_weights.get(c, 0) for c in aligned.columns])
+        self.leg_returns = aligned * weights
+
+        self.returns = self.leg_returns.sum(axis=1).rename('strategy_returns')
+        self.equity = (self.returns.cumsum() * self.cash) + self.cash
+        peak = self.equity.cummax()
+        self.drawdown = (self.equity - peak) / peak * 100
+        self.metrics = {k: float(v[0]) for k, v in BatchMetrics(self.returns.to_numpy(), self.cash, self.returns.index).to_dict().items()}
+
+        # standalone statistics of each leg
+        per_asset = BatchMetrics(aligned.to_numpy(), self.cash, aligned.index).to_dict()
+        self.contribution = pd.DataFrame({
+            'weight': weights,
+            'bars': aligned.ne(0).sum().to_numpy(),
+            'contribution_percent': self.leg_returns.sum().to_numpy() * 100,
+            'max_drawdown': per_asset['max_drawdown'],
+            'sharpe_annual': per_asset['sharpe_annual'],
+        }, index=aligned.columns)
+        total = self.returns.sum()
+        self.contribution['share'] = self.leg_returns.sum().to_numpy() / total if total != 0 else np.nan
+        return self.contribution
+
+    def show_data(self):
+        print()
+        print("===== PORTFOLIO RESULTS =====")
+        print(f"Legs: {len(self.contribution)}")
+        print(f"Returns: {self.metrics['net_returns_percent']:.2f}%")
+        print(f"Deposit: ${self.cash}")
+        print(f"Final Equity: ${self.metrics['final_equity']:.2f}")
+        print(f"Peak: ${self.metrics['peak']:.2f}")
+        print(f"Max Drawdown: {self.metrics['max_drawdown']:.2f}%")
+        print(f"Average Annual Returns: {self.metrics['annual_mean']:.2f}%")
+        print(f"Daily Sharpe: {self.metrics['sharpe_daily']:.2f}")
+        print(f"Annualized Sharpe: {self.metrics['sharpe_annual']:.2f}")
+        print()
+        print("===== CONTRIBUTION =====")
+        print(self.contribution.to_string(float_format=lambda v: f"{v:.2f}"))
+        print("==========")
+        print()
@@ -0,0 +1,205 @@
+import functools
+import json
+import logging
+import time
+import tracemalloc
+import pandas as pd
+
+"""
+Opt-in per-stage instrumentation.
+
+Stages are marked with `with stage('name'):` blocks or the @timed('name')
+decorator. While no profiler is enabled, stage() returns one shared no-op
+context and timed functions call straight through, so the only cost is a
+global lookup per stage. An enabled Profiler records wall time and call
+counts per stage, plus the tracemalloc peak above the memory in use on
+entry when memory=True (which slows the run). Stages nest, and every
+finished stage is also passed to the sinks.
+"""
+
+
+class MemorySink:
+    # keeps every stage event in a list
+
+    def __init__(self):
+        self.events = []
+
+    def write(self, event:dict):
+        self.events.append(event)
+
+    def close(self):
+        pass
+
+
+class LogSink:
+    # one log line per stage event
+
+    def __init__(self, logger:logging.Logger=None, level:int=logging.INFO):
+        self.logger = logger if logger is not None else logging.getLogger('mean_reversion.profiling')
+        self.level = level
+
+    def write(self, event:dict):
+        peak = f", peak {event['peak_memory'] / 2**20:.1f}MB" if event['peak_memory'] is not None else ""
+        self.logger.log(self.level, f"{'  ' * event['depth']}{event['stage']}: {event['wall_time'] * 1000:.2f}ms{peak}")
+
+    def close(self):
+        pass
+
+
+class JSONSink:
+    # appends one JSON line per stage event
+
+    def __init__(self, path:str):
+        self.file = open(path, 'a')
+
+    def write(self, event:dict):
+        self.file.write(json.dumps(event) + '\n')
+
+    def close(self):
+        self.file.close()
+
+
+class Stage:
+
+    def __init__(self, profiler, name:str):
+        self.profiler = profiler
+        self.name = name
+
+    def __enter__(self):
+        self.profiler.enter(self.name)
+        return self
+
+    def __exit__(self, *exc):
+        self.profiler.exit()
+        return False
+
+
+class Profiler:
+
+    def __init__(self, sinks:list=None, memory:bool=False):
+        self.sinks = sinks if sinks is not None else []
+        self.memory = memory
+        self.stats = {}
+        # open stages as [name, start time, memory on entry, highest peak of finished children]
+        self.stack = []
+        self.started_tracing = False
+
+    def start(self):
+        if self.memory and not tracemalloc.is_tracing():
+            tracemalloc.start()
+            self.started_tracing = True
+
+    def stop(self):
+        if self.started_tracing:
+            tracemalloc.stop()
+            self.started_tracing = False
+        for sink in self.sinks:
+            sink.close()
+
+    def stage(self, name:str) -> Stage:
+        return Stage(self, name)
+
+    def enter(self, name:str):
+        current = None
+        if self.memory:
+            current, peak = tracemalloc.get_traced_memory()
+            if len(self.stack) > 0:
+                # the parent keeps the peak reached before this stage resets it
+                self.stack[-1][3] = max(self.stack[-1][3], peak)
+            tracemalloc.reset_peak()
+        if name not in self.stats:
+            self.stats[name] = {'calls': 0, 'wall_time': 0.0, 'peak_memory': None, 'depth': len(self.stack)}
+        self.stack.append([name, time.perf_counter(), current, 0])
+
+    def exit(self):
+        end = time.perf_counter()
+        name, start, current, children = self.stack.pop()
+
+        peak = None
+        if self.memory:
+            absolute = max(tracemalloc.get_traced_memory()[1], children)
+            peak = absolute - current
+            if len(self.stack) > 0:
+                self.stack[-1][3] = max(self.stack[-1][3], absolute)
+
+        stats = self.stats[name]
+        stats['calls'] += 1
+        stats['wall_time'] += end - start
+        if peak is not None:
+            stats['peak_memory'] = max(stats['peak_memory'] or 0, peak)
+
+        if len(self.sinks) > 0:
+            event = {'stage': name, 'wall_time': end - start, 'peak_memory': peak, 'depth': len(self.stack), 'time': time.time()}
+            for sink in self.sinks:
+                sink.write(event)
+
+    def reset(self):
+        # open stages keep their entries
+        self.stats = {name: {'calls': 0, 'wall_time': 0.0, 'peak_memory': None, 'depth': depth}
+                      for depth, (name, *_) in enumerate(self.stack)}
+
+    def to_frame(self) -> pd.DataFrame:
+        # one row per stage in the order stages were first entered
+        rows = [{'stage': name, **stats} for name, stats in self.stats.items()]
+        frame = pd.DataFrame(rows, columns=['stage', 'calls', 'wall_time', 'peak_memory', 'depth'])
+        frame['mean_time'] = frame['wall_time'] / frame['calls']
+        return frame
+
+    def show_data(self):
+        print()
+        print("===== TIMING BREAKDOWN =====")
+        for name, stats in self.stats.items():
+            peak = f"  peak {stats['peak_memory'] / 2**20:8.1f}MB" if stats['peak_memory'] is not None else ""
+            print(f"{'  ' * stats['depth']}{name:<{32 - 2 * stats['depth']}} {stats['wall_time'] * 1000:10.2f}ms  x{stats['calls']}{peak}")
+        print("==========")
+        print()
+
+
+class _NoStage:
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        return False
+
+
+_no_stage = _NoStage()
+_profiler = None
+
+
+def enable(sinks:list=None, memory:bool=False) -> Profiler:
+    global _profiler
+    disable()
+    _profiler = Profiler(sinks, memory)
+    _profiler.start()
+    return _profiler
+
+
+def disable():
+    global _profiler
+    if _profiler is not None:
+        _profiler.stop()
+    _profiler = None
+
+
+def active() -> Profiler:
+    return _profiler
+
+
+def stage(name:str):
+    if _profiler is None:
+        return _no_stage
+    return _profiler.stage(name)
+
+
+def timed(name:str):
+    def decorate(fn):
+        @functools.wraps(fn)
+        def wrapper(*args, **kwargs):
+            if _profiler is None:
+                return fn(*args, **kwargs)
+            with _profiler.stage(name):
+                return fn(*args, **kwargs)
+        return wrapper
+    return decorate
@@ -0,0 +1,212 @@
+import hashlib
+import json
+import math
+import os
+import sqlite3
+import time
+import numpy as np
+import pandas as pd
+
+"""
+Persistent result store.
+
+Results are kept in a SQLite file, one row per run, keyed by a hash of the
+dataset contents, the model, its hyperparameters, the cash and the code
+version (a hash of the package sources), so any change to the data or the
+code invalidates what was stored. Each row holds the metrics summary as
+JSON and, when keep_equity is on, the equity curve is stored next to it.
+Rows can be filtered and ranked by any metric across sessions.
+"""
+
+_code_version = None
+
+
+def code_version() -> str:
+    global _code_version
+    if _code_version is None:
+        directory = os.path.dirname(os.path.abspath(__file__))
+        h = hashlib.blake2b(digest_size=8)
+        for name in sorted(f for f in os.listdir(directory) if f.endswith('.py')):
+            with open(os.path.join(directory, name), 'rb') as f:
+                h.update(name.encode())
+                h.update(f.read())
+        _code_version = h.hexdigest()
+    return _code_version
+
+
+def data_key(data:pd.DataFrame) -> str:
+    # hash of the timestamps and every numeric column
+    h = hashlib.blake2b(digest_size=16)
+    h.update(pd.util.hash_pandas_object(data.index, index=False).to_numpy().tobytes())
+    for c in sorted(data.columns):
+        values = data[c].to_numpy()
+        if values.dtype.kind not in 'biuf':
+            continue
+        h.update(str(c).encode())
+        h.update(np.ascontiguousarray(values, dtype=float).tobytes())
+    return h.hexdigest()
+
+
+class ResultStore:
+
+    config_columns = ['calc_type', 'mean_period', 'spread_mean_period', 'spread_sdev_period', 'threshold', 'side']
+    filter_columns = ['model', 'data', 'code', 'cash'] + config_columns
+
+    def __init__(self, path:str='results.db', keep_equity:bool=False):
+        self.path = path
+        self.keep_equity = keep_equity
+        self.connection = sqlite3.connect(path)
+        self.connection.execute("""
+            CREATE TABLE IF NOT EXISTS results (
+                key TEXT PRIMARY KEY,
+                model TEXT,
+                data TEXT,
+                code TEXT,
+                cash REAL,
+                calc_type TEXT,
+                mean_period INTEGER,
+                spread_mean_period INTEGER,
+                spread_sdev_period INTEGER,
+                threshold REAL,
+                side TEXT,
+                params TEXT,
+                metrics TEXT,
+                detail TEXT,
+                created REAL
+            )""")
+        self.connection.execute("CREATE TABLE IF NOT EXISTS equity (key TEXT PRIMARY KEY, timestamps BLOB, equity BLOB)")
+        self.connection.commit()
+
+    @staticmethod
+    def config(hyperparameters) -> tuple:
+        # in ParameterGrid.keys order
+        hp = hyperparameters
+        return (hp.calc_type, hp.mean_period, hp.spread_mean_period, hp.spread_sdev_period, hp.threshold, hp.side)
+
+    @staticmethod
+    def canonical(config:tuple) -> list:
+        # one type per config value, so 1 and 1.0 (or numpy scalars) give the same key
+        calc_type, mean_period, spread_mean_period, spread_sdev_period, threshold, side = config
+        return [str(calc_type), int(mean_period), int(spread_mean_period), int(spread_sdev_period), float(threshold), str(side)]
+
+    @staticmethod
+    def key(data:str, model:str, config:tuple, cash, params:dict=None) -> str:
+        """
+        data is the data_key of the dataset; config is a ParameterGrid.keys
+        tuple (or None) and params any other settings the result depends on.
+        """
+        config = ResultStore.canonical(config) if config is not None else None
+        content = json.dumps([data, model, config, float(cash), params or {}, code_version()],
+                             sort_keys=True, default=str)
+        return hashlib.blake2b(content.encode(), digest_size=16).hexdigest()
+
+    # ----------------------------- read / write ----------------------------- #
+
+    def get(self, key:str) -> dict:
+        # the stored metrics summary, or None
+        row = self.connection.execute("SELECT metrics FROM results WHERE key = ?", (key,)).fetchone()
+        return self.loads(row[0]) if row is not None else None
+
+    def get_many(self, keys:list) -> dict:
+        found = {}
+        for start in range(0, len(keys), 500):
+            chunk = keys[start:start + 500]
+            placeholders = ','.join('?' * len(chunk))
+            for key, metrics in self.connection.execute(f"SELECT key, metrics FROM results WHERE key IN ({placeholders})", chunk):
+                found[key] = self.loads(metrics)
+        return found
+
+    def detail(self, key:str):
+        row = self.connection.execute("SELECT detail FROM results WHERE key = ?", (key,)).fetchone()
+        return json.loads(row[0]) if row is not None and row[0] is not None else None
+
+    def put(self, key:str, data:str, model:str, config:tuple, cash, metrics:dict, params:dict=None, detail=None, equity:pd.Series=None):
+        self.put_many([(key, data, model, config, cash, metrics, params, detail, equity)])
+
+    def put_many(self, rows:list):
+        """
+        rows are (key, data, model, config, cash, metrics, params, detail, equity)
+        tuples, written in one transaction.
+        """
+        now = time.time()
+        with self.connection:
+            for key, data, model, config, cash, metrics, params, detail, equity in rows:
+                config = tuple(config) if config is not None else (None,) * len(self.config_columns)
+                self.connection.execute(
+                    "INSERT OR REPLACE INTO results VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)",
+                    (key, model, data, code_version(), float(cash)) + tuple(self.plain(v) for v in config) +
+                    (json.dumps(params or {}, default=str),
+                     json.dumps({k: self.plain(v) for k, v in metrics.items()}),
+                     json.dumps(detail, default=str) if detail is not None else None,
+                     now))
+                if equity is not None and self.keep_equity:
+                    timestamps = equity.index.as_unit('ns').asi8.tobytes() if isinstance(equity.index, pd.DatetimeIndex) else None
+                    self.connection.execute(
+                        "INSERT OR REPLACE INTO equity VALUES (?, ?, ?)",
+                        (key,
+                         timestamps,
+                         np.ascontiguousarray(equity.to_numpy(), dtype=float).tobytes()))
+
+    def equity(self, key:str) -> pd.Series:
+        row = self.connection.execute("SELECT timestamps, equity FROM equity WHERE key = ?", (key,)).fetchone()
+        if row is None:
+            return None
+        values = np.frombuffer(row[1], dtype=float)
+        index = pd.DatetimeIndex(np.frombuffer(row[0], dtype='i8').view('datetime64[ns]')) if row[0] is not None else None
+        return pd.Series(values, index=index, name='equity')
+
+    @staticmethod
+    def loads(metrics:str) -> dict:
+        return {k: np.nan if v is None else v for k, v in json.loads(metrics).items()}
+
+    @staticmethod
+    def plain(value):
+        # numpy scalars to Python values, NaN to None (JSON null)
+        value = value.item() if hasattr(value, 'item') else value
+        return None if isinstance(value, float) and math.isnan(value) else value
+
+    # ----------------------------- queries ----------------------------- #
+
+    def query(self, order_by:str=None, ascending:bool=False, limit:int=None, **filters) -> pd.DataFrame:
+        """
+        Stored results as a frame with one column per metric. filters match
+        model, data, code, cash or a hyperparameter exactly; order_by is a metric.
+        """
+        invalid = [k for k in filters if k not in self.filter_columns]
+        if len(invalid) > 0:
+            print(f"Invalid Result Filter. Values: {invalid}, Valid: {self.filter_columns}")
+            return None
+
+        sql = f"SELECT key, model, data, code, cash, {', '.join(self.config_columns)}, params, metrics, created FROM results"
+        args = []
+        if len(filters) > 0:
+            sql += " WHERE " + " AND ".join(f"{k} = ?" for k in filters)
+            args += [self.plain(v) for v in filters.values()]
+        if order_by is not None:
+            sql += f" ORDER BY json_extract(metrics, ?) {'ASC' if ascending else 'DESC'} NULLS LAST"
+            args.append(f"$.{order_by}")
+        if limit is not None:
+            sql += " LIMIT ?"
+            args.append(int(limit))
+
+        rows = self.connection.execute(sql, args).fetchall()
+        columns = ['key', 'model', 'data', 'code', 'cash'] + self.config_columns + ['params']
+        frame = pd.DataFrame([r[:len(columns)] for r in rows], columns=columns)
+        metrics = pd.DataFrame([json.loads(r[-2]) for r in rows], index=frame.index, dtype=float)
+        frame = pd.concat([frame, metrics], axis=1)
+        frame['created'] = pd.to_datetime([r[-1] for r in rows], unit='s')
+        return frame
+
+    def rank(self, metric:str='sharpe_annual', top:int=10, ascending:bool=False, current:bool=True, **filters) -> pd.DataFrame:
+        # best stored results by a metric, by default only those of the current code version
+        if current:
+            filters.setdefault('code', code_version())
+        return self.query(order_by=metric, ascending=ascending, limit=top, **filters)
+
+    def clear(self):
+        with self.connection:
+            self.connection.execute("DELETE FROM results")
+            self.connection.execute("DELETE FROM equity")
+
+    def close(self):
+        self.connection.close()
@@ -0,0 +1,219 @@
+import math
+import numpy as np
+from collections import deque
+from .mean_reversion import Hyperparameters, Accounts, Side, RollingCalculationType
+from .metrics import MetricsAccumulator
+
+"""
+Incremental counterpart of MeanReversion.build_model.
+
+Each estimator consumes one value per update in O(1) time and keeps O(1)
+state (O(period) for the simple rolling window), following the same update
+rules as the pandas ewm/rolling kernels so the streamed output matches the
+batch model to floating point tolerance.
+"""
+
+
+class EWMMean:
+    # pandas ewm(span).mean() with adjust=True, ignore_na=False
+
+    def __init__(self, span:int):
+        self.span = span
+        self.factor = 1 - 2 / (span + 1)
+        self.weighted = math.nan
+        self.old_wt = 1.0
+
+    def update(self, value:float) -> float:
+        observed = value == value
+        if self.weighted == self.weighted:
+            self.old_wt *= self.factor
+            if observed:
+                if self.weighted != value:
+                    self.weighted = ((self.old_wt * self.weighted) + value) / (self.old_wt + 1)
+                self.old_wt += 1
+        elif observed:
+            self.weighted = value
+        return self.weighted
+
+
+class EWMStd:
+    # pandas ewm(span).std() with adjust=True, bias=False
+
+    def __init__(self, span:int):
+        self.span = span
+        self.factor = 1 - 2 / (span + 1)
+        self.mean = math.nan
+        self.cov = 0.0
+        self.sum_wt = 1.0
+        self.sum_wt2 = 1.0
+        self.old_wt = 1.0
+
+    def update(self, value:float) -> float:
+        observed = value == value
+        if self.mean == self.mean:
+            self.sum_wt *= self.factor
+            self.sum_wt2 *= self.factor ** 2
+            self.old_wt *= self.factor
+            if observed:
+                old_mean = self.mean
+                if self.mean != value:
+                    self.mean = ((self.old_wt * old_mean) + value) / (self.old_wt + 1)
+                self.cov = ((self.old_wt * (self.cov + (old_mean - self.mean) ** 2)) + ((value - self.mean) ** 2)) / (self.old_wt + 1)
+                self.sum_wt += 1
+                self.sum_wt2 += 1
+                self.old_wt += 1
+        elif observed:
+            self.mean = value
+        else:
+            return math.nan
+
+        numerator = self.sum_wt * self.sum_wt
+        denominator = numerator - self.sum_wt2
+        if denominator <= 0:
+            return math.nan
+        return math.sqrt(max((numerator / denominator) * self.cov, 0))
+
+
+class RollingMean:
+    # pandas rolling(period).mean(); Kahan compensated running sum over a ring buffer
+
+    def __init__(self, period:int):
+        self.period = period
+        self.window = deque()
+        self.nobs = 0
+        self.total = 0.0
+        self.compensation = 0.0
+
+    def add(self, value:float):
+        y = value - self.compensation
+        t = self.total + y
+        self.compensation = t - self.total - y
+        self.total = t
+
+    def update(self, value:float) -> float:
+        self.window.append(value)
+        if value == value:
+            self.nobs += 1
+            self.add(value)
+        if len(self.window) > self.period:
+            removed = self.window.popleft()
+            if removed == removed:
+                self.nobs -= 1
+                self.add(-removed)
+        if self.nobs < self.period:
+            return math.nan
+        return self.total / self.nobs
+
+
+class RollingStd:
+    # pandas rolling(period).std(); Welford add/remove over a ring buffer
+
+    def __init__(self, period:int):
+        self.period = period
+        self.window = deque()
+        self.nobs = 0
+        self.mean = 0.0
+        self.ssqdm = 0.0
+
+    def update(self, value:float) -> float:
+        self.window.append(value)
+        if value == value:
+            self.nobs += 1
+            delta = value - self.mean
+            self.mean += delta / self.nobs
+            self.ssqdm += delta * (value - self.mean)
+        if len(self.window) > self.period:
+            removed = self.window.popleft()
+            if removed == removed:
+                self.nobs -= 1
+                if self.nobs == 0:
+                    self.mean = 0.0
+                    self.ssqdm = 0.0
+                else:
+                    delta = removed - self.mean
+                    self.mean -= delta / self.nobs
+                    self.ssqdm -= delta * (removed - self.mean)
+        if self.nobs < self.period or self.nobs < 2:
+            return math.nan
+        return math.sqrt(max(self.ssqdm, 0) / (self.nobs - 1))
+
+
+class StreamingMeanReversion:
+
+    def __init__(self, hyperparameters:Hyperparameters, accounts:Accounts):
+        if hyperparameters.exits():
+            # exits need high/low bars and an entry price this model does not track
+            raise ValueError(f"Invalid risk exits. StreamingMeanReversion does not support stop_loss, take_profit or max_holding. Values: {hyperparameters.exits()}")
+        self.hyperparameters = hyperparameters
+        self.cash = accounts.cash
+
+        self.tpl_side = Side()
+        self.tpl_calc = RollingCalculationType()
+
+        if self.hyperparameters.calc_type == self.tpl_calc.calculation_exponential:
+            self.mean = EWMMean(self.hyperparameters.mean_period)
+            self.spread_mu = EWMMean(self.hyperparameters.spread_mean_period)
+            self.spread_sigma = EWMStd(self.hyperparameters.spread_sdev_period)
+        else:
+            self.mean = RollingMean(self.hyperparameters.mean_period)
+            self.spread_mu = RollingMean(self.hyperparameters.spread_mean_period)
+            self.spread_sigma = RollingStd(self.hyperparameters.spread_sdev_period)
+
+        self.last_close = math.nan
+        self.long_pos = 0.0
+        self.short_pos = 0.0
+        self.signal = 0.0
+        self.returns = 0.0
+        self.bars = 0
+        self.metrics = MetricsAccumulator(self.cash)
+
+    def update(self, bar, timestamp=None) -> dict:
+        """
+        Consumes one bar (a close price, or a mapping with a 'close' key) and
+        returns the build_model columns for that bar. The running statistics are
+        kept in self.metrics; pass the bar's timestamp for annual returns.
+        """
+        close = float(bar['close']) if not np.isscalar(bar) else float(bar)
+
+        log_returns = math.log(close / self.last_close) if self.bars > 0 else math.nan
+        self.last_close = close
+        self.bars += 1
+
+        mean = self.mean.update(close)
+        spread = close - mean
+        spread_mu = self.spread_mu.update(spread)
+        spread_sigma = self.spread_sigma.update(spread)
+        with np.errstate(divide='ignore', invalid='ignore'):
+            z_score = float(np.float64(spread - spread_mu) / spread_sigma)
+
+        # signal is the previous bar's position to mitigate look ahead bias
+        signal = self.signal
+        threshold = self.hyperparameters.threshold
+        if z_score < -threshold:
+            self.long_pos = 1.0
+        elif z_score >= 0:
+            self.long_pos = 0.0
+        if z_score > threshold:
+            self.short_pos = -1.0
+        elif z_score <= 0:
+            self.short_pos = 0.0
+        self.signal = self.long_pos + self.short_pos
+
+        strategy_returns = signal * log_returns if log_returns == log_returns else 0.0
+        if self.hyperparameters.side == self.tpl_side.side_long and signal == -1:
+            strategy_returns = 0.0
+        elif self.hyperparameters.side == self.tpl_side.side_short and signal == 1:
+            strategy_returns = 0.0
+
+        self.returns += strategy_returns
+        equity = self.metrics.update_bar(strategy_returns, timestamp)
+        return {
+            'close': close,
+            'mean': mean,
+            'spread': spread,
+            'z_score': z_score,
+            'signal': signal,
+            'strategy_returns': strategy_returns,
+            'returns': self.returns,
+            'equity': equity,
+        }
@@ -0,0 +1,247 @@
+import itertools
+import numpy as np
+import pandas as pd
+from . import arrays
+from .mean_reversion import Defaults, Hyperparameters, Accounts, Side, RollingCalculationType
+from .metrics import BatchMetrics
+from .adf import BatchADF
+from .data_loader import resample
+from .store import ResultStore, data_key
+
+"""
+Vectorized parameter sweep.
+
+Instead of building one MeanReversion per Hyperparameters combination, the
+sweep computes each distinct stage once and evaluates whole blocks of
+configs as bars x configs arrays:
+
+mean / spread               -> one column per (calc_type, mean_period)
+spread mu / spread sigma    -> one column per (calc_type, mean_period, period)
+z-score                     -> one column per (calc_type, mean_period, spread_mean_period, spread_sdev_period)
+positions / returns         -> one column per z-score column, threshold and side
+"""
+
+
+class ParameterGrid:
+
+    keys = ['calc_type', 'mean_period', 'spread_mean_period', 'spread_sdev_period', 'threshold', 'side']
+
+    def __init__(self,
+                 mean_period:list=None,
+                 spread_mean_period:list=None,
+                 spread_sdev_period:list=None,
+                 threshold:list=None,
+                 side:list=None,
+                 calc_type:list=None):
+
+        defaults = Defaults()
+
+        self.mean_period = self.as_list(mean_period, defaults.mean_period)
+        self.spread_mean_period = self.as_list(spread_mean_period, defaults.spread_mean_period)
+        self.spread_sdev_period = self.as_list(spread_sdev_period, defaults.spread_sdev_period)
+        self.threshold = [abs(t) for t in self.as_list(threshold, defaults.threshold)]
+        self.side = self.as_list(side, defaults.side)
+        self.calc_type = self.as_list(calc_type, defaults.calc_type)
+
+    @staticmethod
+    def as_list(values, default):
+        if values is None:
+            return [default]
+        if np.isscalar(values):
+            return [values]
+        return list(dict.fromkeys(values))
+
+    def validate(self) -> bool:
+        for name in ['mean_period', 'spread_mean_period', 'spread_sdev_period']:
+            invalid = [v for v in getattr(self, name) if v <= 0]
+            if len(invalid) > 0:
+                print(f"Invalid {name}. Values must be greater than 0. Values: {invalid}")
+                return False
+
+        s = Side()
+        invalid = [v for v in self.side if v not in s.valid_values]
+        if len(invalid) > 0:
+            print(f"Invalid Side. Values not found in valid values. Values: {invalid}, Valid: {s.valid_values}")
+            return False
+
+        c = RollingCalculationType()
+        invalid = [v for v in self.calc_type if v not in c.valid_values]
+        if len(invalid) > 0:
+            print(f"Invalid Calculation Type. Values not found in valid values. Values: {invalid}, Valid: {c.valid_values}")
+            return False
+
+        return True
+
+    def __len__(self):
+        return int(np.prod([len(getattr(self, k)) for k in self.keys]))
+
+    def combinations(self):
+        return list(itertools.product(*[getattr(self, k) for k in self.keys]))
+
+    def hyperparameters(self) -> list:
+        return [Hyperparameters(
+                    mean_period=mp,
+                    spread_mean_period=smp,
+                    spread_sdev_period=ssp,
+                    threshold=t,
+                    side=side,
+                    calc_type=calc) for calc, mp, smp, ssp, t, side in self.combinations()]
+
+
+class Sweep:
+
+    def __init__(self, data, grid:ParameterGrid, accounts:Accounts, chunk_size:int=128, store:ResultStore=None,
+                 stop_loss:float=None, take_profit:float=None, max_holding:int=None):
+        """
+        stop_loss, take_profit and max_holding add the same risk exits to
+        every config (see Hyperparameters).
+        """
+        data.columns = [c.lower() for c in data.columns]
+        self.data = data
+        self.grid = grid
+        self.cash = accounts.cash
+        self.chunk_size = chunk_size
+        # configs already in the store are read back instead of evaluated
+        self.store = store
+
+        self.tpl_side = Side()
+        self.tpl_calc = RollingCalculationType()
+
+        self.close = data['close'].to_numpy(dtype=float)
+        self.log_returns = arrays.log_returns(self.close)
+
+        exits = {'stop_loss': stop_loss, 'take_profit': take_profit, 'max_holding': max_holding}
+        self.exits = {k: v for k, v in exits.items() if v is not None}
+        # intrabar prices of the risk exits, close when a column is missing
+        self.prices = {c: data[c].to_numpy(dtype=float) if c in data.columns else self.close for c in ['high', 'low', 'open']}
+
+    def spreads(self, calc_type:str):
+        # bars x mean_period
+        exponential = calc_type == self.tpl_calc.calculation_exponential
+        means = np.column_stack([arrays.rolling_mean(self.close, p, exponential) for p in self.grid.mean_period])
+        return self.close[:, None] - means
+
+    def z_score_stages(self, calc_type:str):
+        exponential = calc_type == self.tpl_calc.calculation_exponential
+        spread = self.spreads(calc_type)
+        mu = {p: arrays.rolling_mean(spread, p, exponential) for p in self.grid.spread_mean_period}
+        sigma = {p: arrays.rolling_std(spread, p, exponential) for p in self.grid.spread_sdev_period}
+        return spread, mu, sigma
+
+    def stationarity(self, lags:int=1) -> pd.DataFrame:
+        # ADF test of every distinct spread, one row per (calc_type, mean_period)
+        frames = []
+        for calc_type in self.grid.calc_type:
+            frame = pd.DataFrame({'calc_type': calc_type, 'mean_period': self.grid.mean_period})
+            for name, values in BatchADF(self.spreads(calc_type), lags).to_dict().items():
+                frame[name] = values
+            frames.append(frame)
+        return pd.concat(frames, ignore_index=True)
+
+    def iter_blocks(self):
+        """
+        Yields (configs, z_score, signal, strategy_returns) for blocks of configs.
+        configs is a list of ParameterGrid.keys tuples; arrays are bars x len(configs).
+        """
+        for calc_type in self.grid.calc_type:
+            spread, mu, sigma = self.z_score_stages(calc_type)
+
+            z_keys = list(itertools.product(range(len(self.grid.mean_period)),
+                                            self.grid.spread_mean_period,
+                                            self.grid.spread_sdev_period))
+
+            for start in range(0, len(z_keys), self.chunk_size):
+                block = z_keys[start:start + self.chunk_size]
+                z_score = np.column_stack([(spread[:, i] - mu[smp][:, i]) / sigma[ssp][:, i] for i, smp, ssp in block])
+
+                with np.errstate(invalid='ignore'):
+                    long_exit = z_score >= 0
+                    short_exit = z_score <= 0
+
+                    for threshold in self.grid.threshold:
+                        long_pos = arrays.ffill_positions(z_score < -threshold, long_exit, 1)
+                        short_pos = arrays.ffill_positions(z_score > threshold, short_exit, -1)
+
+                        for side in self.grid.side:
+                            if side == self.tpl_side.side_long:
+                                positions = long_pos
+                            elif side == self.tpl_side.side_short:
+                                positions = short_pos
+                            else:
+                                positions = long_pos + short_pos
+
+                            signal = arrays.shift_signal(positions)
+                            if len(self.exits) > 0:
+                                signal, returns, _ = arrays.risk_exits(signal, self.log_returns, self.close, self.prices['high'],
+                                                                    self.prices['low'], self.prices['open'], **self.exits)
+                            else:
+                                returns = arrays.strategy_returns(signal, self.log_returns)
+                            configs = [(calc_type, self.grid.mean_period[i], smp, ssp, threshold, side) for i, smp, ssp in block]
+                            yield configs, z_score, signal, returns
+
+    def run(self) -> pd.DataFrame:
+        if not self.grid.validate() or not Hyperparameters.valid_exits(**self.exits):
+            return None
+        if self.store is not None:
+            return self.run_stored()
+
+        order = {c: i for i, c in enumerate(self.grid.combinations())}
+        frames = []
+        for configs, _, _, returns in self.iter_blocks():
+            metrics = BatchMetrics(returns, self.cash, self.data.index)
+            frame = pd.DataFrame(configs, columns=ParameterGrid.keys)
+            for name, values in metrics.to_dict().items():
+                frame[name] = values
+            frame.index = [order[c] for c in configs]
+            frames.append(frame)
+
+        return pd.concat(frames).sort_index()
+
+    def run_stored(self) -> pd.DataFrame:
+        """
+        Evaluates only the (calc_type, mean_period) partitions with configs
+        missing from the store, stores their results and returns the whole grid.
+        """
+        data = data_key(self.data)
+        combinations = self.grid.combinations()
+        keys = [self.store.key(data, 'Sweep', c, self.cash, self.exits) for c in combinations]
+        found = self.store.get_many(keys)
+
+        missing = dict.fromkeys((c[0], c[1]) for c, k in zip(combinations, keys) if k not in found)
+        for calc_type, mean_period in missing:
+            partition = ParameterGrid(mean_period=[mean_period],
+                                      spread_mean_period=self.grid.spread_mean_period,
+                                      spread_sdev_period=self.grid.spread_sdev_period,
+                                      threshold=self.grid.threshold,
+                                      side=self.grid.side,
+                                      calc_type=[calc_type])
+            results = Sweep(self.data, partition, Accounts(self.cash), self.chunk_size, **self.exits).run()
+            rows = []
+            for record in results.to_dict('records'):
+                config = tuple(record.pop(k) for k in ParameterGrid.keys)
+                key = self.store.key(data, 'Sweep', config, self.cash, self.exits)
+                found[key] = record
+                rows.append((key, data, 'Sweep', config, self.cash, record, self.exits, None, None))
+            self.store.put_many(rows)
+
+        frame = pd.DataFrame(combinations, columns=ParameterGrid.keys)
+        metrics = pd.DataFrame([found[k] for k in keys], dtype=float)
+        return pd.concat([frame, metrics], axis=1)
+
+
+def timeframe_sweep(data, grid:ParameterGrid, accounts:Accounts, timeframes:list, chunk_size:int=128, store:ResultStore=None) -> pd.DataFrame:
+    """
+    Sweeps the grid on several timeframes derived from one base frame (the
+    finest data), so the source is read once. Adds a timeframe column.
+    """
+    frames = []
+    for timeframe in timeframes:
+        view = resample(data, timeframe)
+        if view is None:
+            return None
+        results = Sweep(view, grid, accounts, chunk_size, store).run()
+        if results is None:
+            return None
+        results.insert(0, 'timeframe', timeframe)
+        frames.append(results)
+    return pd.concat(frames, ignore_index=True)
@@ -0,0 +1,146 @@
+import numpy as np
+import pandas as pd
+from .mean_reversion import Side
+
+"""
+Trade ledger.
+
+A trade is a run of consecutive bars with the same non-zero signal. Since
+signal[t] is the position held over the return from close[t-1] to close[t],
+a run over bars [entry, exit] opens at close[entry-1] and closes at
+close[exit]. Runs are found from the change points of the signal, and the
+per-trade sums and extremes are taken with reduceat, so no Python loop runs
+over bars or trades.
+
+PnL, MAE and MFE are log returns relative to the entry price, matching
+strategy_returns. MAE/MFE use high/low when available and close otherwise.
+Trades closed by a stop loss or take profit exit at their fill price.
+"""
+
+
+def extract_trades(signal, close, high=None, low=None, index=None, side:str=None, returns=None, exit_price=None) -> np.ndarray:
+    """
+    Returns a structured array with one record per trade. Runs of the side a
+    model does not trade (its strategy returns are zeroed) are dropped. When
+    the strategy returns are given, PnL is their sum over each trade, which
+    also covers models whose returns are not those of close (pairs).
+    exit_price holds the fill of risk exits (NaN on other bars).
+    """
+    signal = np.nan_to_num(np.asarray(signal, dtype=float), nan=0.0)
+    close = np.asarray(close, dtype=float)
+
+    change = np.flatnonzero(signal[1:] != signal[:-1]) + 1
+    starts = np.r_[0, change]
+    ends = np.r_[change, len(signal)] - 1
+    direction = signal[starts]
+
+    s = Side()
+    keep = (direction != 0) & (starts > 0)
+    if side == s.side_long:
+        keep &= direction > 0
+    elif side == s.side_short:
+        keep &= direction < 0
+    starts, ends, direction = starts[keep], ends[keep], direction[keep]
+
+    fields = [('entry', np.int64), ('exit', np.int64), ('direction', np.int8), ('bars', np.int64),
+              ('entry_price', np.float64), ('exit_price', np.float64),
+              ('pnl', np.float64), ('mae', np.float64), ('mfe', np.float64)]
+    if index is not None:
+        fields += [('entry_time', 'datetime64[ns]'), ('exit_time', 'datetime64[ns]')]
+    trades = np.empty(len(starts), dtype=fields)
+
+    trades['entry'] = starts
+    trades['exit'] = ends
+    trades['direction'] = direction
+    trades['bars'] = ends - starts + 1
+    trades['entry_price'] = close[starts - 1]
+    trades['exit_price'] = close[ends]
+    if exit_price is not None:
+        fills = np.asarray(exit_price, dtype=float)[ends]
+        trades['exit_price'] = np.where(np.isnan(fills), close[ends], fills)
+    if returns is None:
+        trades['pnl'] = direction * np.log(trades['exit_price'] / close[starts - 1])
+    else:
+        running = np.r_[0, np.cumsum(np.nan_to_num(np.asarray(returns, dtype=float), nan=0.0))]
+        trades['pnl'] = running[ends + 1] - running[starts]
+
+    if len(starts) > 0:
+        # bars held, each tagged with its trade's entry price and direction
+        lengths = ends - starts + 1
+        offsets = np.r_[0, np.cumsum(lengths)[:-1]]
+        held = np.repeat(starts - offsets, lengths) + np.arange(lengths.sum())
+        entry_price = np.repeat(trades['entry_price'], lengths)
+        long = np.repeat(direction > 0, lengths)
+        high = close[held] if high is None else np.asarray(high, dtype=float)[held]
+        low = close[held] if low is None else np.asarray(low, dtype=float)[held]
+
+        up = np.log(high / entry_price)
+        down = np.log(low / entry_price)
+        favorable = np.where(long, up, -down)
+        adverse = np.where(long, down, -up)
+        del up, down, entry_price, long
+
+        trades['mfe'] = np.maximum(np.maximum.reduceat(favorable, offsets), 0)
+        trades['mae'] = np.minimum(np.minimum.reduceat(adverse, offsets), 0)
+
+    if index is not None:
+        index = pd.DatetimeIndex(index)
+        trades['entry_time'] = index[starts].as_unit('ns').asi8.view('datetime64[ns]')
+        trades['exit_time'] = index[ends].as_unit('ns').asi8.view('datetime64[ns]')
+    return trades
+
+
+class TradeLedger:
+    """
+    Trades of a built model (the output of MeanReversion.build_model) and the
+    per-trade statistics derived from them.
+    """
+
+    def __init__(self, data, cash, side:str=None):
+        self.cash = cash
+        columns = data.columns
+        self.trades = extract_trades(data['signal'].to_numpy(),
+                                     data['close'].to_numpy(),
+                                     data['high'].to_numpy() if 'high' in columns else None,
+                                     data['low'].to_numpy() if 'low' in columns else None,
+                                     data.index if isinstance(data.index, pd.DatetimeIndex) else None,
+                                     side,
+                                     data['strategy_returns'].to_numpy(),
+                                     data['exit_price'].to_numpy() if 'exit_price' in columns else None)
+
+    def to_frame(self) -> pd.DataFrame:
+        return pd.DataFrame(self.trades)
+
+    def to_dict(self):
+        pnl = self.trades['pnl']
+        wins = pnl[pnl > 0]
+        losses = pnl[pnl < 0]
+        with np.errstate(invalid='ignore', divide='ignore'):
+            return {
+                'trades': len(pnl),
+                'win_rate': len(wins) / len(pnl) * 100 if len(pnl) > 0 else np.nan,
+                'average_pnl': pnl.mean() * 100 if len(pnl) > 0 else np.nan,
+                'average_win': wins.mean() * 100 if len(wins) > 0 else np.nan,
+                'average_loss': losses.mean() * 100 if len(losses) > 0 else np.nan,
+                'profit_factor': wins.sum() / abs(losses.sum()) if len(losses) > 0 else np.nan,
+                'average_bars': self.trades['bars'].mean() if len(pnl) > 0 else np.nan,
+                'max_bars': int(self.trades['bars'].max()) if len(pnl) > 0 else 0,
+                'average_mae': self.trades['mae'].mean() * 100 if len(pnl) > 0 else np.nan,
+                'average_mfe': self.trades['mfe'].mean() * 100 if len(pnl) > 0 else np.nan,
+            }
+
+    def show_data(self):
+        stats = self.to_dict()
+        print()
+        print("===== TRADES =====")
+        print(f"Trades: {stats['trades']}")
+        print(f"Win Rate: {stats['win_rate']:.2f}%")
+        print(f"Average PnL: {stats['average_pnl']:.4f}% (${stats['average_pnl'] / 100 * self.cash:.2f})")
+        print(f"Average Win: {stats['average_win']:.4f}%")
+        print(f"Average Loss: {stats['average_loss']:.4f}%")
+        print(f"Profit Factor: {stats['profit_factor']:.2f}")
+        print(f"Average Holding Time: {stats['average_bars']:.1f} bars (max {stats['max_bars']})")
+        print(f"Average MAE: {stats['average_mae']:.4f}%")
+        print(f"Average MFE: {stats['average_mfe']:.4f}%")
+        print("==========")
+        print()
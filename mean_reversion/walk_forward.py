@@ -0,0 +1,210 @@
+import os
+import numpy as np
+import pandas as pd
+from concurrent.futures import ProcessPoolExecutor
+from .mean_reversion import Accounts, Hyperparameters
+from .metrics import BatchMetrics
+from .parallel import SharedFrame
+from .sweep import Sweep, ParameterGrid
+from .store import ResultStore, data_key
+
+"""
+Walk-forward optimization.
+
+The model is causal, so a config's strategy returns on any window equal the
+returns of one full-history run restricted to that window (with the prior
+bars acting as indicator warm-up). Each grid partition is therefore swept
+once over the whole series, and every fold scores its train window and keeps
+its test window from the same block of returns. Partitions of the grid run in
+parallel worker processes over a shared-memory copy of the prices.
+"""
+
+
+class WalkForward:
+
+    def __init__(self,
+                 data,
+                 grid:ParameterGrid,
+                 accounts:Accounts,
+                 train_size:int,
+                 test_size:int,
+                 anchored:bool=False,
+                 objective:str='sharpe_annual',
+                 maximize:bool=True,
+                 max_workers:int=None,
+                 chunk_size:int=128,
+                 store:ResultStore=None,
+                 stop_loss:float=None,
+                 take_profit:float=None,
+                 max_holding:int=None):
+        """
+        stop_loss, take_profit and max_holding add the same risk exits to
+        every config (see Hyperparameters).
+        """
+        data.columns = [c.lower() for c in data.columns]
+        self.data = data
+        self.grid = grid
+        self.cash = accounts.cash
+        self.train_size = train_size
+        self.test_size = test_size
+        self.anchored = anchored
+        self.objective = objective
+        self.maximize = maximize
+        self.max_workers = max_workers if max_workers is not None else os.cpu_count()
+        self.chunk_size = chunk_size
+        self.store = store
+        exits = {'stop_loss': stop_loss, 'take_profit': take_profit, 'max_holding': max_holding}
+        self.exits = {k: v for k, v in exits.items() if v is not None}
+
+        self.fold_results = None
+        self.returns = None
+        self.equity = None
+        self.metrics = None
+
+    def valid_sizes(self) -> bool:
+        for name in ['train_size', 'test_size']:
+            value = getattr(self, name)
+            if isinstance(value, bool) or not isinstance(value, (int, np.integer)) or value <= 0:
+                print(f"Invalid {name}. Value must be an integer greater than 0. Value: {value}")
+                return False
+        return True
+
+    def folds(self) -> list:
+        # (train_start, train_end, test_start, test_end) as row offsets, none for invalid sizes
+        if not self.valid_sizes():
+            return []
+        folds = []
+        test_start = self.train_size
+        while test_start < len(self.data):
+            test_end = min(test_start + self.test_size, len(self.data))
+            train_start = 0 if self.anchored else test_start - self.train_size
+            folds.append((train_start, test_start, test_start, test_end))
+            test_start = test_end
+        return folds
+
+    def partitions(self) -> list:
+        # one sub-grid per (calc_type, mean_period); each shares its mean and spread stages
+        return [ParameterGrid(mean_period=[mp],
+                              spread_mean_period=self.grid.spread_mean_period,
+                              spread_sdev_period=self.grid.spread_sdev_period,
+                              threshold=self.grid.threshold,
+                              side=self.grid.side,
+                              calc_type=[calc]) for calc in self.grid.calc_type for mp in self.grid.mean_period]
+
+    def run(self) -> pd.DataFrame:
+        if not self.grid.validate() or not self.valid_sizes() or not Hyperparameters.valid_exits(**self.exits):
+            return None
+
+        folds = self.folds()
+        if len(folds) == 0:
+            print(f"Not enough data for walk-forward. Rows: {len(self.data)}, Train Size: {self.train_size}")
+            return None
+
+        if self.store is not None:
+            data = data_key(self.data)
+            key = self.store.key(data, 'WalkForward', None, self.cash, self.store_params())
+            if self.restore(key):
+                return self.fold_results
+
+        tasks = [(grid, folds, self.objective, self.maximize, self.cash, self.chunk_size, self.exits) for grid in self.partitions()]
+        if self.max_workers <= 1 or len(tasks) == 1:
+            _worker['data'] = self.data
+            partials = [_evaluate_partition(*task) for task in tasks]
+            _worker.clear()
+        else:
+            with SharedFrame(self.data) as shared:
+                with ProcessPoolExecutor(max_workers=min(self.max_workers, len(tasks)),
+                                         initializer=_init_worker,
+                                         initargs=(shared.spec(),)) as executor:
+                    partials = list(executor.map(_evaluate_partition, *zip(*tasks)))
+
+        self.stitch(folds, partials)
+        if self.store is not None:
+            detail = {c: [ResultStore.plain(v) for v in self.fold_results[c]] for c in self.fold_results.columns}
+            self.store.put(key, data, 'WalkForward', None, self.cash, self.metrics, self.store_params(), detail, self.equity)
+        return self.fold_results
+
+    def store_params(self) -> dict:
+        return {
+            'grid': {k: getattr(self.grid, k) for k in ParameterGrid.keys},
+            'train_size': self.train_size,
+            'test_size': self.test_size,
+            'anchored': self.anchored,
+            'objective': self.objective,
+            'maximize': self.maximize,
+            **self.exits,
+        }
+
+    def restore(self, key:str) -> bool:
+        # fold results and metrics of a stored run; the equity curve only when it was kept
+        metrics = self.store.get(key)
+        detail = self.store.detail(key)
+        if metrics is None or detail is None:
+            return False
+
+        self.metrics = metrics
+        self.fold_results = pd.DataFrame(detail)
+        for c in ['train_start', 'train_end', 'test_start', 'test_end']:
+            self.fold_results[c] = pd.to_datetime(self.fold_results[c])
+        self.equity = self.store.equity(key)
+        if self.equity is not None:
+            self.returns = (self.equity.diff().fillna(self.equity.iloc[0] - self.cash) / self.cash).rename('strategy_returns')
+        return True
+
+    def stitch(self, folds:list, partials:list) -> pd.DataFrame:
+        index = self.data.index
+        rows = []
+        returns = []
+        for i, (train_start, train_end, test_start, test_end) in enumerate(folds):
+            candidates = [p[i] for p in partials if p[i] is not None]
+            score, config, oos = max(candidates, key=lambda c: c[0])
+
+            oos_metrics = BatchMetrics(oos, self.cash, index[test_start:test_end]).to_dict()
+            row = {
+                'train_start': index[train_start],
+                'train_end': index[train_end - 1],
+                'test_start': index[test_start],
+                'test_end': index[test_end - 1],
+            }
+            row.update(dict(zip(ParameterGrid.keys, config)))
+            row[f"train_{self.objective}"] = score if self.maximize else -score
+            row.update({f"test_{k}": float(v[0]) for k, v in oos_metrics.items()})
+            rows.append(row)
+            returns.append(oos)
+
+        oos_index = index[folds[0][2]:folds[-1][3]]
+        self.returns = pd.Series(np.concatenate(returns), index=oos_index, name='strategy_returns')
+        self.equity = (self.returns.cumsum() * self.cash) + self.cash
+        self.metrics = {k: float(v[0]) for k, v in BatchMetrics(self.returns.to_numpy(), self.cash, oos_index).to_dict().items()}
+        self.fold_results = pd.DataFrame(rows)
+        return self.fold_results
+
+
+_worker = {}
+
+
+def _init_worker(spec:dict):
+    data, handles = SharedFrame.attach(spec)
+    _worker['data'] = data
+    _worker['handles'] = handles
+
+
+def _evaluate_partition(grid:ParameterGrid, folds:list, objective:str, maximize:bool, cash, chunk_size:int, exits:dict=None) -> list:
+    """
+    Returns, per fold, the best (score, config, test returns) within this
+    partition. Scores are negated when minimizing so larger is always better.
+    """
+    data = _worker['data']
+    index = data.index
+    best = [None] * len(folds)
+
+    for configs, _, _, returns in Sweep(data, grid, Accounts(cash), chunk_size=chunk_size, **(exits or {})).iter_blocks():
+        for i, (train_start, train_end, test_start, test_end) in enumerate(folds):
+            metrics = BatchMetrics(returns[train_start:train_end], cash, index[train_start:train_end])
+            scores = getattr(metrics, objective)
+            scores = np.where(np.isnan(scores), -np.inf, scores if maximize else -scores)
+            j = int(np.argmax(scores))
+            if best[i] is None or scores[j] > best[i][0]:
+                best[i] = (float(scores[j]), configs[j], returns[test_start:test_end, j].copy())
+
+    return best
@@ -2,19 +2,33 @@ import warnings
 warnings.filterwarnings('ignore')
 import mean_reversion 
 import os 
+import sys 
 import pandas as pd 
 
 
 
 class MeanReversionBacktest: 
 
-    def __init__(self):
+    def __init__(self, store_path:str='results.db'):
         self.file = None 
         self.cash_amount = None 
         self.sim = None 
+        self.portfolio_option = "Portfolio (All Files)"
+        self.pairs_option = "Pairs (Two Files)"
+        self.pair = None 
+        # results of previous sessions, keyed by data, parameters, cash and code version.
+        # opened on first use so constructing the CLI leaves no database behind
+        self.store_path = store_path 
+        self._store = None 
 
         self.defaults = mean_reversion.Defaults()
 
+    @property
+    def store(self) -> mean_reversion.ResultStore:
+        if self._store is None:
+            self._store = mean_reversion.ResultStore(self.store_path)
+        return self._store
+
     # ----------------------------- generic ----------------------------- #
     
     @staticmethod
@@ -138,6 +152,7 @@ class MeanReversionBacktest:
     
     def select_dataset(self) -> pd.DataFrame: 
 
+        self.file = None 
         dl = mean_reversion.DataLoader()
         print("Select File...")
         files=dl.files()
@@ -149,7 +164,7 @@ class MeanReversionBacktest:
         dataset_value = self.get_string_value(
                 source = "Files",
                 default = None, 
-                valid_values=files,
+                valid_values=files + [self.portfolio_option, self.pairs_option],
                 show_exit=True,
                 use_str_input=False
             )
@@ -159,8 +174,30 @@ class MeanReversionBacktest:
         
         self.file = dataset_value 
         print(f"Selected File: {self.file}")
+        if self.file == self.portfolio_option:
+            # legs are loaded by the portfolio workers
+            return None 
+        if self.file == self.pairs_option:
+            return self.select_pair(dl, files)
         return dl.load_data(self.file)
 
+    def select_pair(self, dl:mean_reversion.DataLoader, files:list) -> pd.DataFrame:
+
+        self.pair = None 
+        y_file = self.get_string_value(source="Y Leg", default=None, valid_values=files, show_exit=True)
+        if y_file is None: 
+            return None 
+        x_file = self.get_string_value(source="X Leg", default=None, valid_values=files, show_exit=True)
+        if x_file is None: 
+            return None 
+
+        y, x = dl.load_data(y_file), dl.load_data(x_file)
+        if y is None or x is None:
+            return None 
+        print(f"Selected Pair: {y_file} vs {x_file}")
+        self.pair = x 
+        return y 
+
     
     def get_cash(self) -> int:
         return self.get_integer_value("Cash", self.defaults.cash)
@@ -227,6 +264,44 @@ class MeanReversionBacktest:
         return accts
     
 
+    def run_portfolio(self):
+
+        accounts = self.accounts()
+        hparam = self.hyperparameters()
+
+        print()
+        print("===== GENERATING PORTFOLIO =====")
+        portfolio = mean_reversion.Portfolio(
+            hyperparameters=hparam,
+            accounts=accounts
+        )
+        if portfolio.run() is None:
+            return None 
+        portfolio.show_data()
+        return portfolio
+
+
+    def run_pairs(self, df:pd.DataFrame):
+
+        accounts = self.accounts()
+        hparam = self.hyperparameters()
+        hedge_period = self.get_integer_value("Hedge Period", hparam.mean_period, 1)
+
+        print()
+        print("===== GENERATING PAIRS SIMULATION =====")
+        simulation = mean_reversion.PairsMeanReversion(
+            data = df, 
+            data_x = self.pair, 
+            hyperparemeters=hparam,
+            accounts=accounts,
+            hedge_period=hedge_period,
+            store=self.store
+        )
+        print("==========")
+        print()
+        return simulation
+
+
     # ----------------------------- evaluation ----------------------------- #
 
     def adf(self, sim:mean_reversion.MeanReversion):
@@ -234,8 +309,28 @@ class MeanReversionBacktest:
         
 
     def print_results(self, sim:mean_reversion.MeanReversion):
+        sim.show_results()
+
+    def print_rankings(self, sim:mean_reversion.MeanReversion):
+        ranked = self.store.rank('sharpe_annual', top=10, data=sim.data_key, model=type(sim).__name__)
+        print()
+        print("===== STORED RESULTS (TOP 10 BY ANNUALIZED SHARPE) =====")
+        print(ranked[mean_reversion.ResultStore.config_columns + ['cash', 'net_returns_percent', 'max_drawdown', 'sharpe_annual']].to_string(index=False))
+        print("==========")
+        print()
+
+    def robustness(self, sim:mean_reversion.MeanReversion):
+        samples = self.get_integer_value("Bootstrap Samples", 1000, 0)
+        if sim.metrics.robustness(samples=samples, max_workers=os.cpu_count()) is None:
+            return None 
         sim.metrics.show_data()
 
+    def print_trades(self, sim:mean_reversion.MeanReversion):
+        mean_reversion.TradeLedger(sim.built_model, sim.cash, sim.hyperparameters.side).show_data()
+
+
+    def print_timing(self, sim:mean_reversion.MeanReversion):
+        mean_reversion.profiling.active().show_data()
 
     def plot(self, sim:mean_reversion.MeanReversion):
 
@@ -276,8 +371,13 @@ class MeanReversionBacktest:
         sim_options = {
             "ADF Test" : backtest.adf, 
             "Results" : backtest.print_results, 
+            "Trades" : backtest.print_trades, 
+            "Bootstrap" : backtest.robustness, 
+            "Stored Rankings" : backtest.print_rankings, 
             "View Plots" : backtest.plot, 
         }
+        if mean_reversion.profiling.active() is not None:
+            sim_options["Timing Breakdown"] = backtest.print_timing
 
         self.sim = sim 
         self.generate_options(sim_options.keys())
@@ -303,7 +403,14 @@ if __name__ == "__main__":
 
     backtest = MeanReversionBacktest()
 
+    # python root.py --profile [--memory] records the time (and peak memory) of each stage per run
+    profiler = None 
+    if '--profile' in sys.argv:
+        profiler = mean_reversion.profiling.enable(memory='--memory' in sys.argv)
+
     while True: 
+        if profiler is not None:
+            profiler.reset()
 
         print("==========================")
         print("===== MEAN REVERSION =====")
@@ -312,8 +419,14 @@ if __name__ == "__main__":
         inp = input("Press any key to continue..")
 
         df = backtest.select_dataset()
+        if backtest.file == backtest.portfolio_option:
+            backtest.run_portfolio()
+            continue 
         if df is None:
             continue 
+        if backtest.file == backtest.pairs_option:
+            backtest.evaluate(backtest.run_pairs(df))
+            continue 
 
         accounts = backtest.accounts() 
         hparam = backtest.hyperparameters()
@@ -323,7 +436,8 @@ if __name__ == "__main__":
         simulation = mean_reversion.MeanReversion(
             data = df, 
             hyperparemeters=hparam,
-            accounts=accounts
+            accounts=accounts,
+            store=backtest.store
         )
         print("==========")
         print()
@@ -0,0 +1,52 @@
+import mean_reversion
+import numpy as np
+import unittest
+from statsmodels.tsa.stattools import adfuller
+from statsmodels.tsa.adfvalues import mackinnonp
+
+
+class TestADF(unittest.TestCase):
+
+    def setUp(self):
+        data = mean_reversion.DataLoader().load_data('XAUUSD_d1.csv')
+        grid = mean_reversion.ParameterGrid(mean_period=[10, 50], calc_type=['simple', 'exponential'])
+        self.sweep = mean_reversion.Sweep(data, grid, mean_reversion.Accounts(cash=None))
+        self.spreads = self.sweep.spreads('simple')
+
+    def test_batch_matches_adfuller(self):
+        for lags in [0, 1, 3]:
+            result = mean_reversion.BatchADF(self.spreads, lags)
+            for i in range(self.spreads.shape[1]):
+                series = self.spreads[:, i]
+                statistic, p_value, _, nobs, critical = adfuller(series[~np.isnan(series)], maxlag=lags, autolag=None)
+                self.assertAlmostEqual(result.statistic[i], statistic, places=8)
+                self.assertAlmostEqual(result.p_value[i], p_value, places=10)
+                self.assertEqual(result.nobs[i], nobs)
+                self.assertAlmostEqual(result.critical_values['5%'][i], critical['5%'], places=10)
+
+    def test_p_values(self):
+        statistic = np.array([-25, -4, -1.61, 0, 5, np.nan])
+        expected = [mackinnonp(s) for s in statistic[:-1]] + [np.nan]
+        np.testing.assert_allclose(mean_reversion.adf.p_values(statistic), expected)
+
+    def test_rolling_matches_windows(self):
+        series = self.spreads[:, 0]
+        window = 120
+        rolling = mean_reversion.rolling_adf(series, window)
+        self.assertEqual(len(rolling), len(series))
+
+        start = np.flatnonzero(~np.isnan(series))[0]
+        first = start + window + 1
+        self.assertTrue(np.isnan(rolling[:first]).all())
+        for end in [first, 1000, len(series) - 1]:
+            expected = adfuller(series[end - window - 1:end + 1], maxlag=1, autolag=None)[0]
+            self.assertAlmostEqual(rolling[end], expected, places=6)
+
+        regime = mean_reversion.stationary_regime(series, window)
+        np.testing.assert_array_equal(regime[first:], rolling[first:] < mean_reversion.adf.critical_values(window)['5%'])
+
+    def test_sweep_stationarity(self):
+        result = self.sweep.stationarity()
+        self.assertEqual(len(result), 4)
+        self.assertListEqual(list(result['mean_period']), [10, 50, 10, 50])
+        self.assertTrue(result['adf_stationary'].all())
@@ -0,0 +1,85 @@
+import contextlib
+import csv
+import io
+import json
+import mean_reversion
+import os
+import shutil
+import tempfile
+import unittest
+from mean_reversion import batch
+
+
+class TestBatch(unittest.TestCase):
+
+    def setUp(self):
+        self.tmp = tempfile.mkdtemp()
+        self.spec = os.path.join(self.tmp, 'spec.json')
+        self.write_spec({
+            'cash': 100000,
+            'datasets': ['XAUUSD_h4.csv', {'symbol': 'XAUUSD', 'timeframe': 'd1'}],
+            'grid': {'mean_period': [10, 20], 'threshold': [1, 2], 'side': ['long', 'short'], 'calc_type': ['simple', 'exponential']},
+        })
+
+    def tearDown(self):
+        shutil.rmtree(self.tmp)
+
+    def write_spec(self, spec):
+        with open(self.spec, 'w') as f:
+            json.dump(spec, f)
+
+    def main(self, *args):
+        with contextlib.redirect_stderr(io.StringIO()):
+            return batch.main([self.spec] + list(args))
+
+    def test_jsonl_matches_model(self):
+        output = os.path.join(self.tmp, 'results.jsonl')
+        self.assertEqual(self.main('--jobs', '2', '--output', output), batch.EXIT_OK)
+        with open(output) as f:
+            rows = [json.loads(line) for line in f]
+        self.assertEqual(len(rows), 32)
+        self.assertEqual(len({r['job'] for r in rows}), 32)
+
+        row = next(r for r in rows if r['job'] == 'XAUUSD_h4.csv||exponential|20|10|10|2|short')
+        data = mean_reversion.DataLoader().load_data('XAUUSD_h4.csv')
+        hparam = mean_reversion.Hyperparameters(20, 10, 10, 2, 'short', 'exponential')
+        expected = mean_reversion.MeanReversion(data, hparam, mean_reversion.Accounts(100000), verbose=False).metrics
+        self.assertAlmostEqual(row['final_equity'], expected.final_equity)
+
+    def test_csv_resume(self):
+        output = os.path.join(self.tmp, 'results.csv')
+        self.assertEqual(self.main('--jobs', '1', '--output', output), batch.EXIT_OK)
+        with open(output) as f:
+            complete = f.read()
+
+        # keep the header and ten rows plus a torn row, as if the run had been killed
+        lines = complete.splitlines(keepends=True)
+        with open(output, 'w') as f:
+            f.write(''.join(lines[:11]) + lines[11][:20])
+
+        self.assertEqual(self.main('--jobs', '1', '--output', output, '--resume'), batch.EXIT_OK)
+        with open(output, newline='') as f:
+            rows = list(csv.DictReader(f))
+        self.assertEqual(len(rows), 32)
+        self.assertEqual(sorted(r['job'] for r in rows), sorted(r['job'] for r in csv.DictReader(io.StringIO(complete))))
+
+    def test_resume_float_grid(self):
+        output = os.path.join(self.tmp, 'results.jsonl')
+        self.write_spec({'datasets': ['XAUUSD_d1.csv'], 'grid': {'mean_period': [10], 'threshold': [1, 1.5], 'side': ['long']}})
+        self.assertEqual(self.main('--jobs', '1', '--output', output), batch.EXIT_OK)
+        self.assertEqual(self.main('--jobs', '1', '--output', output, '--resume'), batch.EXIT_OK)
+        with open(output) as f:
+            jobs = [json.loads(line)['job'] for line in f]
+        self.assertEqual(sorted(jobs), ['XAUUSD_d1.csv||exponential|10|10|10|1.5|long', 'XAUUSD_d1.csv||exponential|10|10|10|1|long'])
+
+    def test_exit_codes(self):
+        output = os.path.join(self.tmp, 'results.jsonl')
+        self.write_spec({'datasets': ['MISSING.csv'], 'grid': {'mean_period': [10]}})
+        with contextlib.redirect_stdout(io.StringIO()):
+            self.assertEqual(self.main('--jobs', '1', '--output', output), batch.EXIT_FAILED)
+
+        self.write_spec({'datasets': ['XAUUSD_h4.csv'], 'grid': {'mean_period': [0]}})
+        self.assertEqual(self.main('--output', output), batch.EXIT_INVALID)
+        self.write_spec({'datasets': []})
+        self.assertEqual(self.main('--output', output), batch.EXIT_INVALID)
+        self.assertEqual(self.main('--resume'), batch.EXIT_INVALID)
@@ -0,0 +1,23 @@
+from benchmarks.run import compare, synthetic
+import unittest
+
+
+class TestBenchmarkCompare(unittest.TestCase):
+
+    def results(self, wall_time, peak_memory):
+        return {'results': [{'name': 'build_model[x]', 'bars': 10, 'wall_time': wall_time, 'peak_memory': peak_memory}]}
+
+    def test_flags_regressions(self):
+        regressions = compare(self.results(1.5, 100), self.results(1.0, 100), tolerance=0.2)
+        self.assertEqual([(r['name'], r['metric']) for r in regressions], [('build_model[x]', 'wall_time')])
+
+        regressions = compare(self.results(1.0, 200), self.results(1.0, 100), tolerance=0.2)
+        self.assertEqual([r['metric'] for r in regressions], ['peak_memory'])
+
+    def test_within_tolerance(self):
+        self.assertEqual(compare(self.results(1.1, 110), self.results(1.0, 100), tolerance=0.2), [])
+
+    def test_synthetic(self):
+        data = synthetic(1000)
+        self.assertEqual(len(data), 1000)
+        self.assertTrue((data['high'] >= data['low']).all())
@@ -0,0 +1,38 @@
+import mean_reversion
+import numpy as np
+import unittest
+
+
+class TestBootstrap(unittest.TestCase):
+
+    def setUp(self):
+        data = mean_reversion.DataLoader().load_data('XAUUSD_d1.csv')
+        hparam = mean_reversion.Hyperparameters(20, 10, 10, 1, 'neutral', 'exponential')
+        self.sim = mean_reversion.MeanReversion(data, hparam, mean_reversion.Accounts(cash=None), verbose=False)
+        self.returns = self.sim.built_model['strategy_returns'].to_numpy()
+
+    def test_seeded_and_worker_independent(self):
+        serial = mean_reversion.Bootstrap(self.returns, self.sim.cash, samples=300, seed=7, max_bytes=2**20)
+        parallel = mean_reversion.Bootstrap(self.returns, self.sim.cash, samples=300, seed=7, max_bytes=2**20, max_workers=2)
+        self.assertGreater(len(range(0, 300, serial.chunk_size)), 1)
+        expected = parallel.run()
+        for key, values in serial.run().items():
+            self.assertEqual(len(values), 300)
+            np.testing.assert_array_equal(values, expected[key])
+
+    def test_resampling_preserves_series(self):
+        # a single full-length block reproduces the series; a stationary sample that never restarts is a rotation
+        block = mean_reversion.Bootstrap(self.returns, self.sim.cash, samples=20, block_size=len(self.returns), method='block', seed=1).run()
+        np.testing.assert_allclose(block['final_equity'], self.sim.metrics.final_equity)
+        np.testing.assert_allclose(block['max_drawdown'], self.sim.metrics.to_dict()['max_drawdown'])
+
+        rotation = mean_reversion.Bootstrap(self.returns, self.sim.cash, samples=20, block_size=10**12, seed=1).run()
+        np.testing.assert_allclose(rotation['net_returns_percent'], self.sim.metrics.net_returns_percent)
+
+    def test_metrics_intervals(self):
+        intervals = self.sim.metrics.robustness(samples=500, seed=3, max_workers=2)
+        values = self.sim.metrics.to_dict()
+        for name in mean_reversion.Bootstrap.statistics:
+            self.assertEqual(intervals[name], (values[f"{name}_lower"], values[f"{name}_upper"]))
+            self.assertLess(values[f"{name}_lower"], values[f"{name}_upper"])
+        self.assertIsNone(self.sim.metrics.robustness(method='jackknife'))
@@ -0,0 +1,132 @@
+import mean_reversion
+from mean_reversion.data_loader import parse_numeric
+import numpy as np
+import os
+import shutil
+import tempfile
+import pandas as pd
+import unittest
+
+
+class TestDataCache(unittest.TestCase):
+
+    def setUp(self):
+        self.tmp = tempfile.mkdtemp()
+        shutil.copy(os.path.join('data', 'MER.csv'), self.tmp)
+        self.dl = mean_reversion.DataLoader()
+        self.dl.directory = self.tmp
+        self.dl.cache = mean_reversion.DataCache(os.path.join(self.tmp, '.cache'))
+
+    def tearDown(self):
+        shutil.rmtree(self.tmp)
+
+    def test_cached_frame_matches_csv(self):
+        parsed = self.dl.load_data('MER.csv')
+        self.assertTrue(os.path.isdir(os.path.join(self.tmp, '.cache', 'MER.csv')))
+        self.assertEqual(self.dl.files(), ['MER.csv'])
+
+        cached = self.dl.cache.load(os.path.join(self.tmp, 'MER.csv'))
+        self.assertIsNotNone(cached)
+        self.assertTrue(parsed.equals(cached))
+
+    def test_invalidated_on_change(self):
+        path = os.path.join(self.tmp, 'MER.csv')
+        self.dl.load_data('MER.csv')
+        with open(path, 'a') as f:
+            f.write("2024-01-02,1.0,1.0,1.0,1.0,1K,0.00%\n")
+        self.assertIsNone(self.dl.cache.load(path))
+        self.assertEqual(self.dl.load_data('MER.csv')['close'].iloc[-1], 1.0)
+
+    def test_prewarm_and_clear(self):
+        self.dl.prewarm_cache()
+        self.assertIsNotNone(self.dl.cache.load(os.path.join(self.tmp, 'MER.csv')))
+        self.dl.clear_cache()
+        self.assertFalse(os.path.exists(os.path.join(self.tmp, '.cache')))
+
+    def test_time_zones_and_missing_text(self):
+        with open(os.path.join(self.tmp, 'TZ.csv'), 'w') as f:
+            f.write("Date,Close,Note\n")
+            f.write("2024-01-02 00:00:00+02:00,1.0,a\n2024-01-03 00:00:00+02:00,2.0,\n2024-01-04 00:00:00+02:00,3.0,c\n")
+        parsed = self.dl.load_data('TZ.csv')
+        self.assertIsNotNone(parsed.index.tz)
+        cached = self.dl.load_data('TZ.csv')
+        self.assertTrue(cached.equals(parsed))
+        self.assertTrue(cached['note'].isna().iloc[1])
+        self.assertEqual(len(self.dl.load_data('TZ.csv', start='2024-01-03', end='2024-01-04')), 2)
+
+        # an index the cache cannot hold is returned without caching
+        path = os.path.join(self.tmp, 'TZ.csv')
+        self.assertFalse(self.dl.cache.store(path, parsed.reset_index(drop=True).set_index('note'), view='text'))
+        self.assertIsNone(self.dl.cache.load(path, view='text'))
+
+    def test_date_window(self):
+        path = os.path.join(self.tmp, 'MER.csv')
+        full = self.dl.load_data('MER.csv')
+        for start, end in [('2020-01-01', '2020-12-31'), (None, '2015-06-30'), ('2023-03-15', None), ('2030-01-01', None)]:
+            expected = full.loc[start:end]
+            # read from the cache, and parsed when the cache is cold
+            self.assertTrue(self.dl.load_data('MER.csv', start=start, end=end).equals(expected))
+            self.assertTrue(self.dl.cache.load(path, start=start, end=end).equals(expected))
+            self.assertTrue(mean_reversion.DataLoader(use_cache=False).load_data('MER.csv', start=start, end=end).equals(expected))
+
+        # unsorted frames fall back to a mask
+        shuffled = full.sample(frac=1, random_state=0)
+        self.dl.cache.store(path, shuffled, view='shuffled')
+        window = self.dl.cache.load(path, view='shuffled', start='2020-01-01', end='2020-12-31')
+        self.assertTrue(window.sort_index().equals(full.loc['2020-01-01':'2020-12-31']))
+
+
+class TestLoaderOptions(unittest.TestCase):
+
+    def setUp(self):
+        self.tmp = tempfile.mkdtemp()
+        shutil.copy(os.path.join('data', 'MER.csv'), self.tmp)
+
+    def tearDown(self):
+        shutil.rmtree(self.tmp)
+
+    def loader(self, **kwargs):
+        dl = mean_reversion.DataLoader(**kwargs)
+        dl.directory = self.tmp
+        dl.cache = mean_reversion.DataCache(os.path.join(self.tmp, '.cache'))
+        return dl
+
+    def test_suffixed_numbers(self):
+        df = self.loader().load_data('MER.csv')
+        self.assertTrue(all(pd.api.types.is_float_dtype(t) for t in df.dtypes))
+        self.assertEqual(df['volume'].iloc[0], 118160.0)
+        self.assertAlmostEqual(df['change'].iloc[0], 0.0199)
+
+        values = pd.Series(['1,200.5K', ' -3% ', '-', None, '2.5m', '+7', '.5'])
+        np.testing.assert_array_equal(parse_numeric(values).to_numpy(), [1200500.0, -0.03, np.nan, np.nan, 2500000.0, 7.0, 0.5])
+        self.assertIsNone(parse_numeric(pd.Series(['1.5K', 'abc'])))
+        self.assertIsNone(parse_numeric(pd.Series(['1.2.3'])))
+        self.assertIsNone(parse_numeric(pd.Series(['1,2,3.4'])))
+        values = pd.Series(['1,234', '12,345.6K', '-1,000,000', '1234,5', '12,34', ',123', '1,234.5,6'])
+        np.testing.assert_array_equal(parse_numeric(values, strict=False), [1234.0, 12345600.0, -1000000.0] + [np.nan] * 4)
+
+    def test_chunk_types(self):
+        with open(os.path.join(self.tmp, 'CHUNKS.csv'), 'w') as f:
+            f.write("Date,Close,Vol.,Count\n")
+            f.write("2024-01-01,1.0,1.5K,1\n2024-01-02,2.0,2K,2\n2024-01-03,3.0,n/a,\n2024-01-04,4.0,3K,4\n")
+        chunks = list(self.loader(use_cache=False).iter_chunks('CHUNKS.csv', 2))
+        self.assertEqual([list(c.dtypes) for c in chunks], [[np.dtype(float)] * 3] * 2)
+        np.testing.assert_array_equal(chunks[1]['vol.'], [np.nan, 3000.0])
+        self.assertIsNone(parse_numeric(pd.Series(['1.5K', 'n/a'])))
+        np.testing.assert_array_equal(parse_numeric(pd.Series(['1.5K', 'n/a']), strict=False), [1500.0, np.nan])
+
+    def test_columns_and_float32(self):
+        full = self.loader().load_data('MER.csv')
+        lean = self.loader(columns=['Close', 'volume'], date_format='%Y-%m-%d', float32=True).load_data('MER.csv')
+        self.assertEqual(list(lean.columns), ['close', 'volume'])
+        self.assertTrue((lean.dtypes == np.float32).all())
+        np.testing.assert_allclose(lean['close'], full['close'], rtol=1e-6)
+        self.assertTrue(lean.index.equals(full.index))
+
+        # cached apart from the full frame, and read back from the cache
+        self.assertTrue(os.path.isdir(os.path.join(self.tmp, '.cache', 'MER.csv@close-volume+f32')))
+        self.assertTrue(self.loader(columns=['close', 'volume'], float32=True).load_data('MER.csv').equals(lean))
+        self.assertEqual(len(self.loader().load_data('MER.csv').columns), len(full.columns))
+
+        self.assertIsNone(self.loader(columns=['vwap'], use_cache=False).load_data('MER.csv'))
+        self.assertIsNone(self.loader(date_format='%d/%m/%Y', use_cache=False).load_data('MER.csv'))
@@ -0,0 +1,140 @@
+import contextlib
+import io
+import json
+import mean_reversion
+from mean_reversion import arrays, batch
+import numpy as np
+import os
+import tempfile
+import unittest
+
+
+def reference(signal, log_returns, close, high, low, open, stop_loss, take_profit, max_holding):
+    # per-bar loop of the risk exits
+    signal_out = np.zeros(len(signal))
+    returns_out = np.zeros(len(signal))
+    current, entry, held, cut = 0, None, 0, False
+    for t, s in enumerate(signal):
+        if s != current:
+            current, entry, held, cut = s, close[t - 1], 0, False
+        if s == 0 or cut:
+            continue
+        held += 1
+        fill = None
+        cut = held >= max_holding
+        if s > 0 and high[t] >= entry * (1 + take_profit):
+            fill, cut = max(open[t], entry * (1 + take_profit)), True
+        if s < 0 and low[t] <= entry * (1 - take_profit):
+            fill, cut = min(open[t], entry * (1 - take_profit)), True
+        if s > 0 and low[t] <= entry * (1 - stop_loss):
+            fill, cut = min(open[t], entry * (1 - stop_loss)), True
+        if s < 0 and high[t] >= entry * (1 + stop_loss):
+            fill, cut = max(open[t], entry * (1 + stop_loss)), True
+        signal_out[t] = s
+        returns_out[t] = s * np.log(fill / close[t - 1]) if fill is not None else np.nan_to_num(s * log_returns[t])
+    return signal_out, returns_out
+
+
+class TestRiskExits(unittest.TestCase):
+
+    def setUp(self):
+        self.data = mean_reversion.DataLoader().load_data('XAUUSD_h4.csv')
+        self.accounts = mean_reversion.Accounts(cash=None)
+        self.exits = {'stop_loss': 0.005, 'take_profit': 0.01, 'max_holding': 20}
+
+    def hyperparameters(self, **exits):
+        return mean_reversion.Hyperparameters(20, 10, 10, 1, 'neutral', 'exponential', **exits)
+
+    def test_matches_per_bar_loop(self):
+        base = mean_reversion.MeanReversion(self.data.copy(), self.hyperparameters(), self.accounts, verbose=False, cache=None).built_model
+        model = mean_reversion.MeanReversion(self.data.copy(), self.hyperparameters(**self.exits), self.accounts, verbose=False, cache=None).built_model
+
+        prices = [self.data[c].to_numpy(dtype=float) for c in ['close', 'high', 'low', 'open']]
+        signal, returns = reference(base['signal'].fillna(0).to_numpy(), base['log_returns'].to_numpy(), *prices, **self.exits)
+        np.testing.assert_allclose(model['signal'], signal)
+        np.testing.assert_allclose(model['strategy_returns'], returns, atol=1e-12)
+        self.assertLess((model['signal'] != 0).sum(), (base['signal'] != 0).sum())
+
+    def test_holding_limit(self):
+        signal = np.r_[0, np.ones(10), 0, -np.ones(3)]
+        close = np.linspace(100, 101, len(signal))
+        cut, _, fills = arrays.risk_exits(signal, arrays.log_returns(close), close, close, close, max_holding=4)
+        np.testing.assert_array_equal(cut, np.r_[0, np.ones(4), np.zeros(7), -np.ones(3)])
+        self.assertTrue(np.isnan(fills).all())
+
+    def test_ledger_exits_at_fills(self):
+        hparam = self.hyperparameters(**self.exits)
+        model = mean_reversion.MeanReversion(self.data.copy(), hparam, self.accounts, verbose=False).built_model
+        trades = mean_reversion.TradeLedger(model, self.accounts.cash, hparam.side).trades
+        self.assertGreater((trades['exit_price'] != model['close'].to_numpy()[trades['exit']]).sum(), 0)
+        np.testing.assert_allclose(trades['pnl'], trades['direction'] * np.log(trades['exit_price'] / trades['entry_price']), atol=1e-12)
+
+    def test_invalid_exits(self):
+        for exits in [{'stop_loss': 0}, {'take_profit': -0.01}, {'max_holding': 0}, {'max_holding': 2.5}]:
+            with self.assertRaises(ValueError):
+                mean_reversion.MeanReversion(self.data.copy(), self.hyperparameters(**exits), self.accounts, verbose=False)
+            grid = mean_reversion.ParameterGrid(mean_period=[20])
+            self.assertIsNone(mean_reversion.Sweep(self.data, grid, self.accounts, **exits).run())
+
+        # price levels do not apply to a pairs spread
+        with self.assertRaises(ValueError):
+            mean_reversion.PairsMeanReversion(self.data.copy(), self.data.copy(), self.hyperparameters(stop_loss=0.01), self.accounts, verbose=False)
+        # the incremental engines do not track intrabar prices or entries
+        hparam = self.hyperparameters(max_holding=20)
+        for engine in [lambda: mean_reversion.LeanBacktest(hparam, self.accounts),
+                       lambda: mean_reversion.BlockModel(hparam),
+                       lambda: mean_reversion.StreamingMeanReversion(hparam, self.accounts)]:
+            with self.assertRaises(ValueError):
+                engine()
+
+    def test_sweep_matches_model(self):
+        grid = mean_reversion.ParameterGrid(mean_period=[20], threshold=[1, 2], side=['long', 'short', 'neutral'])
+        results = mean_reversion.Sweep(self.data, grid, self.accounts, **self.exits).run()
+        for row in results.itertuples():
+            hparam = mean_reversion.Hyperparameters(row.mean_period, row.spread_mean_period, row.spread_sdev_period,
+                                                    row.threshold, row.side, row.calc_type, **self.exits)
+            metrics = mean_reversion.MeanReversion(self.data.copy(), hparam, self.accounts, verbose=False).metrics.to_dict()
+            np.testing.assert_allclose([row.net_returns_percent, row.sharpe_annual],
+                                       [metrics['net_returns_percent'], metrics['sharpe_annual']])
+
+    def test_halving(self):
+        grid = mean_reversion.ParameterGrid(mean_period=[10, 20], threshold=[1, 2], side=['long', 'neutral'])
+        expected = mean_reversion.Sweep(self.data, grid, self.accounts, **self.exits).run()
+        serial = mean_reversion.SuccessiveHalving(self.data.copy(), grid, self.accounts, max_workers=1, **self.exits).run()
+        parallel = mean_reversion.SuccessiveHalving(self.data.copy(), grid, self.accounts, max_workers=2, **self.exits).run()
+        np.testing.assert_allclose(parallel['net_returns_percent'], serial['net_returns_percent'])
+
+        keys = mean_reversion.ParameterGrid.keys
+        full = expected.set_index(keys).loc[list(serial[keys].itertuples(index=False, name=None))]
+        np.testing.assert_allclose(serial['net_returns_percent'], full['net_returns_percent'])
+        self.assertIsNone(mean_reversion.SuccessiveHalving(self.data.copy(), grid, self.accounts, max_holding=0).run())
+
+    def test_parallel_walk_forward_and_batch(self):
+        grid = mean_reversion.ParameterGrid(mean_period=[10, 20], threshold=[1, 2], side=['long', 'neutral'])
+        expected = mean_reversion.Sweep(self.data, grid, self.accounts, **self.exits).run()
+        parallel = mean_reversion.ParallelSweep(self.data.copy(), grid, self.accounts, max_workers=2, **self.exits).run()
+        np.testing.assert_allclose(parallel['net_returns_percent'], expected['net_returns_percent'])
+
+        wf = mean_reversion.WalkForward(self.data, grid, self.accounts, train_size=4000, test_size=2000, max_workers=2, **self.exits)
+        serial = mean_reversion.WalkForward(self.data, grid, self.accounts, train_size=4000, test_size=2000, max_workers=1, **self.exits)
+        plain = mean_reversion.WalkForward(self.data, grid, self.accounts, train_size=4000, test_size=2000, max_workers=1)
+        wf.run(), serial.run(), plain.run()
+        np.testing.assert_allclose(wf.returns, serial.returns)
+        self.assertFalse(np.allclose(wf.returns, plain.returns))
+
+        with tempfile.TemporaryDirectory() as tmp:
+            spec, output = os.path.join(tmp, 'spec.json'), os.path.join(tmp, 'results.jsonl')
+            with open(spec, 'w') as f:
+                json.dump({'datasets': ['XAUUSD_h4.csv'], 'grid': {'mean_period': [10, 20], 'threshold': [1, 2], 'side': ['long', 'neutral']},
+                           'exits': self.exits}, f)
+            with contextlib.redirect_stderr(io.StringIO()):
+                self.assertEqual(batch.main([spec, '--jobs', '1', '--output', output]), batch.EXIT_OK)
+                with open(spec, 'w') as f:
+                    json.dump({'datasets': ['XAUUSD_h4.csv'], 'exits': {'max_holding': 0}}, f)
+                self.assertEqual(batch.main([spec, '--output', output]), batch.EXIT_INVALID)
+            with open(output) as f:
+                rows = sorted((json.loads(line) for line in f), key=lambda r: (r['mean_period'], r['threshold'], r['side']))
+        ordered = expected.sort_values(['mean_period', 'threshold', 'side'])
+        np.testing.assert_allclose([r['net_returns_percent'] for r in rows], ordered['net_returns_percent'])
+        self.assertEqual(rows[0]['stop_loss'], self.exits['stop_loss'])
+
@@ -0,0 +1,52 @@
+import mean_reversion
+import numpy as np
+import unittest
+
+
+class TestSuccessiveHalving(unittest.TestCase):
+
+    def setUp(self):
+        self.data = mean_reversion.DataLoader().load_data('XAUUSD_h4.csv')
+        self.accounts = mean_reversion.Accounts(cash=None)
+        self.grid = mean_reversion.ParameterGrid(
+            mean_period=[10, 20, 50],
+            spread_mean_period=[5, 10, 20],
+            spread_sdev_period=[10, 20],
+            threshold=[1, 2],
+            side=['long', 'short', 'neutral'],
+            calc_type=['simple', 'exponential']
+        )
+
+    def test_budgets(self):
+        search = mean_reversion.SuccessiveHalving(self.data, self.grid, self.accounts, eta=3, min_bars=500)
+        budgets = search.budgets(len(self.grid))
+        self.assertEqual(budgets[-1], len(self.data))
+        self.assertTrue(all(a < b for a, b in zip(budgets, budgets[1:])))
+        self.assertGreaterEqual(budgets[0], 500)
+
+    def test_near_grid_quality(self):
+        search = mean_reversion.SuccessiveHalving(self.data, self.grid, self.accounts, objective='net_returns_percent', max_workers=2)
+        results = search.run()
+        self.assertLess(search.cost, 1)
+        self.assertEqual(search.history['rung'].max() + 1, len(search.budgets(len(self.grid))))
+
+        full = mean_reversion.Sweep(self.data, self.grid, self.accounts).run()
+        scores = full['net_returns_percent'].to_numpy()
+        best = results['net_returns_percent'].iloc[0]
+        self.assertGreaterEqual(best, np.quantile(scores, 0.95))
+
+        # the last rung is scored on the full series, matching the grid sweep
+        keys = mean_reversion.ParameterGrid.keys
+        merged = results.merge(full, on=keys, suffixes=('', '_full'))
+        self.assertEqual(len(merged), len(results))
+        np.testing.assert_allclose(merged['net_returns_percent'], merged['net_returns_percent_full'])
+
+    def test_serial_matches_parallel(self):
+        serial = mean_reversion.SuccessiveHalving(self.data, self.grid, self.accounts, max_workers=1).run()
+        parallel = mean_reversion.SuccessiveHalving(self.data, self.grid, self.accounts, max_workers=2).run()
+        np.testing.assert_allclose(serial['sharpe_annual'], parallel['sharpe_annual'])
+
+    def test_invalid_objective(self):
+        search = mean_reversion.SuccessiveHalving(self.data, self.grid, self.accounts, objective='luck')
+        self.assertIsNone(search.run())
+
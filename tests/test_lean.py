@@ -0,0 +1,63 @@
+import mean_reversion
+import numpy as np
+import os
+import shutil
+import tempfile
+import unittest
+
+
+class TestLeanBacktest(unittest.TestCase):
+
+    def setUp(self):
+        self.data = mean_reversion.DataLoader().load_data('XAUUSD_h4.csv')
+        self.accounts = mean_reversion.Accounts(cash=None)
+
+    def test_matches_metrics(self):
+        for calc_type in mean_reversion.RollingCalculationType().valid_values:
+            for side in mean_reversion.Side().valid_values:
+                hparam = mean_reversion.Hyperparameters(20, 10, 15, 1, side, calc_type)
+                expected = mean_reversion.MeanReversion(self.data, hparam, self.accounts, verbose=False, cache=None)
+                result = mean_reversion.LeanBacktest(hparam, self.accounts, keep_equity=True, block_size=1000).run(self.data)
+
+                for key, value in expected.metrics.to_dict().items():
+                    self.assertAlmostEqual(result[key], value, places=6, msg=f"{calc_type} {side} {key}")
+                np.testing.assert_allclose(result['equity'][1:], expected.built_model['equity'].to_numpy()[1:])
+
+    def test_float32(self):
+        hparam = mean_reversion.Hyperparameters(20, 10, 15, 1, 'long', 'exponential')
+        expected = mean_reversion.LeanBacktest(hparam, self.accounts).run(self.data)
+        result = mean_reversion.LeanBacktest(hparam, self.accounts, dtype=np.float32, keep_equity=True).run(self.data)
+        self.assertEqual(result['equity'].dtype, np.float32)
+        self.assertAlmostEqual(result['max_drawdown'], expected['max_drawdown'], places=1)
+
+    def test_chunked_file(self):
+        tmp = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, tmp)
+        shutil.copy(os.path.join('data', 'XAUUSD_h4.csv'), tmp)
+        loader = mean_reversion.DataLoader(columns=['close'])
+        loader.directory = tmp
+        loader.cache = mean_reversion.DataCache(os.path.join(tmp, '.cache'))
+
+        chunks = list(loader.iter_chunks('XAUUSD_h4.csv', 7000))
+        self.assertEqual(sum(len(c) for c in chunks), len(self.data))
+        self.assertTrue(max(len(c) for c in chunks) <= 7000)
+
+        for calc_type in mean_reversion.RollingCalculationType().valid_values:
+            hparam = mean_reversion.Hyperparameters(20, 10, 15, 1, 'neutral', calc_type)
+            expected = mean_reversion.MeanReversion(self.data, hparam, self.accounts, verbose=False, cache=None).metrics.to_dict()
+            lean = mean_reversion.LeanBacktest(hparam, self.accounts, block_size=3000)
+
+            from_csv = lean.run_file('XAUUSD_h4.csv', loader, chunk_size=7000)
+            # once the full frame is cached, its memory maps are sliced instead of the CSV
+            full = mean_reversion.DataLoader()
+            full.directory = tmp
+            full.cache = loader.cache
+            full.load_data('XAUUSD_h4.csv')
+            from_cache = lean.run_file('XAUUSD_h4.csv', loader, chunk_size=7000)
+            loader.clear_cache()
+
+            for key, value in expected.items():
+                self.assertAlmostEqual(from_csv[key], value, places=6, msg=f"{calc_type} {key}")
+                self.assertAlmostEqual(from_cache[key], value, places=6, msg=f"{calc_type} {key}")
+
+        self.assertIsNone(lean.run_file('missing.csv', loader))
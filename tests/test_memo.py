@@ -0,0 +1,35 @@
+import mean_reversion
+import numpy as np
+import unittest
+
+
+class TestStageCache(unittest.TestCase):
+
+    def test_lru_eviction_by_bytes(self):
+        cache = mean_reversion.StageCache(max_bytes=3 * 800)
+        for i in range(3):
+            cache.get(('k', i), lambda: np.zeros(100))
+        cache.get(('k', 0), lambda: np.ones(100))
+        cache.get(('k', 3), lambda: np.zeros(100))
+
+        self.assertIn(('k', 0), cache.entries)
+        self.assertNotIn(('k', 1), cache.entries)
+        self.assertEqual(cache.stats()['hits'], 1)
+        self.assertEqual(cache.stats()['misses'], 4)
+        self.assertEqual(cache.stats()['evictions'], 1)
+        self.assertLessEqual(cache.nbytes, cache.max_bytes)
+
+    def test_threshold_and_side_reuse_z_score(self):
+        data = mean_reversion.DataLoader().load_data('XAUUSD_d1.csv')
+        accounts = mean_reversion.Accounts(cash=None)
+        cache = mean_reversion.StageCache()
+
+        for threshold in [1, 2]:
+            for side in mean_reversion.Side().valid_values:
+                hparam = mean_reversion.Hyperparameters(20, 10, 10, threshold, side, 'exponential')
+                cached = mean_reversion.MeanReversion(data, hparam, accounts, verbose=False, cache=cache)
+                uncached = mean_reversion.MeanReversion(data, hparam, accounts, verbose=False, cache=None)
+                np.testing.assert_array_equal(cached.built_model['equity'], uncached.built_model['equity'])
+
+        # mean, spread mu, spread sigma and z-score computed once, positions once per threshold
+        self.assertEqual(cache.stats()['misses'], 4 + 2 * 2)
@@ -0,0 +1,60 @@
+import mean_reversion
+import numpy as np
+import unittest
+
+
+class TestMetricsAccumulator(unittest.TestCase):
+
+    def setUp(self):
+        self.data = mean_reversion.DataLoader().load_data('XAUUSD_h4.csv')
+        self.accounts = mean_reversion.Accounts(cash=None)
+        self.models = [mean_reversion.MeanReversion(self.data, mean_reversion.Hyperparameters(20, 10, 15, t, side, 'exponential'), self.accounts, verbose=False).built_model
+                       for t in [1, 2] for side in ['long', 'neutral']]
+        self.returns = np.column_stack([m['strategy_returns'].fillna(0).to_numpy() for m in self.models])
+
+    def expected(self, returns):
+        # extended statistics computed directly from the full series
+        traded = returns[returns != 0]
+        excess = traded.mean() - 0.05 / 252
+        annual = returns.groupby(returns.index.year).sum() * 100
+        equity = returns.cumsum() * self.accounts.cash + self.accounts.cash
+        max_drawdown = abs(((equity - equity.cummax()) / equity.cummax()).min() * 100)
+        return {
+            'sortino_daily': excess / np.sqrt((np.minimum(traded, 0) ** 2).mean()),
+            'calmar': annual.mean() / max_drawdown,
+            'win_rate': (traded > 0).mean() * 100,
+            'exposure': len(traded) / len(returns) * 100,
+        }, annual
+
+    def test_blocks_of_configs(self):
+        accumulator = mean_reversion.MetricsAccumulator(self.accounts.cash)
+        for start in range(0, len(self.returns), 1000):
+            accumulator.update(self.returns[start:start + 1000], self.data.index[start:start + 1000])
+        result = accumulator.to_dict()
+        annual_returns = accumulator.annual_returns()
+
+        for i, model in enumerate(self.models):
+            for key, value in mean_reversion.Metrics(model, self.accounts.cash).to_dict().items():
+                self.assertAlmostEqual(result[key][i], value, places=6, msg=key)
+
+            expected, annual = self.expected(model['strategy_returns'].fillna(0))
+            for key, value in expected.items():
+                self.assertAlmostEqual(result[key][i], value, places=8, msg=key)
+            np.testing.assert_allclose([annual_returns[y][i] for y in annual.index], annual.to_numpy(), atol=1e-10)
+
+    def test_batch_metrics_extended(self):
+        metrics = mean_reversion.BatchMetrics(self.returns, self.accounts.cash, self.data.index)
+        self.assertEqual(metrics.win_rate.shape, (len(self.models),))
+        expected, _ = self.expected(self.models[0]['strategy_returns'].fillna(0))
+        self.assertAlmostEqual(metrics.calmar[0], expected['calmar'])
+
+    def test_streaming(self):
+        hparam = mean_reversion.Hyperparameters(20, 10, 15, 1, 'neutral', 'exponential')
+        stream = mean_reversion.StreamingMeanReversion(hparam, self.accounts)
+        for timestamp, close in self.data['close'].items():
+            stream.update(close, timestamp)
+
+        result = stream.metrics.to_dict()
+        expected = mean_reversion.BatchMetrics(self.returns[:, 1], self.accounts.cash, self.data.index).to_dict()
+        for key, value in expected.items():
+            self.assertAlmostEqual(result[key], value[0], places=6, msg=key)
@@ -0,0 +1,39 @@
+import mean_reversion
+import numpy as np
+import unittest
+
+
+class TestPairs(unittest.TestCase):
+
+    def setUp(self):
+        dl = mean_reversion.DataLoader()
+        self.y = dl.load_data('BDO_d1.csv')
+        self.x = dl.load_data('MER.csv')
+        self.accounts = mean_reversion.Accounts(cash=None)
+
+    def test_rolling_beta_matches_ols(self):
+        y = self.y['close'].to_numpy()[:300]
+        x = self.x['close'].to_numpy()[:300]
+        window = 30
+        beta = mean_reversion.arrays.rolling_beta(y, x, window)
+
+        self.assertTrue(np.isnan(beta[:window - 1]).all())
+        expected = [np.polyfit(x[i - window + 1:i + 1], y[i - window + 1:i + 1], 1)[0] for i in range(window - 1, len(y))]
+        np.testing.assert_allclose(beta[window - 1:], expected, rtol=1e-8)
+
+    def test_spread_and_leg_returns(self):
+        hparam = mean_reversion.Hyperparameters(20, 10, 10, 1, 'neutral', 'exponential')
+        sim = mean_reversion.PairsMeanReversion(self.y.copy(), self.x.copy(), hparam, self.accounts, hedge_period=40, verbose=False)
+        model = sim.built_model
+
+        np.testing.assert_allclose(model['spread'], model['close'] - model['hedge_ratio'] * model['close_x'])
+        np.testing.assert_allclose(model['y_returns'] + model['x_returns'], model['strategy_returns'].fillna(0), atol=1e-12)
+        self.assertNotEqual(model['x_returns'].abs().sum(), 0)
+        self.assertAlmostEqual(sim.metrics.to_dict()['final_equity'], model['equity'].iloc[-1])
+
+    def test_side_filter(self):
+        hparam = mean_reversion.Hyperparameters(20, 10, 10, 1, 'long', 'simple')
+        model = mean_reversion.PairsMeanReversion(self.y.copy(), self.x.copy(), hparam, self.accounts, verbose=False).built_model
+        short = model['signal'] == -1
+        self.assertEqual(model.loc[short, 'y_returns'].abs().sum(), 0)
+        self.assertEqual(model.loc[short, 'x_returns'].abs().sum(), 0)
@@ -0,0 +1,49 @@
+import mean_reversion
+import numpy as np
+import unittest
+
+
+class TestParallelSweep(unittest.TestCase):
+
+    def setUp(self):
+        self.data = mean_reversion.DataLoader().load_data('BDO_d1.csv')
+        self.accounts = mean_reversion.Accounts(cash=None)
+        self.grid = mean_reversion.ParameterGrid(
+            mean_period=[10, 20],
+            threshold=[1, 2],
+            side=[mean_reversion.Side().side_long, mean_reversion.Side().side_neutral]
+        )
+
+    def test_matches_sweep(self):
+        progress = []
+        results = mean_reversion.ParallelSweep(self.data.copy(), self.grid, self.accounts, max_workers=2, chunk_size=3,
+                                               progress=lambda done, total: progress.append((done, total))).run()
+        expected = mean_reversion.Sweep(self.data.copy(), self.grid, self.accounts).run()
+
+        self.assertEqual(list(results['mean_period']), list(expected['mean_period']))
+        self.assertEqual(list(results['side']), list(expected['side']))
+        np.testing.assert_allclose(results['net_returns_percent'], expected['net_returns_percent'])
+        np.testing.assert_allclose(results['max_drawdown'], expected['max_drawdown'])
+        self.assertEqual(progress[-1], (len(self.grid), len(self.grid)))
+
+    def test_shared_frame_roundtrip(self):
+        with mean_reversion.SharedFrame(self.data) as shared:
+            data, handles = mean_reversion.SharedFrame.attach(shared.spec())
+            np.testing.assert_array_equal(data['close'].to_numpy(), self.data['close'].to_numpy())
+            self.assertTrue(data.index.equals(self.data.index))
+            del data
+            for h in handles:
+                h.close()
+
+    def test_shared_frame_tz_index(self):
+        data = self.data.rename(columns=str.title)
+        data.index = data.index.tz_localize('Asia/Manila')
+        with mean_reversion.SharedFrame(data) as shared:
+            attached, handles = mean_reversion.SharedFrame.attach(shared.spec())
+            self.assertTrue(attached.index.equals(data.index))
+            self.assertEqual(str(attached.index.tz), 'Asia/Manila')
+            np.testing.assert_array_equal(attached['close'].to_numpy(), data['Close'].to_numpy())
+            del attached
+            for h in handles:
+                h.close()
+        self.assertEqual(list(data.columns[:4]), ['Close', 'Open', 'High', 'Low'])
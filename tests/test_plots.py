@@ -0,0 +1,48 @@
+import mean_reversion
+from mean_reversion.downsample import lttb, minmax, downsample
+import numpy as np
+import os
+import tempfile
+import unittest
+
+
+class TestPlots(unittest.TestCase):
+
+    def setUp(self):
+        self.y = np.cumsum(np.random.default_rng(3).normal(size=100000))
+
+    def test_lttb(self):
+        positions = lttb(self.y, 500)
+        self.assertEqual(len(positions), 500)
+        self.assertEqual(positions[0], 0)
+        self.assertEqual(positions[-1], len(self.y) - 1)
+        self.assertTrue((np.diff(positions) > 0).all())
+        np.testing.assert_array_equal(lttb(self.y[:100], 500), np.arange(100))
+
+    def test_minmax_keeps_extremes(self):
+        positions = minmax(self.y, 500)
+        self.assertLessEqual(len(positions), 502)
+        self.assertIn(np.argmin(self.y), positions)
+        self.assertIn(np.argmax(self.y), positions)
+        self.assertEqual(positions[-1], len(self.y) - 1)
+
+    def test_downsample_drops_nan(self):
+        data = mean_reversion.DataLoader().load_data('XAUUSD_h4.csv')
+        hparam = mean_reversion.Hyperparameters(20, 10, 15, 1, 'neutral', 'simple')
+        model = mean_reversion.MeanReversion(data, hparam, mean_reversion.Accounts(cash=None), verbose=False).built_model
+        series = downsample(model['z_score'], 300)
+        self.assertEqual(len(series), 300)
+        self.assertFalse(series.isna().any())
+        self.assertTrue(series.index.is_monotonic_increasing)
+
+    def test_export(self):
+        data = mean_reversion.DataLoader().load_data('XAUUSD_h4.csv')
+        hparam = mean_reversion.Hyperparameters(20, 10, 15, 1, 'neutral', 'simple')
+        model = mean_reversion.MeanReversion(data, hparam, mean_reversion.Accounts(cash=None), verbose=False).built_model
+
+        mean_reversion.headless()
+        with tempfile.TemporaryDirectory() as directory:
+            paths = mean_reversion.export_reports({'run': model}, directory, formats=['png', 'svg'], points=500)
+            self.assertEqual(len(paths['run']), 8)
+            for path in paths['run']:
+                self.assertTrue(os.path.getsize(path) > 0)
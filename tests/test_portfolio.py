@@ -0,0 +1,33 @@
+import mean_reversion
+import numpy as np
+import unittest
+
+
+class TestPortfolio(unittest.TestCase):
+
+    def test_mixed_frequency_legs(self):
+        files = ['XAUUSD_d1.csv', 'XAUUSD_h4.csv']
+        hparam = mean_reversion.Hyperparameters(20, 10, 10, 1, 'long', 'exponential')
+        accounts = mean_reversion.Accounts(cash=None)
+
+        portfolio = mean_reversion.Portfolio(hparam, accounts, files=files, weights={'XAUUSD_d1.csv': 0.25, 'XAUUSD_h4.csv': 0.75}, max_workers=2)
+        contribution = portfolio.run()
+
+        dl = mean_reversion.DataLoader()
+        legs = {f: mean_reversion.MeanReversion(dl.load_data(f), hparam, accounts, verbose=False).built_model['strategy_returns'].fillna(0) for f in files}
+        index = legs[files[0]].index.union(legs[files[1]].index)
+        self.assertTrue(portfolio.returns.index.equals(index))
+
+        expected = 0.25 * legs[files[0]].sum() + 0.75 * legs[files[1]].sum()
+        self.assertAlmostEqual(portfolio.returns.sum(), expected)
+        self.assertAlmostEqual(contribution.loc['XAUUSD_h4.csv', 'contribution_percent'], 75 * legs[files[1]].sum())
+        np.testing.assert_allclose(contribution['share'].sum(), 1.0)
+        self.assertAlmostEqual(portfolio.metrics['final_equity'], portfolio.equity.iloc[-1])
+
+    def test_equal_weights_over_loaded_legs(self):
+        hparam = mean_reversion.Hyperparameters(20, 10, 10, 1, 'long', 'exponential')
+        portfolio = mean_reversion.Portfolio(hparam, mean_reversion.Accounts(cash=None), files=['XAUUSD_d1.csv', 'missing.csv'], max_workers=1)
+        contribution = portfolio.run()
+        self.assertEqual(portfolio.dropped, ['missing.csv'])
+        self.assertEqual(list(contribution.index), ['XAUUSD_d1.csv'])
+        self.assertEqual(contribution.loc['XAUUSD_d1.csv', 'weight'], 1.0)
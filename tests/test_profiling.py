@@ -0,0 +1,55 @@
+import mean_reversion
+from mean_reversion import profiling
+import json
+import os
+import tempfile
+import unittest
+
+
+class TestProfiling(unittest.TestCase):
+
+    def tearDown(self):
+        profiling.disable()
+
+    def test_disabled(self):
+        self.assertIsNone(profiling.active())
+        self.assertIs(profiling.stage('a'), profiling.stage('b'))
+        with profiling.stage('a'):
+            pass
+
+    def test_stages(self):
+        sink = mean_reversion.MemorySink()
+        profiler = profiling.enable([sink], memory=True)
+        data = mean_reversion.DataLoader(use_cache=False).load_data('MER.csv')
+        hparam = mean_reversion.Hyperparameters(20, 10, 15, 1, 'long', 'simple')
+        for _ in range(2):
+            mean_reversion.MeanReversion(data.copy(), hparam, mean_reversion.Accounts(cash=None), verbose=False, cache=None)
+
+        frame = profiler.to_frame().set_index('stage')
+        for name in ['load_data', 'load_data.read_csv', 'load_data.datetime', 'load_data.numeric', 'build_model',
+                     'build_model.mean', 'build_model.z_score', 'build_model.signal', 'build_model.returns', 'metrics']:
+            self.assertIn(name, frame.index)
+        self.assertEqual(frame.loc['build_model', 'calls'], 2)
+        self.assertEqual(frame.loc['build_model.signal', 'depth'], 1)
+        self.assertGreaterEqual(frame.loc['build_model', 'wall_time'], frame.loc['build_model.signal', 'wall_time'])
+        self.assertGreaterEqual(frame.loc['build_model', 'peak_memory'], frame.loc['build_model.signal', 'peak_memory'])
+        self.assertGreater(frame.loc['load_data.read_csv', 'peak_memory'], 0)
+        self.assertEqual(len(sink.events), frame['calls'].sum())
+
+        profiler.reset()
+        self.assertEqual(len(profiler.to_frame()), 0)
+
+    def test_json_sink(self):
+        with tempfile.TemporaryDirectory() as directory:
+            path = os.path.join(directory, 'stages.jsonl')
+            profiling.enable([mean_reversion.JSONSink(path)])
+            with profiling.stage('outer'):
+                with profiling.stage('inner'):
+                    pass
+            profiling.disable()
+
+            with open(path) as f:
+                events = [json.loads(line) for line in f]
+            self.assertEqual([e['stage'] for e in events], ['inner', 'outer'])
+            self.assertEqual([e['depth'] for e in events], [1, 0])
+            self.assertIsNone(events[0]['peak_memory'])
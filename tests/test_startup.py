@@ -0,0 +1,34 @@
+import json
+import subprocess
+import sys
+import unittest
+
+
+def run(code):
+    out = subprocess.run([sys.executable, '-c', code], capture_output=True, text=True, check=True)
+    return json.loads(out.stdout.strip().splitlines()[-1])
+
+
+class TestStartup(unittest.TestCase):
+
+    heavy_modules = ['statsmodels', 'matplotlib', 'seaborn', 'scipy']
+
+    def test_import_is_lightweight(self):
+        result = run(
+            "import json, sys\n"
+            "import mean_reversion\n"
+            f"print(json.dumps({{'loaded': [m for m in {self.heavy_modules!r} if m in sys.modules]}}))"
+        )
+        self.assertEqual(result['loaded'], [])
+
+    def test_headless_plots(self):
+        result = run(
+            "import json, sys\n"
+            "import mean_reversion\n"
+            "mean_reversion.headless()\n"
+            "mean_reversion.Plots(None)\n"
+            "import matplotlib\n"
+            "print(json.dumps({'backend': matplotlib.get_backend().lower(), 'seaborn': 'seaborn' in sys.modules}))"
+        )
+        self.assertEqual(result['backend'], 'agg')
+        self.assertTrue(result['seaborn'])
@@ -0,0 +1,90 @@
+import mean_reversion
+import numpy as np
+import os
+import tempfile
+import unittest
+
+
+class TestResultStore(unittest.TestCase):
+
+    def setUp(self):
+        self.directory = tempfile.TemporaryDirectory()
+        self.store = mean_reversion.ResultStore(os.path.join(self.directory.name, 'results.db'), keep_equity=True)
+        self.data = mean_reversion.DataLoader().load_data('XAUUSD_h4.csv')
+        self.accounts = mean_reversion.Accounts(cash=None)
+
+    def tearDown(self):
+        self.store.close()
+        self.directory.cleanup()
+
+    def test_simulation_reads_back(self):
+        hparam = mean_reversion.Hyperparameters(20, 10, 15, 1, 'long', 'simple')
+        first = mean_reversion.MeanReversion(self.data.copy(), hparam, self.accounts, verbose=False, store=self.store)
+        second = mean_reversion.MeanReversion(self.data.copy(), hparam, self.accounts, verbose=False, store=self.store)
+
+        self.assertEqual(first.store_key, second.store_key)
+        self.assertIsNone(second._built_model)
+        for k, v in first.metrics.to_dict().items():
+            self.assertAlmostEqual(second.results()[k], v)
+        np.testing.assert_allclose(self.store.equity(first.store_key).to_numpy(), first.built_model['equity'].to_numpy())
+
+        # any change to the parameters, cash or data is a different key
+        other = mean_reversion.MeanReversion(self.data.copy(), hparam, mean_reversion.Accounts(5000), verbose=False, store=self.store)
+        self.assertNotEqual(other.store_key, first.store_key)
+        changed = self.data.copy()
+        changed.iloc[-1, changed.columns.get_loc('close')] += 1
+        self.assertNotEqual(mean_reversion.data_key(changed), first.data_key)
+
+    def test_sweep_and_rank(self):
+        grid = mean_reversion.ParameterGrid(mean_period=[10, 20], threshold=[1, 2], side=['long', 'short'])
+        expected = mean_reversion.Sweep(self.data.copy(), grid, self.accounts).run()
+        stored = mean_reversion.Sweep(self.data.copy(), grid, self.accounts, store=self.store).run()
+        self.assertEqual(len(self.store.query(model='Sweep')), len(grid))
+
+        # a wider grid only evaluates the new partitions
+        wider = mean_reversion.ParameterGrid(mean_period=[10, 20, 30], threshold=[1, 2], side=['long', 'short'])
+        again = mean_reversion.Sweep(self.data.copy(), wider, self.accounts, store=self.store).run()
+        self.assertEqual(len(self.store.query(model='Sweep')), len(wider))
+
+        for results in [stored, again.iloc[:len(grid)].reset_index(drop=True)]:
+            self.assertEqual(list(results[mean_reversion.ParameterGrid.keys].itertuples(index=False)), grid.combinations())
+            np.testing.assert_allclose(results['sharpe_annual'].to_numpy(), expected['sharpe_annual'].to_numpy())
+
+        ranked = self.store.rank('sharpe_annual', top=3, model='Sweep')
+        self.assertEqual(len(ranked), 3)
+        self.assertAlmostEqual(ranked['sharpe_annual'].iloc[0], again['sharpe_annual'].max())
+        self.assertTrue(ranked['sharpe_annual'].is_monotonic_decreasing)
+        self.assertIsNone(self.store.query(dataset='x'))
+
+    def test_mixed_int_float_thresholds(self):
+        grid = mean_reversion.ParameterGrid(mean_period=[10], threshold=[1, 1.5])
+        expected = mean_reversion.Sweep(self.data.copy(), grid, self.accounts).run()
+        stored = mean_reversion.Sweep(self.data.copy(), grid, self.accounts, store=self.store).run()
+        again = mean_reversion.Sweep(self.data.copy(), grid, self.accounts, store=self.store).run()
+        np.testing.assert_allclose(stored['sharpe_annual'], expected['sharpe_annual'])
+        np.testing.assert_allclose(again['sharpe_annual'], expected['sharpe_annual'])
+        self.assertEqual(len(self.store.query(model='Sweep')), len(grid))
+        self.assertEqual(self.store.key('d', 'Sweep', ('simple', 10, 10, 10, 1, 'long'), 1000),
+                         self.store.key('d', 'Sweep', ('simple', np.int64(10), 10.0, 10, 1.0, 'long'), 1000))
+
+    def test_walk_forward(self):
+        grid = mean_reversion.ParameterGrid(mean_period=[10, 20], threshold=[1, 2])
+        first = mean_reversion.WalkForward(self.data.copy(), grid, self.accounts, 1000, 500, max_workers=1, store=self.store)
+        second = mean_reversion.WalkForward(self.data.copy(), grid, self.accounts, 1000, 500, max_workers=1, store=self.store)
+        folds = first.run()
+        restored = second.run()
+
+        self.assertEqual(list(restored['test_start']), list(folds['test_start']))
+        self.assertEqual(list(restored['mean_period']), list(folds['mean_period']))
+        self.assertAlmostEqual(second.metrics['sharpe_annual'], first.metrics['sharpe_annual'])
+        np.testing.assert_allclose(second.returns.to_numpy(), first.returns.to_numpy(), atol=1e-12)
+
+    def test_cli_opens_store_on_first_use(self):
+        from root import MeanReversionBacktest
+        path = os.path.join(self.directory.name, 'cli.db')
+        backtest = MeanReversionBacktest(store_path=path)
+        self.assertFalse(os.path.exists(path))
+        self.assertIs(backtest.store, backtest.store)
+        self.assertTrue(os.path.exists(path))
+        backtest.store.close()
+
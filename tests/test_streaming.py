@@ -0,0 +1,35 @@
+import mean_reversion
+import contextlib
+import io
+import numpy as np
+import unittest
+
+
+class TestStreamingMeanReversion(unittest.TestCase):
+
+    def setUp(self):
+        self.data = mean_reversion.DataLoader().load_data('XAUUSD_h4.csv')
+        self.accounts = mean_reversion.Accounts(cash=None)
+
+    def assert_matches_batch(self, hparam):
+        with contextlib.redirect_stdout(io.StringIO()):
+            built = mean_reversion.MeanReversion(self.data.copy(), hparam, self.accounts).built_model
+
+        stream = mean_reversion.StreamingMeanReversion(hparam, self.accounts)
+        out = [stream.update(bar) for bar in self.data[['close']].to_dict('records')]
+
+        z_score = np.array([o['z_score'] for o in out])
+        signal = np.array([o['signal'] for o in out])
+        equity = np.array([o['equity'] for o in out])
+
+        np.testing.assert_allclose(z_score, built['z_score'], rtol=1e-7, atol=1e-9)
+        np.testing.assert_array_equal(signal[1:], built['signal'].to_numpy()[1:])
+        np.testing.assert_allclose(equity[1:], built['equity'].to_numpy()[1:])
+
+    def test_exponential(self):
+        for side in mean_reversion.Side().valid_values:
+            self.assert_matches_batch(mean_reversion.Hyperparameters(20, 10, 15, 1, side, 'exponential'))
+
+    def test_simple(self):
+        for side in mean_reversion.Side().valid_values:
+            self.assert_matches_batch(mean_reversion.Hyperparameters(20, 10, 15, 1, side, 'simple'))
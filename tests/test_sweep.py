@@ -0,0 +1,39 @@
+import mean_reversion
+import contextlib
+import io
+import numpy as np
+import unittest
+
+
+class TestSweep(unittest.TestCase):
+
+    def setUp(self):
+        self.data = mean_reversion.DataLoader().load_data('XAUUSD_d1.csv')
+        self.accounts = mean_reversion.Accounts(cash=None)
+        self.grid = mean_reversion.ParameterGrid(
+            mean_period=[10, 20],
+            spread_mean_period=[5, 10],
+            spread_sdev_period=[10],
+            threshold=[0, 1],
+            side=mean_reversion.Side().valid_values,
+            calc_type=mean_reversion.RollingCalculationType().valid_values
+        )
+
+    def test_matches_mean_reversion(self):
+        results = mean_reversion.Sweep(self.data.copy(), self.grid, self.accounts, chunk_size=3).run()
+        self.assertEqual(len(results), len(self.grid))
+
+        for row, hparam in zip(results.itertuples(), self.grid.hyperparameters()):
+            with contextlib.redirect_stdout(io.StringIO()):
+                sim = mean_reversion.MeanReversion(self.data.copy(), hparam, self.accounts)
+            metrics = sim.metrics
+            self.assertEqual((row.mean_period, row.threshold, row.side), (hparam.mean_period, hparam.threshold, hparam.side))
+            self.assertAlmostEqual(row.net_returns_percent, metrics.net_returns_percent)
+            self.assertAlmostEqual(row.max_drawdown, abs(metrics.drawdown.min()))
+            self.assertAlmostEqual(row.annual_mean, metrics.annual_mean)
+            np.testing.assert_allclose(row.sharpe_daily, metrics.sharpe_daily)
+
+    def test_invalid_grid(self):
+        grid = mean_reversion.ParameterGrid(mean_period=[0])
+        with contextlib.redirect_stdout(io.StringIO()):
+            self.assertIsNone(mean_reversion.Sweep(self.data, grid, self.accounts).run())
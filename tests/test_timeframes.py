@@ -0,0 +1,68 @@
+import mean_reversion
+import os
+import shutil
+import tempfile
+import unittest
+
+
+class TestTimeframes(unittest.TestCase):
+
+    def setUp(self):
+        self.tmp = tempfile.mkdtemp()
+        for file in ['XAUUSD_h1.csv', 'XAUUSD_h4.csv', 'MER.csv']:
+            shutil.copy(os.path.join('data', file), self.tmp)
+        self.dl = mean_reversion.DataLoader()
+        self.dl.directory = self.tmp
+        self.dl.cache = mean_reversion.DataCache(os.path.join(self.tmp, '.cache'))
+
+    def tearDown(self):
+        shutil.rmtree(self.tmp)
+
+    def test_resampled_matches_file(self):
+        self.assertEqual(self.dl.symbols(), {'XAUUSD': {'h1': 'XAUUSD_h1.csv', 'h4': 'XAUUSD_h4.csv'}})
+        self.assertEqual(self.dl.base_file('XAUUSD'), 'XAUUSD_h1.csv')
+
+        derived = self.dl.load_timeframe('XAUUSD', 'h4')
+        expected = self.dl.load_data('XAUUSD_h4.csv')
+        self.assertTrue(derived.index.equals(expected.index))
+        for column in ['open', 'high', 'low', 'close']:
+            self.assertTrue(derived[column].equals(expected[column]), column)
+
+        self.assertIsNone(self.dl.load_timeframe('XAUUSD', 'm15'))
+        self.assertIsNone(self.dl.load_timeframe('XAUUSD', 'q1'))
+
+    def test_views_cached(self):
+        path = os.path.join(self.tmp, 'XAUUSD_h1.csv')
+        first = self.dl.load_data('XAUUSD_h1.csv', timeframe='d1')
+        self.assertTrue(os.path.isdir(os.path.join(self.tmp, '.cache', 'XAUUSD_h1.csv@d1')))
+        self.assertTrue(self.dl.cache.load(path, view='d1').equals(first))
+
+        mean_reversion.DataLoader.views.clear()
+        self.assertTrue(self.dl.load_data('XAUUSD_h1.csv', timeframe='d1').equals(first))
+        self.assertEqual(len(mean_reversion.DataLoader.views), 1)
+
+        # the view is invalidated with its source file
+        with open(path, 'a') as f:
+            f.write("2024-01-02 00:00:00,1.0,1.0,1.0,1.0,0\n")
+        self.assertIsNone(self.dl.cache.load(path, view='d1'))
+        self.assertEqual(self.dl.load_data('XAUUSD_h1.csv', timeframe='d1')['close'].iloc[-1], 1.0)
+        # the new view replaces the old one, and clear_cache drops both caches
+        self.assertEqual(len(mean_reversion.DataLoader.views), 1)
+        self.dl.clear_cache()
+        self.assertEqual(len(mean_reversion.DataLoader.views), 0)
+
+    def test_model_and_sweep_timeframes(self):
+        base = self.dl.load_data('XAUUSD_h1.csv')
+        hparam = mean_reversion.Hyperparameters(20, 10, 10, 1, 'long', 'exponential')
+        accounts = mean_reversion.Accounts(cash=None)
+        derived = mean_reversion.MeanReversion(base.copy(), hparam, accounts, verbose=False, timeframe='h4')
+        expected = mean_reversion.MeanReversion(self.dl.load_data('XAUUSD_h4.csv'), hparam, accounts, verbose=False)
+        self.assertAlmostEqual(derived.metrics.final_equity, expected.metrics.final_equity)
+
+        grid = mean_reversion.ParameterGrid(mean_period=[20], threshold=[1, 2])
+        with self.assertRaises(ValueError):
+            mean_reversion.MeanReversion(base.copy(), hparam, accounts, verbose=False, timeframe='q1')
+
+        results = mean_reversion.timeframe_sweep(base, grid, accounts, ['h4', 'd1'])
+        self.assertListEqual(list(results['timeframe']), ['h4', 'h4', 'd1', 'd1'])
+        self.assertAlmostEqual(results['final_equity'].iloc[0], expected.metrics.final_equity)
@@ -0,0 +1,40 @@
+import mean_reversion
+import numpy as np
+import unittest
+
+
+class TestTradeLedger(unittest.TestCase):
+
+    def setUp(self):
+        self.data = mean_reversion.DataLoader().load_data('XAUUSD_h4.csv')
+        self.accounts = mean_reversion.Accounts(cash=None)
+
+    def test_pnl_matches_strategy_returns(self):
+        for side in mean_reversion.Side().valid_values:
+            hparam = mean_reversion.Hyperparameters(20, 10, 15, 1, side, 'simple')
+            model = mean_reversion.MeanReversion(self.data, hparam, self.accounts, verbose=False).built_model
+            trades = mean_reversion.TradeLedger(model, self.accounts.cash, side).trades
+
+            self.assertAlmostEqual(trades['pnl'].sum(), model['strategy_returns'].sum())
+            close_pnl = mean_reversion.extract_trades(model['signal'], model['close'], side=side)['pnl']
+            np.testing.assert_allclose(trades['pnl'], close_pnl, atol=1e-12)
+            self.assertTrue((trades['mae'] <= 0).all() and (trades['mfe'] >= 0).all())
+            self.assertTrue((trades['mfe'] >= trades['pnl'] - 1e-12).all())
+
+    def test_runs(self):
+        signal = np.array([np.nan, 0, 1, 1, -1, -1, -1, 0, 1, 0, 1])
+        close = np.array([100, 101, 102, 99, 98, 100, 97, 96, 95, 96, 97.0])
+        high = close + 1
+        low = close - 1
+        trades = mean_reversion.extract_trades(signal, close, high, low)
+
+        np.testing.assert_array_equal(trades['entry'], [2, 4, 8, 10])
+        np.testing.assert_array_equal(trades['exit'], [3, 6, 8, 10])
+        np.testing.assert_array_equal(trades['direction'], [1, -1, 1, 1])
+        np.testing.assert_array_equal(trades['bars'], [2, 3, 1, 1])
+        np.testing.assert_allclose(trades['pnl'][:2], [np.log(99 / 101), -np.log(97 / 99)])
+        np.testing.assert_allclose(trades['mfe'][0], np.log(103 / 101))
+        np.testing.assert_allclose(trades['mae'][0], np.log(98 / 101))
+        np.testing.assert_allclose(trades['mae'][1], -np.log(101 / 99))
+
+        self.assertEqual(len(mean_reversion.extract_trades(signal, close, side='short')), 1)
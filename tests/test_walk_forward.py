@@ -0,0 +1,49 @@
+import mean_reversion
+import numpy as np
+import unittest
+
+
+class TestWalkForward(unittest.TestCase):
+
+    def setUp(self):
+        self.data = mean_reversion.DataLoader().load_data('XAUUSD_d1.csv')
+        self.accounts = mean_reversion.Accounts(cash=None)
+        self.grid = mean_reversion.ParameterGrid(
+            mean_period=[10, 20],
+            spread_mean_period=[5, 10],
+            threshold=[1, 2],
+            side=['long', 'short']
+        )
+
+    def test_folds(self):
+        wf = mean_reversion.WalkForward(self.data, self.grid, self.accounts, train_size=1000, test_size=500)
+        folds = wf.folds()
+        self.assertEqual(folds[0], (0, 1000, 1000, 1500))
+        self.assertEqual(folds[1], (500, 1500, 1500, 2000))
+        self.assertEqual(folds[-1][3], len(self.data))
+
+        anchored = mean_reversion.WalkForward(self.data, self.grid, self.accounts, train_size=1000, test_size=500, anchored=True)
+        self.assertTrue(all(f[0] == 0 for f in anchored.folds()))
+
+    def test_invalid_sizes(self):
+        for train_size, test_size in [(1000, 0), (0, 500), (-1, 500), (1000, 2.5)]:
+            wf = mean_reversion.WalkForward(self.data, self.grid, self.accounts, train_size=train_size, test_size=test_size)
+            self.assertEqual(wf.folds(), [])
+            self.assertIsNone(wf.run())
+
+    def test_out_of_sample_returns(self):
+        wf = mean_reversion.WalkForward(self.data, self.grid, self.accounts, train_size=1000, test_size=500, max_workers=2)
+        folds = wf.run()
+        self.assertEqual(len(wf.returns), len(self.data) - 1000)
+
+        serial = mean_reversion.WalkForward(self.data, self.grid, self.accounts, train_size=1000, test_size=500, max_workers=1)
+        serial.run()
+        np.testing.assert_allclose(wf.returns, serial.returns)
+
+        # each test window uses the selected parameters run over the full history
+        for (_, _, test_start, test_end), row in zip(wf.folds(), folds.itertuples()):
+            hparam = mean_reversion.Hyperparameters(row.mean_period, row.spread_mean_period, row.spread_sdev_period,
+                                                    row.threshold, row.side, row.calc_type)
+            sim = mean_reversion.MeanReversion(self.data, hparam, self.accounts, verbose=False)
+            expected = sim.built_model['strategy_returns'].fillna(0).to_numpy()[test_start:test_end]
+            np.testing.assert_allclose(wf.returns.to_numpy()[test_start - 1000:test_end - 1000], expected)